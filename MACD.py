@@ -1,9 +1,18 @@
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
-import yfinance as yf
-import pandas as pd
-import matplotlib.pyplot as plt
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from data_cache import BarCache
+from fetcher import Fetcher
+from figure_manager import BlitRedraw, FigureManager, rescale, set_line
+
+bar_cache = BarCache(provider=Fetcher())
+figures = FigureManager(max_figures=1)
+canvas = None
+blitter = None
 
 # Function to calculate MACD
 
@@ -16,54 +25,145 @@ def calculate_macd(data):
     signal_line = macd_line.ewm(span=9, adjust=False).mean()
     return macd_line, signal_line
 
+# Plot with the MACD and signal lines and the price on a secondary y-axis.
+# Built once; later lookups only swap the line data.
+
+
+def build_plot(fig):
+    ax = fig.add_subplot()
+    macd_line = ax.plot([], [], label="MACD Line", color="blue")[0]
+    signal_line = ax.plot([], [], label="Signal Line", color="red")[0]
+    ax.set_xlabel("Date")
+    ax.set_ylabel("MACD Value")
+    ax.legend(loc="lower right")
+
+    # Overlay the stock price on the MACD plot
+    ax2 = ax.twinx()  # Create a secondary y-axis
+    price = ax2.plot([], [], label="Stock Price", color="green",
+                     alpha=0.5)[0]
+    ax2.set_ylabel("Stock Price")
+    ax2.legend(loc="upper left")
+    return {'ax': ax, 'ax2': ax2, 'macd': macd_line, 'signal': signal_line,
+            'price': price}
+
+# In-memory cache of computed MACD frames, keyed on (symbol, start, end), so
+# repeat lookups are shown without touching the worker
+
+
+MACD_CACHE_SIZE = 32
+macd_cache = OrderedDict()
+macd_cache_lock = threading.Lock()
+
+
+def cached_macd(key):
+    with macd_cache_lock:
+        df = macd_cache.get(key)
+        if df is not None:
+            macd_cache.move_to_end(key)
+        return df
+
+
+def store_macd(key, df):
+    with macd_cache_lock:
+        macd_cache[key] = df
+        macd_cache.move_to_end(key)
+        while len(macd_cache) > MACD_CACHE_SIZE:
+            macd_cache.popitem(last=False)
+
+# Background loading.  The download and MACD run on a worker thread and the
+# result is put on a queue that the Tk main loop polls, so the window stays
+# responsive.  Every lookup gets a new request number; an older request that
+# has not started yet is cancelled, and one that is already downloading is
+# left to finish but its result is dropped.
+
+
+POLL_MS = 50
+executor = ThreadPoolExecutor(max_workers=2)
+results = queue.Queue()
+latest_request = 0
+pending = None
+
+
+def load_macd(request, key):
+    if request != latest_request:
+        return  # superseded before it started
+    symbol, start_date, end_date = key
+    try:
+        df = bar_cache.get(symbol, start_date, end_date)
+        if not df.empty:
+            # Calculate MACD
+            df['MACD'], df['Signal'] = calculate_macd(df)
+        store_macd(key, df)
+        results.put((request, key, df, None))
+    except Exception as e:
+        results.put((request, key, None, e))
+
+
+def poll_results():
+    try:
+        while True:
+            request, key, df, error = results.get_nowait()
+            if request != latest_request:
+                continue  # a newer lookup was started meanwhile
+            status_label.config(text="")
+            if error is not None:
+                messagebox.showerror("Error", str(error))
+            else:
+                show_macd(key[0], df)
+    except queue.Empty:
+        pass
+    root.after(POLL_MS, poll_results)
+
 # Function to fetch stock data and update plot
 
 
 def get_stock_data():
-    global ax  # Declare ax as global to use it across function calls
+    global latest_request, pending
     symbol = stock_entry.get().upper()
-    start_date = start_entry.get()
-    end_date = end_entry.get()
-
-    # Create a subplot if it doesn't exist
-    if 'ax' not in globals():
-        fig, ax = plt.subplots(figsize=(10, 6))
-        global canvas
+    key = (symbol, start_entry.get(), end_entry.get())
+
+    latest_request += 1
+    if pending is not None:
+        pending.cancel()
+        pending = None
+
+    df = cached_macd(key)
+    if df is not None:
+        status_label.config(text="")
+        show_macd(symbol, df)
+        return
+    status_label.config(text=f"Loading {symbol}...")
+    pending = executor.submit(load_macd, latest_request, key)
+
+
+def show_macd(symbol, df):
+    global canvas, blitter
+    if df.empty:
+        messagebox.showerror(
+            "Error", "Invalid stock symbol or no data available for the selected dates.")
+        return
+
+    # The figure and its canvas are created on the first lookup only
+    fig, plot = figures.get('macd', build_plot, figsize=(10, 6))
+    if canvas is None:
         canvas = FigureCanvasTkAgg(fig, master=root)
         canvas.get_tk_widget().pack()
+        blitter = BlitRedraw(canvas, [plot['macd'], plot['signal'],
+                                      plot['price'], plot['ax'].title])
 
-    try:
-        stock = yf.Ticker(symbol)
-        df = stock.history(start=start_date, end=end_date)
-        if df.empty:
-            messagebox.showerror(
-                "Error", "Invalid stock symbol or no data available for the selected dates.")
-            return
-
-        # Calculate MACD
-        df['MACD'], df['Signal'] = calculate_macd(df)
-
-        # Clear previous plot
-        ax.clear()
-        ax.plot(df.index, df['MACD'], label="MACD Line", color="blue")
-        ax.plot(df.index, df['Signal'], label="Signal Line", color="red")
-        ax.set_title(f"MACD for {symbol}")
-        ax.set_xlabel("Date")
-        ax.set_ylabel("MACD Value")
-        ax.legend(loc="lower right")
-
-        # Overlay the stock price on the MACD plot
-        ax2 = ax.twinx()  # Create a secondary y-axis
-        ax2.plot(df.index, df['Close'],
-                 label="Stock Price", color="green", alpha=0.5)
-        ax2.set_ylabel("Stock Price")
-        ax2.legend(loc="upper left")
-
-        # Update plot on UI
-        canvas.draw()
+    # Replace the line data instead of redrawing the axes
+    limits = [(ax.get_xlim(), ax.get_ylim()) for ax in (plot['ax'], plot['ax2'])]
+    set_line(plot['macd'], df.index, df['MACD'])
+    set_line(plot['signal'], df.index, df['Signal'])
+    set_line(plot['price'], df.index, df['Close'])
+    plot['ax'].set_title(f"MACD for {symbol}")
+    rescale(plot['ax'])
+    rescale(plot['ax2'])
 
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
+    # Update plot on UI: only the lines and title are blitted, unless the
+    # axis limits (and so the ticks) changed
+    blitter.update(full=limits != [(ax.get_xlim(), ax.get_ylim())
+                                   for ax in (plot['ax'], plot['ax2'])])
 
 
 # Initialize main Tkinter window
@@ -92,5 +192,17 @@ end_entry.grid(row=0, column=5, padx=5)
 tk.Button(frame, text="Get MACD", command=get_stock_data).grid(
     row=0, column=6, padx=10)
 
+status_label = tk.Label(root, text="")
+status_label.pack()
+
+
+def on_close():
+    executor.shutdown(wait=False, cancel_futures=True)
+    root.destroy()
+
+
+root.protocol("WM_DELETE_WINDOW", on_close)
+
 # Run the application
+root.after(POLL_MS, poll_results)
 root.mainloop()
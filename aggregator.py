@@ -0,0 +1,344 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from column_store import interval_length
+from streaming import MACDState, RSIState, StochasticState
+
+# ----------------------------------------------------------
+# Tick-to-bar aggregation
+#
+# A TickAggregator turns a stream of trades (or quote mid prices) for many
+# symbols into OHLCV bars over several timeframes at once.  Every tick
+# updates the open bar of each timeframe directly, so a late tick lands in
+# the right bar of every timeframe.
+#
+# Ticks may arrive late or out of order by up to ``tolerance``.  Each symbol
+# has a watermark, the newest timestamp seen.  A bar is final once the
+# watermark has passed its end by the tolerance, and ticks older than
+# ``watermark - tolerance`` are dropped and counted.  Only bars that can
+# still receive ticks are kept, so memory per symbol is bounded by the
+# timeframes and the tolerance, not by the length of the tape.
+#
+# Finished bars go to ``on_bar`` and, if given, every tick also passes the
+# bars it touched, still forming, to ``on_update``.  IndicatorFeed connects
+# both to the streaming indicator states: final bars advance the states and
+# forming bars are previewed with ``peek``.
+# ----------------------------------------------------------
+
+DEFAULT_TIMEFRAMES = ('1m', '5m', '1h', '1d')
+
+
+class Bar:
+    """
+    One OHLCV bar.  Indexing by column name (``bar['Close']``) works as
+    well, so bars can be passed to the streaming indicator states.
+
+    :param start: Start of the bar in nanoseconds since the epoch.
+    """
+
+    __slots__ = ('start', 'Open', 'High', 'Low', 'Close', 'Volume', 'ticks',
+                 '_first', '_last')
+
+    def __init__(self, start, timestamp, price, size):
+        self.start = start
+        self.Open = self.High = self.Low = self.Close = price
+        self.Volume = size
+        self.ticks = 1
+        self._first = self._last = timestamp
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __repr__(self):
+        return (f"Bar({self.timestamp}, O={self.Open}, H={self.High}, "
+                f"L={self.Low}, C={self.Close}, V={self.Volume})")
+
+    @property
+    def timestamp(self):
+        return pd.Timestamp(self.start)
+
+    def add(self, timestamp, price, size):
+        if price > self.High:
+            self.High = price
+        elif price < self.Low:
+            self.Low = price
+        # Open and Close follow the ticks' timestamps, not their arrival
+        if timestamp < self._first:
+            self._first, self.Open = timestamp, price
+        if timestamp >= self._last:
+            self._last, self.Close = timestamp, price
+        self.Volume += size
+        self.ticks += 1
+
+
+class _Book:
+    # Open bars of one symbol: per timeframe, a dict of bar start -> Bar
+
+    __slots__ = ('watermark', 'open')
+
+    def __init__(self, n_timeframes):
+        self.watermark = None
+        self.open = [{} for _ in range(n_timeframes)]
+
+
+def _nanoseconds(timestamp):
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    return pd.Timestamp(timestamp).value
+
+
+class TickAggregator:
+    """
+    Multi-timeframe OHLCV bars from ticks.
+
+    :param timeframes: Bar lengths as interval strings, e.g. ``("1m",
+        "5m", "1h", "1d")``; bars are aligned to multiples of their length
+        since the epoch (days start at midnight of the tick timestamps).
+    :param tolerance: How late a tick may arrive, as a ``pd.Timedelta`` or
+        anything it accepts.
+    :param on_bar: Called as ``on_bar(symbol, timeframe, bar)`` for each
+        finished bar, in time order per symbol and timeframe.
+    :param on_update: Optional; called as ``on_update(symbol, timeframe,
+        bar)`` with the forming bar of every timeframe a tick updated.
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, tolerance='2s',
+                 on_bar=None, on_update=None):
+        self.timeframes = tuple(timeframes)
+        self.lengths = []
+        for timeframe in self.timeframes:
+            if timeframe.endswith(('wk', 'mo')):
+                raise ValueError(f"timeframes must be fixed lengths of at "
+                                 f"most a day, got {timeframe!r}")
+            self.lengths.append(interval_length(timeframe).value)
+        self.tolerance = pd.Timedelta(tolerance).value
+        self.on_bar = on_bar
+        self.on_update = on_update
+        self.stats = {'ticks': 0, 'late': 0, 'bars': 0}
+        self._books = {}
+
+    def __len__(self):
+        return len(self._books)
+
+    def add(self, symbol, timestamp, price, size=0.0):
+        """
+        Add one tick.
+
+        :param timestamp: Nanoseconds since the epoch, or anything
+            ``pd.Timestamp`` accepts.
+        :return: False if the tick was too late and dropped.
+        """
+        timestamp = _nanoseconds(timestamp)
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = _Book(len(self.lengths))
+        elif timestamp < book.watermark - self.tolerance:
+            self.stats['late'] += 1
+            return False
+        self.stats['ticks'] += 1
+        on_update = self.on_update
+        for i, length in enumerate(self.lengths):
+            start = timestamp - timestamp % length
+            bars = book.open[i]
+            bar = bars.get(start)
+            if bar is None:
+                bar = bars[start] = Bar(start, timestamp, price, size)
+            else:
+                bar.add(timestamp, price, size)
+            if on_update is not None:
+                on_update(symbol, self.timeframes[i], bar)
+        if book.watermark is None or timestamp > book.watermark:
+            book.watermark = timestamp
+            self._close(symbol, book, timestamp - self.tolerance)
+        return True
+
+    def _close(self, symbol, book, before):
+        # Emit every bar that ended at or before ``before``
+        for i, length in enumerate(self.lengths):
+            bars = book.open[i]
+            if len(bars) == 1:
+                start = next(iter(bars))
+                if start + length > before:
+                    continue
+            done = sorted(s for s in bars if s + length <= before)
+            for start in done:
+                self._emit(symbol, i, bars.pop(start))
+
+    def _emit(self, symbol, i, bar):
+        self.stats['bars'] += 1
+        if self.on_bar is not None:
+            self.on_bar(symbol, self.timeframes[i], bar)
+
+    def advance(self, timestamp):
+        """
+        Move every symbol's watermark to at least ``timestamp`` (e.g. from
+        a clock), closing bars of symbols that have stopped trading.
+        """
+        timestamp = _nanoseconds(timestamp)
+        for symbol, book in self._books.items():
+            if book.watermark is None or timestamp > book.watermark:
+                book.watermark = timestamp
+                self._close(symbol, book, timestamp - self.tolerance)
+
+    def flush(self, symbol=None):
+        """
+        Emit all open bars, of one symbol or of all (e.g. at the close).
+        """
+        symbols = [symbol] if symbol is not None else list(self._books)
+        for sym in symbols:
+            book = self._books.get(sym)
+            if book is None:
+                continue
+            for i, bars in enumerate(book.open):
+                for start in sorted(bars):
+                    self._emit(sym, i, bars.pop(start))
+
+    def partial(self, symbol, timeframe):
+        """
+        The newest open bar of a symbol and timeframe, or None.
+        """
+        book = self._books.get(symbol)
+        if book is None:
+            return None
+        bars = book.open[self.timeframes.index(timeframe)]
+        return bars[max(bars)] if bars else None
+
+
+class IndicatorFeed:
+    """
+    Streaming indicators per symbol and timeframe, fed by a TickAggregator.
+
+    Pass ``feed.on_bar`` (and ``feed.on_update`` for previews of forming
+    bars) to the aggregator.
+
+    :param indicators: Dict mapping a name to a zero-argument factory of a
+        streaming state (default: RSI, MACD and the stochastic oscillator
+        with their default parameters).
+    :param on_values: Optional; called as ``on_values(symbol, timeframe,
+        bar, values, final)`` after every update.
+    """
+
+    def __init__(self, indicators=None, on_values=None):
+        if indicators is None:
+            indicators = {'rsi': RSIState, 'macd': MACDState,
+                          'stochastic': StochasticState}
+        self.indicators = dict(indicators)
+        self.on_values = on_values
+        self.states = {}
+        # Latest values per (symbol, timeframe): of the last final bar, and
+        # of the forming bar
+        self.values = {}
+        self.preview = {}
+
+    def _states(self, key):
+        states = self.states.get(key)
+        if states is None:
+            states = self.states[key] = {name: factory() for name, factory
+                                         in self.indicators.items()}
+        return states
+
+    def on_bar(self, symbol, timeframe, bar):
+        key = (symbol, timeframe)
+        values = {name: state.update(bar)
+                  for name, state in self._states(key).items()}
+        self.values[key] = values
+        self.preview.pop(key, None)
+        if self.on_values is not None:
+            self.on_values(symbol, timeframe, bar, values, True)
+
+    def on_update(self, symbol, timeframe, bar):
+        key = (symbol, timeframe)
+        values = {name: state.peek(bar)
+                  for name, state in self._states(key).items()}
+        self.preview[key] = values
+        if self.on_values is not None:
+            self.on_values(symbol, timeframe, bar, values, False)
+
+
+# ----------------------------------------------------------
+# Tape replay
+# ----------------------------------------------------------
+
+
+def replay(tape, aggregator):
+    """
+    Feed a recorded tape through an aggregator and flush it at the end.
+
+    :param tape: DataFrame with 'symbol', 'timestamp', 'price' and 'size'
+        columns, in arrival order.
+    :return: Seconds taken.
+    """
+    symbols = tape['symbol'].to_numpy()
+    timestamps = pd.DatetimeIndex(tape['timestamp']).as_unit('ns').asi8
+    timestamps = timestamps.tolist()
+    prices = tape['price'].to_numpy(dtype=np.float64).tolist()
+    sizes = tape['size'].to_numpy(dtype=np.float64).tolist()
+    add = aggregator.add
+    started = time.perf_counter()
+    for tick in zip(symbols, timestamps, prices, sizes):
+        add(*tick)
+    aggregator.flush()
+    return time.perf_counter() - started
+
+
+def synthetic_tape(n_symbols=300, ticks_per_symbol=20_000,
+                   day='2024-01-02', jitter='500ms', seed=None):
+    """
+    A made-up trading day (9:30-16:00) of random-walk trades, with arrival
+    order scrambled by up to ``jitter``.
+    """
+    rng = np.random.default_rng(seed)
+    open_ns = (pd.Timestamp(day) + pd.Timedelta(hours=9, minutes=30)).value
+    session = pd.Timedelta(hours=6, minutes=30).value
+    n = n_symbols * ticks_per_symbol
+    symbol_ids = np.repeat(np.arange(n_symbols), ticks_per_symbol)
+    times = open_ns + rng.integers(0, session, n)
+    order = np.lexsort((times, symbol_ids))
+    times = times[order]
+    steps = rng.normal(0.0, 0.0005, n).reshape(n_symbols, ticks_per_symbol)
+    prices = (rng.uniform(20, 500, n_symbols)[:, None]
+              * np.exp(np.cumsum(steps, axis=1))).reshape(-1)
+    arrival = times + rng.integers(0, pd.Timedelta(jitter).value, n)
+    order = np.argsort(arrival, kind='stable')
+    return pd.DataFrame({
+        'symbol': np.char.add('SYM', symbol_ids.astype(str))[order],
+        'timestamp': pd.to_datetime(times[order]),
+        'price': np.round(prices[order], 2),
+        'size': rng.integers(1, 10, n)[order] * 100.0,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay a synthetic trading day through the aggregator "
+                    "and the streaming indicators.")
+    parser.add_argument('--symbols', type=int, default=300)
+    parser.add_argument('--ticks', type=int, default=20_000,
+                        help="Ticks per symbol.")
+    parser.add_argument('--timeframes', default=','.join(DEFAULT_TIMEFRAMES))
+    parser.add_argument('--tolerance', default='2s')
+    parser.add_argument('--preview', action='store_true',
+                        help="Also preview the indicators on forming bars.")
+    args = parser.parse_args(argv)
+
+    tape = synthetic_tape(args.symbols, args.ticks, seed=0)
+    feed = IndicatorFeed()
+    aggregator = TickAggregator(
+        args.timeframes.split(','), args.tolerance, on_bar=feed.on_bar,
+        on_update=feed.on_update if args.preview else None)
+    elapsed = replay(tape, aggregator)
+    stats = aggregator.stats
+    print(f"{stats['ticks']} ticks ({stats['late']} late) -> "
+          f"{stats['bars']} bars in {elapsed:.2f}s: "
+          f"{stats['ticks'] / elapsed:,.0f} ticks/sec, "
+          f"{pd.Timedelta(hours=6.5) / pd.Timedelta(seconds=elapsed):.0f}x "
+          f"a real-time session", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
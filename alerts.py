@@ -0,0 +1,397 @@
+import argparse
+import ast
+import math
+import sys
+import time
+
+import pandas as pd
+
+from indicator_store import flatten_values
+from screener import RSI_BUY, RSI_SELL, STOCH_OVERBOUGHT, STOCH_OVERSOLD
+from streaming import MACDState, RSIState, StochasticState
+
+# ----------------------------------------------------------
+# Watchlist alerts
+#
+# An AlertEngine keeps streaming indicator state per symbol and evaluates a
+# set of rules on every new bar.  Rules are small expressions over the
+# latest indicator values (``rsi``, ``macd``, ``signal``, ``stoch_k``,
+# ``stoch_d``, ...), the bar's ``open`` / ``high`` / ``low`` / ``close`` /
+# ``volume``, and the previous bar's values as ``prev_<name>``; e.g.
+#
+#     rsi < 30
+#     cross_above(macd, signal)
+#     cross_above(stoch_k, stoch_d) and stoch_k < 20
+#
+# Expressions are parsed once and checked against a whitelist of names and
+# operators, so a rule cannot call anything but the cross helpers.  Each rule
+# has an on/off state per symbol and an alert is emitted only when it turns
+# on (and, optionally, when it turns off), not on every bar it holds.  Rules
+# are not evaluated during a symbol's first ``warmup`` bars.  Every update is
+# timed into a latency histogram.
+# ----------------------------------------------------------
+
+DEFAULT_RULES = {
+    'RSI oversold': f'rsi < {RSI_BUY}',
+    'RSI overbought': f'rsi > {RSI_SELL}',
+    'MACD bullish cross': 'cross_above(macd, signal)',
+    'MACD bearish cross': 'cross_below(macd, signal)',
+    'Stochastic bullish cross (oversold)':
+        f'cross_above(stoch_k, stoch_d) and stoch_k < {STOCH_OVERSOLD}',
+    'Stochastic bearish cross (overbought)':
+        f'cross_below(stoch_k, stoch_d) and stoch_k > {STOCH_OVERBOUGHT}',
+}
+
+# Bars per symbol before rules are evaluated: the recursive indicators give
+# values from the second bar on, but they mean little before the slowest
+# default window (MACD's 26-bar average) has filled
+DEFAULT_WARMUP = 26
+
+DEFAULT_INDICATORS = {
+    'rsi': RSIState,
+    'macd': MACDState,
+    'stochastic': StochasticState,
+}
+
+_BAR_FIELDS = (('open', 'Open'), ('high', 'High'), ('low', 'Low'),
+               ('close', 'Close'), ('volume', 'Volume'))
+
+_NODES = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not,
+          ast.USub, ast.UAdd, ast.Compare, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+          ast.Eq, ast.NotEq, ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div,
+          ast.Name, ast.Load, ast.Constant, ast.Call)
+
+_CROSSES = {'cross_above': (ast.LtE, ast.Gt), 'cross_below': (ast.GtE, ast.Lt)}
+
+_GLOBALS = {'__builtins__': {}}
+
+
+class _CrossRewriter(ast.NodeTransformer):
+    # cross_above(a, b) -> prev_a <= prev_b and a > b
+
+    def visit_Call(self, node):
+        if (not isinstance(node.func, ast.Name) or node.func.id not in _CROSSES
+                or len(node.args) != 2 or node.keywords
+                or not all(isinstance(a, ast.Name) for a in node.args)):
+            raise ValueError(
+                f"only cross_above(a, b) / cross_below(a, b) on two names "
+                f"can be called, got {ast.unparse(node)!r}")
+        before, after = _CROSSES[node.func.id]
+        a, b = (arg.id for arg in node.args)
+
+        def compare(left, op, right):
+            return ast.Compare(ast.Name(left, ast.Load()), [op()],
+                               [ast.Name(right, ast.Load())])
+        return ast.BoolOp(ast.And(), [compare('prev_' + a, before, 'prev_' + b),
+                                      compare(a, after, b)])
+
+
+class Rule:
+    """
+    A compiled rule expression.
+
+    :param name: Name the alerts carry.
+    :param expression: Expression over the variable names in ``variables``.
+    :param variables: Names the expression may use (without the ``prev_``
+        forms, which are added).
+    """
+
+    def __init__(self, name, expression, variables):
+        self.name = name
+        self.expression = expression
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"rule {name!r}: {e.msg}") from None
+        for node in ast.walk(tree):
+            if not isinstance(node, _NODES):
+                raise ValueError(f"rule {name!r}: {type(node).__name__} is "
+                                 f"not allowed in rules")
+            if isinstance(node, ast.Constant) and not isinstance(
+                    node.value, (int, float)):
+                raise ValueError(f"rule {name!r}: only numbers are allowed "
+                                 f"as constants")
+        try:
+            tree = ast.fix_missing_locations(_CrossRewriter().visit(tree))
+        except ValueError as e:
+            raise ValueError(f"rule {name!r}: {e}") from None
+        allowed = set(variables) | {'prev_' + v for v in variables}
+        unknown = {node.id for node in ast.walk(tree)
+                   if isinstance(node, ast.Name)} - allowed
+        if unknown:
+            raise ValueError(f"rule {name!r}: unknown names {sorted(unknown)}")
+        self._code = compile(tree, f'<rule {name}>', 'eval')
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, {self.expression!r})"
+
+    def __call__(self, namespace):
+        return bool(eval(self._code, _GLOBALS, namespace))
+
+
+class Alert:
+    """
+    A rule turning on (``active`` True) or off for a symbol.
+    """
+
+    __slots__ = ('symbol', 'rule', 'timestamp', 'active', 'values')
+
+    def __init__(self, symbol, rule, timestamp, active, values):
+        self.symbol = symbol
+        self.rule = rule
+        self.timestamp = timestamp
+        self.active = active
+        self.values = values
+
+    def __repr__(self):
+        state = 'on' if self.active else 'off'
+        return f"Alert({self.symbol}, {self.rule!r} {state}, {self.timestamp})"
+
+
+class LatencyHistogram:
+    """
+    Counts of durations in log-spaced buckets (1-2-5 steps from 1 µs).
+    """
+
+    BOUNDS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_US) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        us = ns / 1000.0
+        i = 0
+        while i < len(self.BOUNDS_US) and us > self.BOUNDS_US[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, q):
+        """
+        Upper bound in µs of the bucket holding the ``q``-th percentile
+        (``inf`` if it is past the last bound).
+        """
+        if not self.count:
+            return math.nan
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return (self.BOUNDS_US[i] if i < len(self.BOUNDS_US)
+                        else math.inf)
+        return math.inf
+
+    def format(self, width=40):
+        """
+        Text rendering: one line per non-empty bucket, plus a summary.
+        """
+        lines = []
+        peak = max(self.counts) or 1
+        lower = 0
+        for i, count in enumerate(self.counts):
+            upper = self.BOUNDS_US[i] if i < len(self.BOUNDS_US) else None
+            if count:
+                label = (f"{lower:>5}-{upper:<5} µs" if upper is not None
+                         else f"{lower:>5}+      µs")
+                bar = '#' * max(1, round(width * count / peak))
+                lines.append(f"{label} {count:>9} {bar}")
+            lower = upper
+        if self.count:
+            lines.append(
+                f"n={self.count} mean={self.total_ns / self.count / 1000:.1f}µs "
+                f"p50<={self.percentile(50)}µs p99<={self.percentile(99)}µs "
+                f"max={self.max_ns / 1000:.1f}µs")
+        return '\n'.join(lines)
+
+
+class _SymbolState:
+
+    __slots__ = ('states', 'namespace', 'active', 'bars')
+
+    def __init__(self, indicators, variables, n_rules):
+        self.bars = 0
+        self.states = {name: factory() for name, factory in indicators.items()}
+        self.namespace = dict.fromkeys(variables, math.nan)
+        self.namespace.update(
+            dict.fromkeys(('prev_' + v for v in variables), math.nan))
+        self.active = [False] * n_rules
+
+
+class AlertEngine:
+    """
+    Rule evaluation over a watchlist, one bar at a time.
+
+    :param rules: Dict mapping alert names to rule expressions.
+    :param indicators: Dict mapping a name to a streaming state class
+        (default: RSI, MACD and the stochastic oscillator).
+    :param on_alert: Optional callback receiving each Alert.
+    :param emit_clear: Also emit an alert when a rule turns off.
+    :param warmup: Bars per symbol before the rules are evaluated.
+    :param timeframe: With a TickAggregator, only bars of this timeframe
+        are evaluated by ``on_bar``.
+    """
+
+    def __init__(self, rules=None, indicators=None, on_alert=None,
+                 emit_clear=False, warmup=DEFAULT_WARMUP, timeframe=None):
+        self.indicators = dict(indicators if indicators is not None
+                               else DEFAULT_INDICATORS)
+        self.variables = [name for name, _ in _BAR_FIELDS] + list(
+            flatten_values({name: factory().value
+                            for name, factory in self.indicators.items()}))
+        rules = rules if rules is not None else DEFAULT_RULES
+        self.rules = [Rule(name, expression, self.variables)
+                      for name, expression in rules.items()]
+        self.on_alert = on_alert
+        self.emit_clear = emit_clear
+        self.warmup = warmup
+        self.timeframe = timeframe
+        self.latency = LatencyHistogram()
+        self.stats = {'updates': 0, 'alerts': 0}
+        self._symbols = {}
+        self._prev_keys = [(v, 'prev_' + v) for v in self.variables]
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def _symbol(self, symbol):
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = _SymbolState(
+                self.indicators, self.variables, len(self.rules))
+        return state
+
+    def update(self, symbol, bar, timestamp=None):
+        """
+        Advance one symbol by one bar and evaluate the rules.
+
+        :param bar: Mapping with 'Open', 'High', 'Low', 'Close' and
+            'Volume' (missing fields are NaN).
+        :param timestamp: Carried into the alerts.
+        :return: List of Alerts for the rules that changed state.
+        """
+        started = time.perf_counter_ns()
+        state = self._symbol(symbol)
+        namespace = state.namespace
+        for name, prev in self._prev_keys:
+            namespace[prev] = namespace[name]
+        for name, field in _BAR_FIELDS:
+            try:
+                namespace[name] = float(bar[field])
+            except (KeyError, IndexError):
+                namespace[name] = math.nan
+        namespace.update(flatten_values({name: indicator.update(bar) for name,
+                                         indicator in state.states.items()}))
+
+        state.bars += 1
+
+        alerts = []
+        active = state.active
+        rules = self.rules if state.bars > self.warmup else ()
+        for i, rule in enumerate(rules):
+            hit = rule(namespace)
+            if hit != active[i]:
+                active[i] = hit
+                if hit or self.emit_clear:
+                    alerts.append(Alert(symbol, rule.name, timestamp, hit,
+                                        dict(namespace)))
+        self.latency.add(time.perf_counter_ns() - started)
+        self.stats['updates'] += 1
+        if alerts:
+            self.stats['alerts'] += len(alerts)
+            if self.on_alert is not None:
+                for alert in alerts:
+                    self.on_alert(alert)
+        return alerts
+
+    def on_bar(self, symbol, timeframe, bar):
+        """
+        ``TickAggregator`` callback.
+        """
+        if self.timeframe is None or timeframe == self.timeframe:
+            self.update(symbol, bar, bar.timestamp)
+
+    def active(self, symbol):
+        """
+        Names of the rules currently on for a symbol.
+        """
+        state = self._symbols.get(symbol)
+        if state is None:
+            return []
+        return [rule.name for rule, on in zip(self.rules, state.active) if on]
+
+    def snapshot(self):
+        """
+        Per-symbol state as plain data, so a restarted engine with the same
+        rules and indicators can carry on where this one stopped.
+        """
+        return {symbol: {'states': {name: indicator.snapshot() for name,
+                                    indicator in state.states.items()},
+                         'namespace': dict(state.namespace),
+                         'active': list(state.active),
+                         'bars': state.bars}
+                for symbol, state in self._symbols.items()}
+
+    def restore(self, snapshot):
+        for symbol, saved in snapshot.items():
+            state = self._symbol(symbol)
+            state.states = {name: self.indicators[name].restore(s)
+                            for name, s in saved['states'].items()}
+            state.namespace.update(saved['namespace'])
+            state.active = list(saved['active'])
+            state.bars = saved['bars']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay daily bars of a watchlist through the alert "
+                    "engine and report alerts and evaluation latency.")
+    parser.add_argument('tickers', nargs='*', help="Ticker symbols.")
+    parser.add_argument('--universe', help="File with one ticker per line.")
+    parser.add_argument('--start', required=True, help="Start date (YYYY-MM-DD).")
+    parser.add_argument('--end', default=None,
+                        help="End date, exclusive (default: tomorrow).")
+    parser.add_argument('--synthetic', action='store_true',
+                        help="Use made-up bars instead of downloading.")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Only print the summary.")
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.universe:
+        with open(args.universe) as f:
+            tickers += [line.split('#')[0] for line in f]
+    if not tickers:
+        parser.error("no tickers given")
+    end = args.end or (pd.Timestamp.now().normalize() + pd.Timedelta(days=1))
+
+    from fetcher import Fetcher, SyntheticProvider
+    fetcher = Fetcher(SyntheticProvider(latency=0.0) if args.synthetic
+                      else None)
+    frames, errors = fetcher.fetch_many(tickers, pd.Timestamp(args.start),
+                                        pd.Timestamp(end))
+    for ticker, error in errors.items():
+        print(f"{ticker}: {error}", file=sys.stderr)
+
+    # Bars of all symbols in time order, as they would arrive
+    events = sorted((timestamp, ticker, bar)
+                    for ticker, df in frames.items()
+                    for timestamp, bar in zip(df.index,
+                                              df.to_dict('records')))
+    engine = AlertEngine(on_alert=None if args.quiet else print)
+    for timestamp, ticker, bar in events:
+        engine.update(ticker, bar, timestamp)
+    print(f"{engine.stats['updates']} updates for {len(engine)} symbols, "
+          f"{engine.stats['alerts']} alerts", file=sys.stderr)
+    print(engine.latency.format(), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,56 +1,160 @@
-from ta.momentum import StochasticOscillator
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import ta
-from datetime import datetime
-import matplotlib.pyplot as plt
+import os
 import plotly.graph_objects as go
+import indicators
+from data_cache import BarCache
+from fetcher import Fetcher
+from shared_cache import SharedCache
+from planner import Plan
+from timeframes import align_indicator
+from downsample import DEFAULT_MAX_POINTS, downsample
+from chart_payload import figure_bytes, scatter, use_date_axis
+from figure_manager import (FigureManager, live_figure_count, managed_figure,
+                            rescale, set_line)
 
 # ----------------------------------------------------------
 # Utility: Download Data
 # ----------------------------------------------------------
 
 
+@st.cache_resource
+def shared_fetcher():
+    # One fetcher per server process: concurrent sessions share its download
+    # slots and identical in-flight requests are downloaded once, with
+    # retries on failure
+    return Fetcher()
+
+
+bar_cache = BarCache(provider=shared_fetcher())
+
+
 def get_data(ticker, start_date, end_date):
-    # Ensure that the dates are in a proper string format
-    start_date = pd.to_datetime(start_date).strftime("%Y-%m-%d")
-    end_date = pd.to_datetime(end_date).strftime("%Y-%m-%d")
-    data = yf.download(ticker, start=start_date, end=end_date)
-    return data
+    # Ensure that the dates are whole days
+    start_date = pd.to_datetime(start_date).normalize()
+    end_date = pd.to_datetime(end_date).normalize()
+    # Served from the local bar cache; only date ranges it does not hold yet
+    # are downloaded
+    return bar_cache.get(ticker, start_date, end_date)
+
+# ----------------------------------------------------------
+# Utility: Indicator values and session caching
+# ----------------------------------------------------------
+
+
+# Downloads and indicator arrays are shared by every session of the server
+# process: entries expire after an hour and the least recently used are
+# evicted once CACHE_BYTES are held.  Setting TI_SHARED_CACHE_DIR also shares
+# indicator arrays between server processes through memory-mapped files.
+CACHE_TTL = 60 * 60
+CACHE_BYTES = 512 * 2 ** 20
+
+
+@st.cache_resource
+def shared_cache():
+    return SharedCache(max_bytes=CACHE_BYTES, ttl=CACHE_TTL,
+                       directory=os.environ.get('TI_SHARED_CACHE_DIR'))
+
+
+def compute_indicator(df, name, **params):
+    # Raw arrays for one indicator, as returned by the matching kernel in
+    # indicators.py
+    close = indicators.column(df, 'Close')
+    if name == 'rsi':
+        return indicators.rsi(close, **params)
+    if name == 'macd':
+        return indicators.macd(close, **params)
+    if name == 'bollinger':
+        return indicators.bollinger_bands(close, **params)
+    high = indicators.column(df, 'High')
+    low = indicators.column(df, 'Low')
+    if name == 'ichimoku':
+        return indicators.ichimoku_cloud(high, low, close, **params)
+    if name == 'stochastic':
+        return indicators.stochastic_oscillator(high, low, close, **params)
+    raise ValueError(f"unknown indicator: {name}")
+
+
+def _range_key(ticker, start_date, end_date):
+    return (ticker.upper(), str(pd.Timestamp(start_date).date()),
+            str(pd.Timestamp(end_date).date()))
+
+
+def load_data(ticker, start_date, end_date):
+    # Read-only for the caller: the frame is shared with other sessions
+    return shared_cache().get(
+        ('data',) + _range_key(ticker, start_date, end_date),
+        lambda: get_data(ticker, start_date, end_date))
+
+
+# Indicator timeframes: weekly and monthly values are resampled from the
+# daily bars already loaded (no extra download) and shown on the daily index
+# as of each day, without look-ahead
+TIMEFRAMES = {"Daily": None, "Weekly": "W-FRI", "Monthly": "M"}
+
+
+def load_indicator(ticker, start_date, end_date, name, timeframe=None,
+                   **params):
+    # Keyed on (ticker, range, indicator, timeframe, params), so reruns that
+    # only change display settings, and other sessions asking for the same
+    # chart, reuse both the download and the computation
+    def compute():
+        data = load_data(ticker, start_date, end_date)
+        if timeframe is None:
+            return compute_indicator(data, name, **params)
+        return align_indicator(data, timeframe, name, **params)
+    return shared_cache().get(
+        ('indicator',) + _range_key(ticker, start_date, end_date)
+        + (name, timeframe, tuple(sorted(params.items()))), compute)
+
+
+def load_indicators(ticker, start_date, end_date, requests):
+    # Several indicators at once through one Plan, so the intermediates they
+    # have in common (rolling extremes, EMAs, ...) are computed once
+    requests = tuple((name, tuple(sorted(params.items())))
+                     for name, params in requests)
+    return shared_cache().get(
+        ('indicators',) + _range_key(ticker, start_date, end_date) + requests,
+        lambda: Plan([(name, dict(params)) for name, params in requests]).run(
+            load_data(ticker, start_date, end_date)))
 
 # ----------------------------------------------------------
 # Bollinger Bands Function (Adapted from bollinger_bands_final.py :contentReference[oaicite:0]{index=0})
 # ----------------------------------------------------------
 
 
-def plot_bollinger_bands(df: pd.DataFrame, window: int = 20, n_std: int = 2):
-    # 1) Copy & compute rolling stats
-    df_ = df[['Close']].copy()
-    df_['SMA'] = df_['Close'].rolling(window).mean()
-    df_['STD'] = df_['Close'].rolling(window).std()
-    df_['Upper'] = df_['SMA'] + n_std * df_['STD']
-    df_['Lower'] = df_['SMA'] - n_std * df_['STD']
+def plot_bollinger_bands(df: pd.DataFrame, window: int = 20, n_std: int = 2,
+                         values=None, max_points=DEFAULT_MAX_POINTS,
+                         x_range=None):
+    # 1) Compute rolling stats straight from the Close array (unless the
+    #    caller passes them in precomputed)
+    if values is None:
+        values = compute_indicator(df, 'bollinger', window=window, n_std=n_std)
+    sma, upper, lower = values
+
+    # 2) Build figure, each trace cut to the visible window and downsampled
+    #    to at most max_points
+    def trace(y):
+        return downsample(df.index, y, max_points, x_range=x_range)
 
-    # 2) Build figure
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df_.index, y=df_['SMA'],
+    fig.add_trace(scatter(
+        *trace(sma),
         mode='lines+markers',
         name='Simple Moving Average',
         line=dict(width=2),
         marker=dict(size=6)
     ))
-    fig.add_trace(go.Scatter(
-        x=df_.index, y=df_['Upper'],
+    fig.add_trace(scatter(
+        *trace(upper),
         mode='lines+markers',
         name='Upper Band',
         line=dict(width=2),
         marker=dict(size=6)
     ))
-    fig.add_trace(go.Scatter(
-        x=df_.index, y=df_['Lower'],
+    fig.add_trace(scatter(
+        *trace(lower),
         mode='lines+markers',
         name='Lower Band',
         line=dict(width=2),
@@ -68,6 +172,7 @@ def plot_bollinger_bands(df: pd.DataFrame, window: int = 20, n_std: int = 2):
     )
     fig.update_xaxes(showgrid=False)
     fig.update_yaxes(showgrid=False)
+    use_date_axis(fig)
 
     return fig
 
@@ -77,47 +182,62 @@ def plot_bollinger_bands(df: pd.DataFrame, window: int = 20, n_std: int = 2):
 # ----------------------------------------------------------
 
 
-def plot_ichimoku_cloud(df):
-    df = df.copy()
-    df['Tenkan_sen'] = (df['High'].rolling(window=9).max() +
-                        df['Low'].rolling(window=9).min()) / 2
-    df['Kijun_sen'] = (df['High'].rolling(window=26).max() +
-                       df['Low'].rolling(window=26).min()) / 2
-    df['Senkou_Span_A'] = ((df['Tenkan_sen'] + df['Kijun_sen']) / 2).shift(26)
-    df['Senkou_Span_B'] = ((df['High'].rolling(window=52).max(
-    ) + df['Low'].rolling(window=52).min()) / 2).shift(26)
-    df['Chikou_Span'] = df['Close'].shift(-26)
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(df.index, df['Close'], label='Close', color='black', linewidth=1)
-    ax.plot(df.index, df['Tenkan_sen'],
-            label='Tenkan-sen', color='blue', linestyle='--')
-    ax.plot(df.index, df['Kijun_sen'], label='Kijun-sen',
-            color='red', linestyle='--')
-    ax.plot(df.index, df['Chikou_Span'], label='Chikou Span', color='green')
-
-    # Use .fillna(False) on the boolean conditions to avoid ambiguity if there are NaNs
-    ax.fill_between(
-        df.index,
-        df['Senkou_Span_A'],
-        df['Senkou_Span_B'],
-        where=(df['Senkou_Span_A'] >= df['Senkou_Span_B']).fillna(False),
-        color='lightgreen',
-        alpha=0.5
-    )
-    ax.fill_between(
-        df.index,
-        df['Senkou_Span_A'],
-        df['Senkou_Span_B'],
-        where=(df['Senkou_Span_A'] < df['Senkou_Span_B']).fillna(False),
-        color='lightcoral',
-        alpha=0.5
-    )
-
+def _build_ichimoku_figure(fig):
+    ax = fig.add_subplot()
+    lines = {
+        'close': ax.plot([], [], label='Close', color='black',
+                         linewidth=1)[0],
+        'tenkan': ax.plot([], [], label='Tenkan-sen', color='blue',
+                          linestyle='--')[0],
+        'kijun': ax.plot([], [], label='Kijun-sen', color='red',
+                         linestyle='--')[0],
+        'chikou': ax.plot([], [], label='Chikou Span', color='green')[0],
+    }
     ax.set_title("Ichimoku Cloud")
     ax.legend()
     ax.grid(True)
     fig.tight_layout()
+    return {'ax': ax, 'lines': lines, 'cloud': []}
+
+
+def plot_ichimoku_cloud(df, values=None, figures=None):
+    close = indicators.column(df, 'Close')
+    if values is None:
+        values = compute_indicator(df, 'ichimoku')
+    tenkan_sen, kijun_sen, span_a, span_b, chikou_span = values
+
+    # The figure is built once per manager; later calls only swap the data
+    fig, artists = managed_figure(figures, 'ichimoku', _build_ichimoku_figure,
+                                  figsize=(12, 6))
+    ax, lines = artists['ax'], artists['lines']
+    for name, y in (('close', close), ('tenkan', tenkan_sen),
+                    ('kijun', kijun_sen), ('chikou', chikou_span)):
+        set_line(lines[name], df.index, y)
+
+    # fill_between has no set_data, so the previous cloud is removed and
+    # drawn again (after rescale, which only looks at the lines)
+    for patch in artists['cloud']:
+        patch.remove()
+    rescale(ax)
+    # NaN comparisons are False, so the warm-up bars are left unfilled
+    artists['cloud'] = [
+        ax.fill_between(
+            df.index,
+            span_a,
+            span_b,
+            where=span_a >= span_b,
+            color='lightgreen',
+            alpha=0.5
+        ),
+        ax.fill_between(
+            df.index,
+            span_a,
+            span_b,
+            where=span_a < span_b,
+            color='lightcoral',
+            alpha=0.5
+        ),
+    ]
     return fig
 
 # ----------------------------------------------------------
@@ -125,28 +245,38 @@ def plot_ichimoku_cloud(df):
 # ----------------------------------------------------------
 
 
-def plot_macd(df):
-    df = df.copy()
-    df['EMA12'] = df['Close'].ewm(span=12, adjust=False).mean()
-    df['EMA26'] = df['Close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = df['EMA12'] - df['EMA26']
-    df['Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(df.index, df['MACD'], label='MACD', color='blue')
-    ax.plot(df.index, df['Signal'], label='Signal Line', color='red')
+def _build_macd_figure(fig):
+    ax = fig.add_subplot()
+    macd_line = ax.plot([], [], label='MACD', color='blue')[0]
+    signal_line = ax.plot([], [], label='Signal Line', color='red')[0]
     ax.set_title("MACD")
     ax.set_xlabel("Date")
     ax.set_ylabel("MACD")
     ax.legend(loc="upper left")
 
-    # Overlay stock price on a secondary y-axis
+    # Overlay stock price on a secondary y-axis (created once per figure)
     ax2 = ax.twinx()
-    ax2.plot(df.index, df['Close'], label='Close Price',
-             color='green', alpha=0.5)
+    price = ax2.plot([], [], label='Close Price', color='green', alpha=0.5)[0]
     ax2.set_ylabel("Price")
     ax2.legend(loc="upper right")
     fig.tight_layout()
+    return {'ax': ax, 'ax2': ax2, 'macd': macd_line, 'signal': signal_line,
+            'price': price}
+
+
+def plot_macd(df, values=None, figures=None):
+    close = indicators.column(df, 'Close')
+    if values is None:
+        values = compute_indicator(df, 'macd')
+    macd_line, signal_line = values
+
+    fig, artists = managed_figure(figures, 'macd', _build_macd_figure,
+                                  figsize=(12, 6))
+    set_line(artists['macd'], df.index, macd_line)
+    set_line(artists['signal'], df.index, signal_line)
+    set_line(artists['price'], df.index, close)
+    rescale(artists['ax'])
+    rescale(artists['ax2'])
     return fig
 
 # ----------------------------------------------------------
@@ -154,17 +284,10 @@ def plot_macd(df):
 # ----------------------------------------------------------
 
 
-def plot_stochastic_oscillator(df, window=14, smooth_k=3, smooth_d=3):
-    df = df.copy()
-    low_min = df["Low"].rolling(window=window).min()
-    high_max = df["High"].rolling(window=window).max()
-    df["stoch_k"] = 100 * (df["Close"] - low_min) / (high_max - low_min)
-    df["stoch_k"] = df["stoch_k"].rolling(window=smooth_k).mean()
-    df["stoch_d"] = df["stoch_k"].rolling(window=smooth_d).mean()
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(df.index, df["stoch_k"], label="%K")
-    ax.plot(df.index, df["stoch_d"], label="%D", linestyle="--")
+def _build_stochastic_figure(fig):
+    ax = fig.add_subplot()
+    stoch_k = ax.plot([], [], label="%K")[0]
+    stoch_d = ax.plot([], [], label="%D", linestyle="--")[0]
     ax.axhline(80, linestyle=":", label="Overbought (80)")
     ax.axhline(20, linestyle=":", label="Oversold (20)")
     ax.set_title("Stochastic Oscillator")
@@ -173,6 +296,21 @@ def plot_stochastic_oscillator(df, window=14, smooth_k=3, smooth_d=3):
     ax.legend()
     ax.grid(True)
     fig.tight_layout()
+    return {'ax': ax, 'k': stoch_k, 'd': stoch_d}
+
+
+def plot_stochastic_oscillator(df, window=14, smooth_k=3, smooth_d=3,
+                               values=None, figures=None):
+    if values is None:
+        values = compute_indicator(df, "stochastic", window=window,
+                                   smooth_k=smooth_k, smooth_d=smooth_d)
+    stoch_k, stoch_d = values
+
+    fig, artists = managed_figure(figures, 'stochastic',
+                                  _build_stochastic_figure, figsize=(12, 6))
+    set_line(artists['k'], df.index, stoch_k)
+    set_line(artists['d'], df.index, stoch_d)
+    rescale(artists['ax'])
     return fig
 
 
@@ -181,26 +319,18 @@ def plot_stochastic_oscillator(df, window=14, smooth_k=3, smooth_d=3):
 # ----------------------------------------------------------
 
 
-def plot_rsi(df, period=14, rsi_buy=30, rsi_sell=70):
-    df = df.copy()
-    # 1) price change
-    delta = df['Close'].diff()
-
-    # 2) separate gains and losses
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    # 3) Wilder’s smoothing (EMA of gains/losses)
-    avg_gain = gain.ewm(alpha=1/period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1/period, adjust=False).mean()
-
-    # 4) relative strength, then RSI
-    rs = avg_gain / avg_loss
-    df['RSI'] = 100 - (100 / (1 + rs))
+def plot_rsi(df, period=14, rsi_buy=30, rsi_sell=70, values=None,
+             max_points=DEFAULT_MAX_POINTS, x_range=None):
+    # 1-4) price change, gains/losses, Wilder's smoothing and RSI
+    close = indicators.column(df, 'Close')
+    rsi = values if values is not None else compute_indicator(
+        df, 'rsi', period=period)
 
-    # 5) build RSI chart
+    # 5) build RSI chart (line traces are cut to the visible window and
+    #    downsampled to at most max_points)
+    rsi_x, rsi_y = downsample(df.index, rsi, max_points, x_range=x_range)
     fig_rsi = go.Figure()
-    fig_rsi.add_trace(go.Scatter(x=df.index, y=df['RSI'], name='RSI'))
+    fig_rsi.add_trace(scatter(rsi_x, rsi_y, name='RSI'))
     fig_rsi.add_hline(y=rsi_buy, line_dash='dash',
                       annotation_text='Buy', annotation_position='bottom right')
     fig_rsi.add_hline(y=rsi_sell, line_dash='dash',
@@ -210,20 +340,26 @@ def plot_rsi(df, period=14, rsi_buy=30, rsi_sell=70):
         xaxis_title='Date',
         yaxis_title='RSI'
     )
+    use_date_axis(fig_rsi)
 
     # 6) price + signals
-    df['Signal'] = 0
-    df.loc[df['RSI'] < rsi_buy, 'Signal'] = 1
-    df.loc[df['RSI'] > rsi_sell, 'Signal'] = -1
-
+    signal = indicators.rsi_signals(rsi, rsi_buy, rsi_sell)
+    visible = np.ones(len(df), dtype=bool)
+    if x_range is not None:
+        visible = ((df.index >= pd.Timestamp(x_range[0])) &
+                   (df.index <= pd.Timestamp(x_range[1])))
+    buy = (signal == 1) & visible
+    sell = (signal == -1) & visible
+
+    close_x, close_y = downsample(df.index, close, max_points, x_range=x_range)
     fig_price = go.Figure()
-    fig_price.add_trace(go.Scatter(x=df.index, y=df['Close'], name='Close'))
-    fig_price.add_trace(go.Scatter(
-        x=df[df['Signal'] == 1].index, y=df[df['Signal'] == 1]['Close'],
+    fig_price.add_trace(scatter(close_x, close_y, name='Close'))
+    fig_price.add_trace(scatter(
+        df.index[buy], close[buy],
         mode='markers', name='Buy', marker_symbol='triangle-up', marker_size=10
     ))
-    fig_price.add_trace(go.Scatter(
-        x=df[df['Signal'] == -1].index, y=df[df['Signal'] == -1]['Close'],
+    fig_price.add_trace(scatter(
+        df.index[sell], close[sell],
         mode='markers', name='Sell', marker_symbol='triangle-down', marker_size=10
     ))
     fig_price.update_layout(
@@ -231,10 +367,86 @@ def plot_rsi(df, period=14, rsi_buy=30, rsi_sell=70):
         xaxis_title='Date',
         yaxis_title='Price'
     )
+    use_date_axis(fig_price)
 
     return fig_rsi, fig_price
 
 
+# ----------------------------------------------------------
+# Tab contents
+# ----------------------------------------------------------
+
+
+INDICATOR_TABS = ["RSI", "MACD", "Ichimoku Cloud",
+                  "Stochastic Oscillator", "Bollinger Bands"]
+
+# Indicator and parameters behind each tab
+TAB_INDICATORS = {
+    "RSI": ('rsi', {'period': 14}),
+    "MACD": ('macd', {}),
+    "Ichimoku Cloud": ('ichimoku', {}),
+    "Stochastic Oscillator": ('stochastic', {}),
+    "Bollinger Bands": ('bollinger', {'window': 20, 'n_std': 2}),
+}
+
+
+def session_figures():
+    # Matplotlib figures are reused across reruns of one session; each
+    # session gets its own manager since figures are updated in place
+    if "figure_manager" not in st.session_state:
+        st.session_state["figure_manager"] = FigureManager()
+    return st.session_state["figure_manager"]
+
+
+def build_tab(tab, ticker, start_date, end_date, data, x_range=None,
+              figures=None, values=None, timeframe=None):
+    # Compute one indicator (unless its values are passed in) and build the
+    # figures shown in its tab
+    if tab not in TAB_INDICATORS:
+        raise ValueError(f"unknown tab: {tab}")
+    if values is None:
+        name, params = TAB_INDICATORS[tab]
+        values = load_indicator(ticker, start_date, end_date, name,
+                                timeframe, **params)
+    if tab == "RSI":
+        return plot_rsi(data, values=values, x_range=x_range)
+    if tab == "MACD":
+        return (plot_macd(data, values=values, figures=figures),)
+    if tab == "Ichimoku Cloud":
+        return (plot_ichimoku_cloud(data, values=values, figures=figures),)
+    if tab == "Stochastic Oscillator":
+        return (plot_stochastic_oscillator(data, values=values,
+                                           figures=figures),)
+    return (plot_bollinger_bands(data, window=20, n_std=2, values=values,
+                                 x_range=x_range),)
+
+
+def show_tab(tab, figures, show_payload=False):
+    st.header(tab)
+    for fig in figures:
+        if isinstance(fig, go.Figure):
+            st.plotly_chart(fig, use_container_width=True)
+            if show_payload:
+                st.caption(f"Chart payload: {figure_bytes(fig) / 1024:.1f} kB")
+        else:
+            st.pyplot(fig, clear_figure=False)
+
+
+def lazy_tab_figures(tab, ticker, start_date, end_date, data, x_range=None,
+                     timeframe=None):
+    # Figures are built the first time a tab is shown and kept in the session
+    # until the ticker, date range, chart window or timeframe changes
+    key = (ticker, start_date, end_date, x_range, timeframe)
+    store = st.session_state.get("tab_figures")
+    if store is None or store["key"] != key:
+        store = st.session_state["tab_figures"] = {"key": key, "figures": {}}
+    if tab not in store["figures"]:
+        store["figures"][tab] = build_tab(tab, ticker, start_date, end_date,
+                                          data, x_range, session_figures(),
+                                          timeframe=timeframe)
+    return store["figures"][tab]
+
+
 # ----------------------------------------------------------
 # Streamlit App Layout and Tabs
 # ----------------------------------------------------------
@@ -249,42 +461,64 @@ start_date = st.sidebar.date_input(
 # The end date is fixed to December 31, 2023
 end_date = pd.to_datetime("2023-12-31")
 st.sidebar.write("End Date: December 31, 2023")
+# st.tabs runs the body of every tab on each rerun; in lazy mode only the
+# selected indicator is computed and drawn
+lazy_tabs = st.sidebar.checkbox("Compute only the selected tab", value=True)
+timeframe = TIMEFRAMES[st.sidebar.selectbox("Indicator timeframe",
+                                            list(TIMEFRAMES))]
+show_payload = st.sidebar.checkbox("Show chart payload sizes")
+if show_payload:
+    st.sidebar.caption(f"Open matplotlib figures: {live_figure_count()}")
+    cache_stats = shared_cache().stats
+    st.sidebar.caption(
+        f"Shared cache: {len(shared_cache())} entries, "
+        f"{shared_cache().nbytes / 2 ** 20:.1f} MB, "
+        f"{cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+        f"{cache_stats['misses']} misses")
 
 # Download data using yfinance
 if ticker:
-    data = get_data(ticker, start_date, end_date)
+    data = load_data(ticker, start_date, end_date)
     if data.empty:
         st.error("No data found for the given ticker and date range.")
     else:
         st.write(
             f"Showing data for {ticker} from {start_date} to {end_date.date()}")
 
-        # Create tabs for each indicator
-        tabs = st.tabs(["RSI", "MACD",
-                       "Ichimoku Cloud", "Stochastic Oscillator", "Bollinger Bands"])
-
-        with tabs[0]:
-            st.header("RSI")
-            fig_rsi, fig_rsi_price = plot_rsi(data)
-            st.plotly_chart(fig_rsi, use_container_width=True)
-            st.plotly_chart(fig_rsi_price, use_container_width=True)
-
-        with tabs[1]:
-            st.header("MACD")
-            fig_macd = plot_macd(data)
-            st.pyplot(fig_macd)
-
-        with tabs[2]:
-            st.header("Ichimoku Cloud")
-            fig_ichimoku = plot_ichimoku_cloud(data)
-            st.pyplot(fig_ichimoku)
-
-        with tabs[3]:
-            st.header("Stochastic Oscillator")
-            fig_stoch = plot_stochastic_oscillator(data)
-            st.pyplot(fig_stoch, use_container_width=True)
-
-        with tabs[4]:
-            st.header("Bollinger Bands")
-            fig_bb = plot_bollinger_bands(data, window=20, n_std=2)
-            st.plotly_chart(fig_bb, use_container_width=True)
+        # Plotly charts are downsampled to the chart window; narrowing it
+        # shows the selected stretch at full resolution
+        x_range = None
+        if len(data) > 1:
+            first, last = (data.index[0].to_pydatetime(),
+                           data.index[-1].to_pydatetime())
+            window = st.sidebar.slider("Chart window", min_value=first,
+                                       max_value=last, value=(first, last))
+            if window != (first, last):
+                x_range = window
+
+        if lazy_tabs:
+            tab = st.radio("Indicator", INDICATOR_TABS, horizontal=True,
+                           label_visibility="collapsed")
+            show_tab(tab, lazy_tab_figures(tab, ticker, start_date, end_date,
+                                           data, x_range, timeframe),
+                     show_payload)
+        else:
+            # Create tabs for each indicator; every tab is drawn, so all five
+            # indicators are computed together with shared intermediates
+            tabs = st.tabs(INDICATOR_TABS)
+            if timeframe is None:
+                all_values = load_indicators(
+                    ticker, start_date, end_date,
+                    [TAB_INDICATORS[tab] for tab in INDICATOR_TABS])
+            else:
+                all_values = [load_indicator(ticker, start_date, end_date,
+                                             name, timeframe, **params)
+                              for name, params in (TAB_INDICATORS[tab]
+                                                   for tab in INDICATOR_TABS)]
+            for tab, container, values in zip(INDICATOR_TABS, tabs,
+                                              all_values):
+                with container:
+                    show_tab(tab, build_tab(tab, ticker, start_date, end_date,
+                                            data, x_range, session_figures(),
+                                            values),
+                             show_payload)
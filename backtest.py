@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------
+# Vectorised backtester
+#
+# Turns signal arrays (1 = buy, -1 = sell, 0 = no signal), as produced by
+# identify_signals / indicators.rsi_signals or the sweep module, into
+# positions, returns, equity curves, drawdowns and trade lists.  Signals and
+# prices may carry any number of leading dimensions (e.g. tickers x parameter
+# sets x time); everything is computed along the last axis at once, without a
+# Python loop over bars or series.
+# ----------------------------------------------------------
+
+
+def positions_from_signals(signals, allow_short=False):
+    """
+    Hold the side of the most recent signal until the next one.
+
+    With ``allow_short=False`` a sell signal closes the position (flat)
+    instead of going short.  Bars before the first signal are flat.
+
+    :param signals: Integer array ``(..., n)`` of 1 / -1 / 0.
+    :return: Float array ``(..., n)`` of target positions.
+    """
+    signals = np.asarray(signals)
+    n = signals.shape[-1]
+    marks = np.where(signals != 0, np.arange(n), -1)
+    last = np.maximum.accumulate(marks, axis=-1)
+    side = np.take_along_axis(signals, np.maximum(last, 0), axis=-1)
+    side = np.where(last >= 0, side, 0).astype(np.float64)
+    if not allow_short:
+        np.maximum(side, 0.0, out=side)
+    return side
+
+
+def backtest(signals, close, allow_short=False, cost=0.0, periods_per_year=252):
+    """
+    Backtest signals against close prices.
+
+    A position decided on bar ``t`` is held from bar ``t + 1``, so a signal
+    never earns the move of the bar that produced it.
+
+    :param signals: Integer array ``(..., n)`` of 1 / -1 / 0.
+    :param close: Close prices broadcastable to ``signals``, e.g. ``(n,)``
+        for one ticker or ``(tickers, 1, n)`` for tickers x parameter sets.
+    :param allow_short: Go short on sell signals instead of flat.
+    :param cost: Proportional cost charged per unit of position change.
+    :param periods_per_year: Bars per year, for the annualised Sharpe ratio.
+    :return: Dict with ``positions``, ``returns``, ``equity`` and
+        ``drawdown`` arrays shaped like ``signals``, a ``trades`` DataFrame
+        and a ``summary`` DataFrame with one row per series.
+    """
+    signals = np.asarray(signals)
+    close = np.asarray(close, dtype=np.float64)
+    shape = np.broadcast_shapes(signals.shape, close.shape)
+    signals = np.broadcast_to(signals, shape)
+    close = np.broadcast_to(close, shape)
+
+    target = positions_from_signals(signals, allow_short)
+    held = np.zeros(shape)
+    held[..., 1:] = target[..., :-1]
+
+    bar_returns = np.zeros(shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(close[..., 1:], close[..., :-1], out=bar_returns[..., 1:])
+    bar_returns[..., 1:] -= 1.0
+    bar_returns[~np.isfinite(bar_returns)] = 0.0
+
+    turnover = np.abs(np.diff(held, axis=-1, prepend=0.0))
+    returns = held * bar_returns - cost * turnover
+    equity = np.cumprod(1.0 + returns, axis=-1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=-1) - 1.0
+
+    trades = _trades(held, equity)
+    return {
+        'positions': held,
+        'returns': returns,
+        'equity': equity,
+        'drawdown': drawdown,
+        'trades': trades,
+        'summary': _summary(held, returns, equity, drawdown, trades,
+                            shape[:-1], periods_per_year),
+    }
+
+
+def _by_series(a):
+    # ``(series, n)`` view of an ``(..., n)`` array; unlike reshape(-1, n)
+    # this also works for empty histories (n == 0)
+    return a.reshape(int(np.prod(a.shape[:-1], dtype=np.int64)), a.shape[-1])
+
+
+def _trades(held, equity):
+    # A trade is a run of bars with the same non-zero position.  Position
+    # changes are located for all series at once on the flattened array; a
+    # change is forced at the end of every row so runs never cross series and
+    # every run start is followed by its end in the same row.
+    shape = held.shape
+    n = shape[-1]
+    flat_held = _by_series(held)
+    flat_equity = _by_series(equity)
+    rows = flat_held.shape[0]
+
+    change = np.ones((rows, n + 1), dtype=bool)
+    change[:, 1:n] = flat_held[:, 1:] != flat_held[:, :-1]
+    row, col = np.nonzero(change)
+    starts = np.flatnonzero(col[:-1] < n)
+    start_row, entry = row[starts], col[starts]
+    exit_ = col[starts + 1]
+    side = flat_held[start_row, entry]
+    keep = side != 0
+    start_row, entry, exit_, side = (start_row[keep], entry[keep],
+                                     exit_[keep], side[keep])
+
+    before = np.where(entry > 0,
+                      flat_equity[start_row, np.maximum(entry - 1, 0)], 1.0)
+    trade_return = flat_equity[start_row, exit_ - 1] / before - 1.0
+
+    series = np.unravel_index(start_row, shape[:-1]) if shape[:-1] else ()
+    columns = {f'dim_{i}': idx for i, idx in enumerate(series)}
+    columns.update({
+        'entry': entry,
+        'exit': exit_,
+        'bars': exit_ - entry,
+        'side': side,
+        'return': trade_return,
+        'open': exit_ == n,
+    })
+    return pd.DataFrame(columns)
+
+
+def _summary(held, returns, equity, drawdown, trades, lead_shape,
+             periods_per_year):
+    n = returns.shape[-1]
+    flat_returns = _by_series(returns)
+    rows = flat_returns.shape[0]
+    mean = flat_returns.mean(axis=1) if n else np.full(rows, np.nan)
+    std = flat_returns.std(axis=1, ddof=1) if n > 1 else np.zeros_like(mean)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year),
+                          np.nan)
+
+    if lead_shape:
+        trade_row = np.ravel_multi_index(
+            tuple(trades[f'dim_{i}'].to_numpy() for i in range(len(lead_shape))),
+            lead_shape)
+    else:
+        trade_row = np.zeros(len(trades), dtype=np.intp)
+    n_trades = np.bincount(trade_row, minlength=rows)
+    wins = np.bincount(trade_row, weights=trades['return'].to_numpy() > 0,
+                       minlength=rows)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = wins / n_trades
+
+    index = (pd.MultiIndex.from_product([range(s) for s in lead_shape],
+                                        names=[f'dim_{i}' for i in
+                                               range(len(lead_shape))])
+             if lead_shape else pd.RangeIndex(1))
+    return pd.DataFrame({
+        'total_return': _by_series(equity)[:, -1] - 1.0 if n else np.nan,
+        'sharpe': sharpe,
+        'max_drawdown': _by_series(drawdown).min(axis=1) if n else np.nan,
+        'n_trades': n_trades,
+        'win_rate': win_rate,
+        'exposure': (_by_series(held) != 0).mean(axis=1) if n else np.nan,
+    }, index=index)
@@ -0,0 +1,75 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# ----------------------------------------------------------
+# Compact Plotly traces
+#
+# Plotly (6+) serialises NumPy arrays as base64 typed arrays instead of JSON
+# lists, so the wire size of a trace is set by its dtype.  ``scatter`` builds
+# traces with y values at a configurable precision (float32 by default) and
+# timestamps as numbers instead of date strings, and switches to WebGL
+# (Scattergl) once a trace is large enough for SVG rendering to be the
+# bottleneck.  Figures using these traces need a date x-axis, see
+# ``use_date_axis``.
+# ----------------------------------------------------------
+
+# Traces with more points than this are drawn with WebGL
+WEBGL_THRESHOLD = 5000
+
+# dtype used for y values; float32 keeps ~7 significant digits, plenty for a
+# chart, at half the bytes of float64
+PAYLOAD_DTYPE = np.float32
+
+
+def encode_x(x):
+    """
+    Trace keyword arguments for the x values.
+
+    Timestamps become milliseconds since the epoch, which a Plotly date axis
+    reads natively.  Evenly spaced timestamps (e.g. gap-free intraday bars)
+    are sent as just a start ``x0`` and step ``dx`` with no x array at all.
+    """
+    values = np.asarray(x)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        return {'x': values}
+    ms = values.astype('datetime64[ms]').astype(np.int64)
+    if ms.shape[0] > 2:
+        step = ms[1] - ms[0]
+        if step > 0 and np.all(np.diff(ms) == step):
+            return {'x0': str(values[0].astype('datetime64[ms]')),
+                    'dx': int(step)}
+    return {'x': ms.astype(np.float64)}
+
+
+def scatter(x, y, dtype=None, webgl_threshold=None, **kwargs):
+    """
+    ``go.Scatter`` (or ``go.Scattergl`` for large traces) with compact arrays.
+
+    :param x: x values, e.g. a DatetimeIndex.
+    :param y: y values.
+    :param dtype: y dtype; defaults to ``PAYLOAD_DTYPE``.
+    :param webgl_threshold: Point count above which WebGL is used; defaults
+        to ``WEBGL_THRESHOLD``.
+    :param kwargs: Passed on to the trace, e.g. ``name`` or ``mode``.
+    """
+    dtype = PAYLOAD_DTYPE if dtype is None else dtype
+    threshold = WEBGL_THRESHOLD if webgl_threshold is None else webgl_threshold
+    y = np.asarray(y, dtype=dtype)
+    trace = go.Scattergl if y.shape[0] > threshold else go.Scatter
+    return trace(y=y, **encode_x(x), **kwargs)
+
+
+def use_date_axis(fig):
+    """
+    Mark the x-axis as a date axis, so numeric x values from ``encode_x``
+    are shown as dates.
+    """
+    fig.update_xaxes(type='date')
+    return fig
+
+
+def figure_bytes(fig):
+    """
+    Size of the figure's JSON payload in bytes, as sent to the browser.
+    """
+    return len(fig.to_json().encode('utf-8'))
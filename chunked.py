@@ -0,0 +1,154 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from column_store import DEFAULT_STORE_DIR, ColumnStore
+from fused import DEFAULT_BLOCK, FUSED_COLUMNS, FusedPass
+
+# ----------------------------------------------------------
+# Out-of-core indicator computation
+#
+# ``compute_chunked`` runs the fused all-indicator pass over a series that
+# is never loaded whole.  Bars are read in chunks of ``chunk`` bars plus the
+# overlap the indicators need around them: the longest rolling window before
+# the chunk (52 + 26 bars for the Ichimoku spans by default, the Bollinger
+# and stochastic windows), and ``displacement`` bars after it for the chikou
+# line.  The exponential filters of RSI and MACD carry their state from one
+# chunk to the next inside FusedPass.  Each finished block is handed to a
+# sink straight away, so peak memory depends on the chunk size, not on the
+# length of the history.
+# ----------------------------------------------------------
+
+# Bars read from disk at a time (8 MiB per input column)
+DEFAULT_CHUNK = 2 ** 20
+
+
+def array_reader(high, low, close):
+    """
+    Reader over arrays already at hand (e.g. memory-mapped .npy files).
+    """
+    def read(lo, hi):
+        return high[lo:hi], low[lo:hi], close[lo:hi]
+    return close.shape[0], read
+
+
+def store_reader(store, ticker, interval='1d'):
+    """
+    Reader over a ColumnStore series that reads each chunk from disk.
+    """
+    def read(lo, hi):
+        bars = store.read_rows(ticker, interval, lo, hi,
+                               ('High', 'Low', 'Close'))
+        return bars['High'], bars['Low'], bars['Close']
+    return store.rows(ticker, interval), read
+
+
+class NpyWriter:
+    """
+    Sink writing the blocks one after the other into a ``(n, columns)``
+    .npy file, which ``np.load(path, mmap_mode='r')`` can map afterwards.
+
+    The file is written under a temporary name and moved into place by
+    ``close``, so an interrupted run leaves no partial output behind.
+
+    :param path: Output path.
+    :param n: Number of bars that will be written.
+    """
+
+    def __init__(self, path, n, columns=FUSED_COLUMNS):
+        self.path = path
+        self.n = n
+        self.rows = 0
+        self._tmp = path + '.tmp'
+        self._file = open(self._tmp, 'wb')
+        np.lib.format.write_array_header_2_0(self._file, {
+            'descr': '<f8', 'fortran_order': False,
+            'shape': (n, len(columns))})
+
+    def __call__(self, start, values):
+        if start != self.rows:
+            raise ValueError(f"expected block at bar {self.rows}, got {start}")
+        self._file.write(np.ascontiguousarray(values.T, dtype='<f8').tobytes())
+        self.rows += values.shape[1]
+
+    def close(self):
+        self._file.close()
+        if self.rows != self.n:
+            os.unlink(self._tmp)
+            raise ValueError(f"wrote {self.rows} of {self.n} bars")
+        os.replace(self._tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.unlink(self._tmp)
+
+
+def compute_chunked(source, sink, chunk=DEFAULT_CHUNK, block=DEFAULT_BLOCK,
+                    **params):
+    """
+    Fused indicators over a series streamed in chunks.
+
+    The values equal ``fused.compute_all`` with the same ``block``.
+
+    :param source: ``(n, read)`` where ``read(lo, hi)`` returns the High,
+        Low and Close arrays of bars ``[lo, hi)``; see ``store_reader`` and
+        ``array_reader``.
+    :param sink: Called as ``sink(start, values)`` for consecutive blocks,
+        ``values`` being a ``(len(FUSED_COLUMNS), size)`` array that is
+        reused for the next block.
+    :param chunk: Bars read per chunk; rounded up to a whole number of
+        blocks.
+    :param block: Bars per fused block.
+    :param params: Indicator parameters, as for ``fused.FusedPass``.
+    :return: Number of bars processed.
+    """
+    n, read = source
+    fused = FusedPass(n, **params)
+    chunk = max(-(-chunk // block), 1) * block
+    out = np.empty((len(FUSED_COLUMNS), min(block, n)))
+    for chunk_start in range(0, n, chunk):
+        chunk_stop = min(chunk_start + chunk, n)
+        lo, hi = fused.window(chunk_start, chunk_stop)
+        high, low, close = read(lo, hi)
+        for start in range(chunk_start, chunk_stop, block):
+            stop = min(start + block, chunk_stop)
+            values = out[:, :stop - start]
+            fused.block(high, low, close, lo, start, stop, values)
+            sink(start, values)
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compute all indicators for a long stored series in "
+                    "bounded memory.")
+    parser.add_argument('ticker')
+    parser.add_argument('output', help="Output .npy file (bars x columns).")
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK,
+                        help="Bars read from disk at a time.")
+    args = parser.parse_args(argv)
+
+    source = store_reader(ColumnStore(args.store_dir), args.ticker,
+                          args.interval)
+    started = time.perf_counter()
+    with NpyWriter(args.output, source[0]) as sink:
+        n = compute_chunked(source, sink, chunk=args.chunk)
+    elapsed = time.perf_counter() - started
+    print(f"{n} bars in {elapsed:.2f}s ({', '.join(FUSED_COLUMNS)})",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_cache import FileLock, OHLCV_COLUMNS, YahooProvider, normalize_bars
+
+# ----------------------------------------------------------
+# Memory-mapped columnar OHLCV store
+#
+# Each (ticker, interval) is a directory of fixed-width little-endian
+# columns: ``index.i8`` (int64 nanoseconds since the epoch) and one ``.f8``
+# float64 file per OHLCV field, plus ``meta.json`` holding the number of
+# committed rows.  Readers map the first ``rows`` elements of each file and
+# get plain NumPy views, so nothing is parsed or copied; the page cache is
+# shared between every process reading the same ticker.
+#
+# The store is append-only.  An append first writes the new rows past the
+# committed end of every column and syncs them, then replaces meta.json
+# atomically.  A reader that looks at meta.json before the replace sees the
+# old row count and never the half-written rows; rows left over from a
+# failed append are cut off by the next one.
+# ----------------------------------------------------------
+
+DEFAULT_STORE_DIR = os.environ.get(
+    'TI_STORE_DIR', os.path.join(os.path.expanduser('~'), '.cache',
+                                 'technical_indicators', 'store'))
+
+_INDEX_FILE = 'index.i8'
+_META_FILE = 'meta.json'
+_ITEM_SIZE = 8
+
+
+def _column_file(name):
+    return name + '.f8'
+
+
+def interval_length(interval):
+    """
+    Length of one bar for a yfinance interval string ("1m", "1h", "1d",
+    "1wk"; "1mo" counts as 31 days).
+    """
+    match = re.fullmatch(r'(\d+)(m|h|d|wk|mo)', interval)
+    if match is None:
+        raise ValueError(f"unsupported interval: {interval!r}")
+    count, unit = int(match.group(1)), match.group(2)
+    return {'m': pd.Timedelta(minutes=count), 'h': pd.Timedelta(hours=count),
+            'd': pd.Timedelta(days=count), 'wk': pd.Timedelta(weeks=count),
+            'mo': pd.Timedelta(days=31 * count)}[unit]
+
+
+class ColumnStore:
+    """
+    Append-only store of OHLCV bars with zero-copy reads.
+
+    :param root: Directory the ticker directories live in.
+    :param provider: Upstream source used by ``update``; defaults to
+        ``YahooProvider``.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, provider=None):
+        self.root = root
+        self.provider = provider if provider is not None else YahooProvider()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ticker, interval):
+        safe = re.sub(r'[^A-Za-z0-9._^-]', '_', f"{ticker.upper()}_{interval}")
+        return os.path.join(self.root, safe)
+
+    def rows(self, ticker, interval='1d'):
+        """
+        Number of committed rows.
+        """
+        try:
+            with open(os.path.join(self.path(ticker, interval),
+                                   _META_FILE)) as f:
+                return int(json.load(f)['rows'])
+        except FileNotFoundError:
+            return 0
+
+    def _map(self, directory, filename, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(directory, filename), dtype=dtype,
+                         mode='r', shape=(rows,))
+
+    def read(self, ticker, interval='1d', start=None, end=None):
+        """
+        Bars in ``[start, end)`` as read-only memory-mapped arrays.
+
+        :return: Dict with ``'index'`` (datetime64[ns]) and one float64 array
+            per OHLCV column; all are views of the files, not copies.
+        """
+        directory = self.path(ticker, interval)
+        rows = self.rows(ticker, interval)
+        index = self._map(directory, _INDEX_FILE, '<i8', rows)
+        lo, hi = 0, rows
+        if start is not None:
+            lo = int(np.searchsorted(index, pd.Timestamp(start).value))
+        if end is not None:
+            hi = int(np.searchsorted(index, pd.Timestamp(end).value))
+        bars = {'index': index[lo:hi].view('datetime64[ns]')}
+        for name in OHLCV_COLUMNS:
+            bars[name] = self._map(directory, _column_file(name), '<f8',
+                                   rows)[lo:hi]
+        return bars
+
+    def read_rows(self, ticker, interval, lo, hi, columns=OHLCV_COLUMNS):
+        """
+        Rows ``[lo, hi)`` of some columns, read into fresh arrays.
+
+        Unlike ``read`` nothing stays mapped, so a caller walking a long
+        history chunk by chunk holds only one chunk in memory.
+
+        :return: Dict mapping each column name to a float64 array.
+        """
+        directory = self.path(ticker, interval)
+        hi = min(hi, self.rows(ticker, interval))
+        count = max(hi - lo, 0)
+        return {name: np.fromfile(os.path.join(directory, _column_file(name)),
+                                  dtype='<f8', count=count,
+                                  offset=lo * _ITEM_SIZE) if count
+                else np.empty(0) for name in columns}
+
+    def frame(self, ticker, interval='1d', start=None, end=None):
+        """
+        ``read`` as a DataFrame (pandas may copy the columns).
+        """
+        bars = self.read(ticker, interval, start, end)
+        return pd.DataFrame({name: bars[name] for name in OHLCV_COLUMNS},
+                            index=pd.DatetimeIndex(bars['index'], name='Date'))
+
+    def last_timestamp(self, ticker, interval='1d'):
+        """
+        Timestamp of the newest stored bar, or None when there is none.
+        """
+        index = self.read(ticker, interval)['index']
+        return pd.Timestamp(index[-1]) if index.shape[0] else None
+
+    def append(self, ticker, interval, bars):
+        """
+        Append bars newer than the last stored one.
+
+        Bars at or before the last stored timestamp are ignored, since
+        stored rows are never rewritten.
+
+        :param bars: DataFrame of OHLCV bars (any shape ``normalize_bars``
+            accepts).
+        :return: Number of rows appended.
+        """
+        directory = self.path(ticker, interval)
+        os.makedirs(directory, exist_ok=True)
+        bars = normalize_bars(bars)
+        with FileLock(os.path.join(directory, '.lock')):
+            rows = self.rows(ticker, interval)
+            last = self.last_timestamp(ticker, interval)
+            if last is not None:
+                bars = bars[bars.index > last]
+            if bars.empty:
+                return 0
+            columns = {_INDEX_FILE: bars.index.astype('datetime64[ns]').asi8}
+            for name in OHLCV_COLUMNS:
+                columns[_column_file(name)] = bars[name].to_numpy(
+                    dtype=np.float64)
+            for filename, values in columns.items():
+                self._write_tail(os.path.join(directory, filename), rows,
+                                 values.astype(values.dtype.newbyteorder('<')))
+            self._commit(directory, rows + len(bars))
+        return len(bars)
+
+    @staticmethod
+    def _write_tail(path, rows, values):
+        # Drop anything past the committed rows (a failed append) and write
+        # the new rows after them
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+            f.truncate(rows * _ITEM_SIZE)
+            f.seek(rows * _ITEM_SIZE)
+            f.write(values.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _commit(directory, rows):
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.json.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'rows': rows}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, os.path.join(directory, _META_FILE))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def update(self, ticker, interval='1d', start=None, now=None):
+        """
+        Fetch and append the bars after the last stored one.
+
+        Only completed bars are appended: a bar whose period has not ended
+        by ``now`` would be stored before its final values are known.
+
+        :param start: Where to start when nothing is stored yet.
+        :param now: Current time; naive values are taken as UTC.
+        :return: Number of rows appended.
+        """
+        now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+        if now.tz is None:
+            now = now.tz_localize('UTC')
+        last = self.last_timestamp(ticker, interval)
+        if last is None:
+            if start is None:
+                raise ValueError(f"nothing stored for {ticker}; pass start")
+            fetch_from = pd.Timestamp(start)
+        else:
+            fetch_from = last + pd.Timedelta(1, 'ns')
+        length = interval_length(interval)
+        raw = self.provider.fetch(
+            ticker, fetch_from,
+            now.tz_convert('UTC').tz_localize(None) + pd.Timedelta(days=1),
+            interval)
+        # Stored timestamps are the provider's wall times with the zone
+        # dropped (exchange time for yfinance intraday bars, UTC dates for
+        # daily ones), so the cutoff is taken in that same zone
+        tz = getattr(getattr(raw, 'index', None), 'tz', None) or 'UTC'
+        cutoff = now.tz_convert(tz).tz_localize(None)
+        bars = normalize_bars(raw)
+        return self.append(ticker, interval,
+                           bars[bars.index + length <= cutoff])
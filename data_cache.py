@@ -0,0 +1,275 @@
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialised
+    fcntl = None
+
+# ----------------------------------------------------------
+# Range-aware local OHLCV cache
+#
+# Bars are kept on disk per (ticker, interval) as one .npz file of columns
+# (timestamps as int64 nanoseconds plus one float64 array per OHLCV field)
+# together with the list of [start, end) ranges that have already been
+# fetched.  A request only goes to the upstream provider for the parts of its
+# range that are not covered yet; the new bars are merged in and the file is
+# rewritten atomically.  Only ranges that came back with bars are recorded
+# as covered: an empty answer may be a failed download (``yf.download``
+# reports most errors by returning nothing), so it is asked for again next
+# time rather than cached as "no data".
+#
+# Filling gaps is a read-modify-write of the whole file, so it runs under a
+# per-file lock (a thread lock plus an flock on a ``.lock`` file next to it,
+# for screener worker processes), and the file is read again once the lock is
+# held.  Otherwise two requests that both miss would each write back only
+# their own bars and the last one would drop the other's.  Requests that are
+# fully covered never wait for the lock.
+# ----------------------------------------------------------
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'TI_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache',
+                                 'technical_indicators'))
+
+
+_THREAD_LOCKS = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+class FileLock:
+    """
+    Exclusive lock on ``path``, held by one thread of one process at a time.
+
+    :param path: Lock file; created if missing and left in place.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with _THREAD_LOCKS_GUARD:
+            self._thread_lock = _THREAD_LOCKS.setdefault(
+                os.path.abspath(path), threading.Lock())
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._file = open(self.path, 'a')
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        finally:
+            self._thread_lock.release()
+
+
+class YahooProvider:
+    """
+    Upstream bar source backed by ``yf.download``.
+
+    Any object with the same ``fetch`` method can be passed to ``BarCache``
+    instead, e.g. a local fake that serves bars from a DataFrame.  Failed
+    downloads must raise, so callers can retry them.
+    """
+
+    def fetch(self, ticker, start, end, interval):
+        """
+        :param ticker: Stock ticker symbol.
+        :param start: Inclusive start (``pd.Timestamp``).
+        :param end: Exclusive end (``pd.Timestamp``).
+        :param interval: yfinance interval string, e.g. "1d" or "1m".
+        :return: DataFrame of OHLCV bars indexed by timestamp.
+        :raises ConnectionError: If yfinance recorded an error for the
+            ticker (it does not raise on failed downloads itself).
+        """
+        import yfinance as yf
+        df = yf.download(ticker, start=start, end=end, interval=interval,
+                         progress=False)
+        errors = getattr(yf.shared, '_ERRORS', None) or {}
+        error = errors.get(ticker.upper(), errors.get(ticker))
+        if error:
+            raise ConnectionError(f"{ticker}: {error}")
+        return df
+
+
+def normalize_bars(df):
+    """
+    Reduce a provider frame to flat float64 OHLCV columns on a sorted,
+    tz-naive DatetimeIndex.
+
+    Single-ticker ``yf.download`` results carry a (field, ticker) column
+    MultiIndex and ``Ticker.history`` a tz-aware index; both are flattened so
+    cached frames look the same whichever call produced them.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, dtype=np.float64,
+                            index=pd.DatetimeIndex([], name='Date'))
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    out = pd.DataFrame(
+        {name: df[name].to_numpy(dtype=np.float64) if name in df
+         else np.full(len(df), np.nan) for name in OHLCV_COLUMNS},
+        index=pd.DatetimeIndex(df.index))
+    if out.index.tz is not None:
+        out.index = out.index.tz_localize(None)
+    out.index.name = 'Date'
+    out = out[~out.index.duplicated(keep='last')]
+    return out.sort_index()
+
+
+def period_to_range(period, now=None):
+    """
+    Turn a yfinance-style ``period`` ("5d", "6mo", "1y", "ytd", "max") into a
+    ``(start, end)`` pair of Timestamps so it can be served from the cache.
+    """
+    now = pd.Timestamp.now().normalize() if now is None else pd.Timestamp(now)
+    end = now + pd.Timedelta(days=1)
+    if period == 'max':
+        return pd.Timestamp('1970-01-01'), end
+    if period == 'ytd':
+        return pd.Timestamp(year=now.year, month=1, day=1), end
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if match is None:
+        raise ValueError(f"unsupported period: {period!r}")
+    count, unit = int(match.group(1)), match.group(2)
+    offset = {'d': pd.DateOffset(days=count), 'wk': pd.DateOffset(weeks=count),
+              'mo': pd.DateOffset(months=count),
+              'y': pd.DateOffset(years=count)}[unit]
+    return now - offset, end
+
+
+def _missing_ranges(covered, start, end):
+    gaps = []
+    cursor = start
+    for lo, hi in covered:
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return [tuple(r) for r in merged]
+
+
+class BarCache:
+    """
+    Persistent OHLCV cache keyed by ticker and interval.
+
+    :param root: Directory the cache files live in.
+    :param provider: Upstream source with a ``fetch(ticker, start, end,
+        interval)`` method; defaults to ``YahooProvider``.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, provider=None):
+        self.root = root
+        self.provider = provider if provider is not None else YahooProvider()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ticker, interval):
+        safe = re.sub(r'[^A-Za-z0-9._^-]', '_', f"{ticker.upper()}_{interval}")
+        return os.path.join(self.root, safe + '.npz')
+
+    def load(self, ticker, interval='1d'):
+        """
+        Return everything cached for a ticker as ``(bars, covered_ranges)``.
+        """
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            return normalize_bars(None), []
+        with np.load(path) as stored:
+            bars = pd.DataFrame(
+                {name: stored[name] for name in OHLCV_COLUMNS},
+                index=pd.DatetimeIndex(stored['index'].view('datetime64[ns]'),
+                                       name='Date'))
+            covered = [tuple(r) for r in stored['covered'].tolist()]
+        return bars, covered
+
+    def _store(self, ticker, interval, bars, covered):
+        path = self.path(ticker, interval)
+        columns = {name: bars[name].to_numpy(dtype=np.float64)
+                   for name in OHLCV_COLUMNS}
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.npz.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, index=bars.index.astype('datetime64[ns]').asi8,
+                         covered=np.asarray(covered, dtype=np.int64).reshape(-1, 2),
+                         **columns)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get(self, ticker, start, end, interval='1d'):
+        """
+        Bars for ``[start, end)``, fetching only the sub-ranges not cached yet.
+
+        The parts of the range that returned bars, up to the start of today,
+        are recorded as covered; today's bars are still forming, so they are
+        fetched again on the next call, and so is any gap the provider had no
+        bars for.
+        """
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end)
+        lo, hi = start.value, end.value
+        bars, covered = self.load(ticker, interval)
+        if _missing_ranges(covered, lo, hi):
+            with FileLock(self.path(ticker, interval) + '.lock'):
+                bars = self._fill(ticker, interval, lo, hi)
+        lo_pos, hi_pos = bars.index.searchsorted([start, end])
+        return bars.iloc[lo_pos:hi_pos].copy()
+
+    def _fill(self, ticker, interval, lo, hi):
+        # Called with the file's lock held: another request may have filled
+        # some of the gaps while this one waited, so start from the file again
+        bars, covered = self.load(ticker, interval)
+        gaps = _missing_ranges(covered, lo, hi)
+        if gaps:
+            fetched = [bars]
+            filled = []
+            for gap_lo, gap_hi in gaps:
+                new = normalize_bars(self.provider.fetch(
+                    ticker, pd.Timestamp(gap_lo), pd.Timestamp(gap_hi),
+                    interval))
+                if not new.empty:
+                    fetched.append(new)
+                    filled.append((gap_lo, gap_hi))
+            if not filled:
+                return bars
+            bars = pd.concat([f for f in fetched if not f.empty])
+            bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+            settled = pd.Timestamp.now().normalize().value
+            covered = _merge_ranges(
+                covered + [(g_lo, min(g_hi, settled)) for g_lo, g_hi in filled
+                           if g_lo < min(g_hi, settled)])
+            self._store(ticker, interval, bars, covered)
+        return bars
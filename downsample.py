@@ -0,0 +1,117 @@
+import numpy as np
+
+# ----------------------------------------------------------
+# Server-side downsampling for line charts
+#
+# A chart a few thousand pixels wide cannot show more points than that, so
+# long series are reduced before the figure is built.  Both methods keep the
+# first and last point; min/max bucketing keeps every local extreme, and
+# LTTB (largest triangle three buckets) keeps the points that carry the
+# visual shape.  Reduction is applied to the visible x-range only, so zooming
+# into a narrower window brings back full resolution.
+# ----------------------------------------------------------
+
+DEFAULT_MAX_POINTS = 2000
+
+
+def _as_numeric_x(x):
+    # Datetime indexes are compared as int64 nanoseconds
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').view(np.int64)
+    return x.astype(np.float64)
+
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the min and max of ``y`` in ``n_out // 2`` equal buckets,
+    plus the first and last point.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[0]
+    if n <= n_out:
+        return np.arange(n)
+    inner = y[1:-1]
+    n_buckets = max((n_out - 2) // 2, 1)
+    size = -(-inner.shape[0] // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:inner.shape[0]] = inner
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    # NaN never wins: it becomes +inf for the min and -inf for the max
+    lows = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    highs = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    picked = np.concatenate([lows + offsets, highs + offsets])
+    picked = picked[picked < inner.shape[0]] + 1
+    return np.unique(np.concatenate([[0], picked, [n - 1]]))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices chosen by Largest-Triangle-Three-Buckets.
+
+    LTTB walks the buckets in order (each pick depends on the previous one),
+    so very long inputs are first cut to ``4 * n_out`` points with
+    ``minmax_indices``; the loop then only runs over the ``n_out`` buckets.
+    """
+    x = _as_numeric_x(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[0]
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    if n > 8 * n_out:
+        pre = minmax_indices(y, 4 * n_out)
+        return pre[lttb_indices(x[pre], y[pre], n_out)]
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    edges = np.append(edges, n)
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2]
+        if hi <= lo:
+            out[i + 1] = a
+            continue
+        with np.errstate(invalid='ignore'):
+            avg_x = x[next_lo:next_hi].mean()
+            avg_y = np.nanmean(y[next_lo:next_hi]) if np.any(
+                ~np.isnan(y[next_lo:next_hi])) else y[a]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return np.unique(out)
+
+
+def downsample(x, y, max_points=DEFAULT_MAX_POINTS, method='lttb',
+               x_range=None):
+    """
+    Reduce one trace to at most about ``max_points`` points.
+
+    :param x: Sorted x values (e.g. a DatetimeIndex).
+    :param y: y values, same length as ``x``.
+    :param max_points: Point budget; ``None`` disables downsampling.
+    :param method: "lttb" or "minmax".
+    :param x_range: Optional ``(start, end)`` of the visible window; points
+        outside it are dropped before reducing.
+    :return: ``(x, y)`` for the trace.
+    """
+    y = np.asarray(y)
+    if x_range is not None:
+        xs = np.asarray(x)
+        bounds = np.asarray(x_range, dtype=xs.dtype)
+        lo = np.searchsorted(xs, bounds[0], side='left')
+        hi = np.searchsorted(xs, bounds[1], side='right')
+        x, y = x[lo:hi], y[lo:hi]
+    if max_points is None or y.shape[0] <= max_points:
+        return x, y
+    if method == 'lttb':
+        idx = lttb_indices(x, y, max_points)
+    elif method == 'minmax':
+        idx = minmax_indices(y, max_points)
+    else:
+        raise ValueError(f"unknown downsampling method: {method}")
+    return x[idx], y[idx]
@@ -0,0 +1,273 @@
+import argparse
+import random
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_cache import DEFAULT_CACHE_DIR, BarCache, YahooProvider, normalize_bars
+
+# ----------------------------------------------------------
+# Concurrent bar fetching
+#
+# Fetcher wraps an upstream provider (anything with ``fetch(ticker, start,
+# end, interval)``) and is itself a provider, so it can be handed to
+# BarCache.  Calls from any number of threads are limited to
+# ``max_concurrency`` downloads at a time and ``rate`` downloads per second,
+# failures are retried with exponential backoff, and a request identical to
+# one already in flight waits for that download instead of starting its own.
+# ``refresh`` fills a BarCache for a whole ticker list concurrently.
+# ----------------------------------------------------------
+
+
+class RateLimiter:
+    """
+    Token bucket: on average ``rate`` acquisitions per second, with bursts of
+    up to ``burst``.
+
+    Waiting callers reserve their slot before sleeping, so they are served in
+    the order they arrived.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Fetcher:
+    """
+    Rate-limited, retrying, request-coalescing wrapper around a provider.
+
+    :param provider: Upstream source with a ``fetch(ticker, start, end,
+        interval)`` method; defaults to ``YahooProvider``.
+    :param max_concurrency: Downloads allowed to run at the same time.
+    :param rate: Downloads started per second at most (``None``: no limit).
+    :param burst: Downloads that may start back to back before ``rate``
+        applies.
+    :param retries: Extra attempts after a failed download, i.e. one where
+        the provider raised (``YahooProvider`` raises for the errors
+        ``yf.download`` only records).
+    :param backoff: Delay before the first retry in seconds; doubled for every
+        further attempt, with random jitter.
+    :param max_backoff: Upper bound on the retry delay.
+    """
+
+    def __init__(self, provider=None, max_concurrency=8, rate=None, burst=1,
+                 retries=3, backoff=0.5, max_backoff=8.0):
+        self.provider = provider if provider is not None else YahooProvider()
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._limiter = RateLimiter(rate, burst) if rate else None
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {'requests': 0, 'downloads': 0, 'coalesced': 0,
+                      'retries': 0, 'failures': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        """
+        Download bars for ``[start, end)`` as a normalised DataFrame.
+
+        Blocks until the bars are available; raises the provider's last
+        error once all retries have failed.
+        """
+        key = (ticker.upper(), pd.Timestamp(start), pd.Timestamp(end), interval)
+        with self._lock:
+            self.stats['requests'] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            return future.result().copy()
+
+        try:
+            future.set_result(self._download(*key))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def _download(self, ticker, start, end, interval):
+        attempt = 0
+        while True:
+            with self._slots:
+                if self._limiter is not None:
+                    self._limiter.acquire()
+                self._count('downloads')
+                try:
+                    return normalize_bars(
+                        self.provider.fetch(ticker, start, end, interval))
+                except Exception:
+                    if attempt >= self.retries:
+                        self._count('failures')
+                        raise
+            # Back off outside the slot, so other tickers can use it meanwhile
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+            self._count('retries')
+
+    def fetch_many(self, tickers, start, end, interval='1d'):
+        """
+        Download several tickers concurrently.
+
+        :return: ``(frames, errors)``: dicts keyed by ticker with the bars of
+            every successful download and the exception of every failed one.
+        """
+        tickers = list(dict.fromkeys(t.strip().upper() for t in tickers
+                                     if t.strip()))
+        return _run_all(tickers, self.max_concurrency,
+                        lambda t: self.fetch(t, start, end, interval))
+
+
+def _run_all(tickers, workers, job):
+    frames, errors = {}, {}
+    if not tickers:
+        return frames, errors
+    with ThreadPoolExecutor(max_workers=min(workers, len(tickers))) as pool:
+        futures = {t: pool.submit(job, t) for t in tickers}
+        for ticker, future in futures.items():
+            try:
+                frames[ticker] = future.result()
+            except Exception as e:
+                errors[ticker] = e
+    return frames, errors
+
+
+def refresh(tickers, start, end, interval='1d', cache=None, fetcher=None):
+    """
+    Bring the bar cache up to date for many tickers at once.
+
+    Each ticker goes through ``cache.get``, so only the ranges it does not
+    hold yet are downloaded, and the downloads run concurrently through
+    ``fetcher``.
+
+    :param cache: BarCache to fill; defaults to one in ``DEFAULT_CACHE_DIR``.
+    :param fetcher: Fetcher used for the downloads; defaults to a Fetcher
+        around the cache's current provider.
+    :return: ``(frames, errors)`` as for ``Fetcher.fetch_many``.
+    """
+    cache = cache if cache is not None else BarCache()
+    if fetcher is None:
+        fetcher = (cache.provider if isinstance(cache.provider, Fetcher)
+                   else Fetcher(cache.provider))
+    cache = BarCache(cache.root, fetcher)
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers
+                                 if t.strip()))
+    return _run_all(tickers, fetcher.max_concurrency,
+                    lambda t: cache.get(t, start, end, interval))
+
+
+# ----------------------------------------------------------
+# Offline stand-in
+# ----------------------------------------------------------
+
+
+class SyntheticProvider:
+    """
+    Provider that makes up daily random-walk bars after a fixed delay, for
+    benchmarking the fetch path without network access.
+
+    :param latency: Seconds each ``fetch`` call sleeps, like a round trip.
+    :param failure_rate: Fraction of calls that raise ``ConnectionError``.
+    :param seed: Seed for the failures; bars depend only on the ticker.
+    """
+
+    def __init__(self, latency=0.2, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise ConnectionError(f"simulated failure for {ticker}")
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1),
+                               name='Date')
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, len(index))))
+        spread = close * rng.uniform(0.0, 0.02, len(index))
+        return pd.DataFrame({'Open': close, 'High': close + spread,
+                             'Low': close - spread, 'Close': close,
+                             'Volume': rng.integers(100_000, 10_000_000, len(index))},
+                            index=index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Download bars for many tickers into the bar cache.")
+    parser.add_argument('tickers', nargs='*', help="Ticker symbols.")
+    parser.add_argument('--universe', help="File with one ticker per line.")
+    parser.add_argument('--start', required=True, help="Start date (YYYY-MM-DD).")
+    parser.add_argument('--end', default=None,
+                        help="End date, exclusive (default: tomorrow).")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=None,
+                        help="Downloads per second at most.")
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--synthetic', type=float, default=None,
+                        metavar='LATENCY',
+                        help="Use made-up bars with this many seconds of "
+                             "latency per request instead of Yahoo Finance.")
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.universe:
+        with open(args.universe) as f:
+            tickers += [line.split('#')[0] for line in f]
+    if not tickers:
+        parser.error("no tickers given")
+    end = args.end or (pd.Timestamp.now().normalize() + pd.Timedelta(days=1))
+
+    provider = (SyntheticProvider(args.synthetic)
+                if args.synthetic is not None else None)
+    fetcher = Fetcher(provider, max_concurrency=args.concurrency,
+                      rate=args.rate, retries=args.retries)
+    started = time.perf_counter()
+    frames, errors = refresh(tickers, args.start, end, args.interval,
+                             cache=BarCache(args.cache_dir), fetcher=fetcher)
+    elapsed = time.perf_counter() - started
+    for ticker, error in errors.items():
+        print(f"{ticker}: {error}", file=sys.stderr)
+    print(f"{len(frames) + len(errors)} tickers ({len(errors)} failed) in "
+          f"{elapsed:.2f}s, {fetcher.stats['downloads']} downloads, "
+          f"{fetcher.stats['retries']} retries", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
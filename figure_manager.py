@@ -0,0 +1,177 @@
+import weakref
+from collections import OrderedDict
+
+from matplotlib.figure import Figure
+
+# ----------------------------------------------------------
+# Matplotlib figure lifecycle
+#
+# pyplot keeps every figure made with plt.subplots / plt.figure in a global
+# registry until plt.close is called, so a long-running server that builds a
+# new figure per rerun grows without bound.  FigureManager creates figures
+# with the pyplot-free Figure class, builds each one once per key and from
+# then on only swaps the data of its existing artists (``set_line``).
+# Figures beyond ``max_figures`` are evicted least recently used first, and
+# ``close`` / ``close_all`` release them explicitly.
+# ----------------------------------------------------------
+
+# Every figure created by a manager and not closed yet.  Weak, so figures of
+# a manager that is dropped without close_all (e.g. an expired Streamlit
+# session) are still garbage collected.
+_live_figures = weakref.WeakSet()
+
+
+def live_figure_count():
+    """
+    Number of figures created by any FigureManager that are still open.
+    """
+    return len(_live_figures)
+
+
+def _close(fig):
+    fig.clear()
+    _live_figures.discard(fig)
+
+
+class FigureManager:
+    """
+    Reusable figures, keyed by name.
+
+    One manager should be used from one thread at a time (e.g. one per
+    Streamlit session), since its figures are updated in place.
+
+    :param max_figures: Open figures kept before the least recently used one
+        is closed.
+    """
+
+    def __init__(self, max_figures=8):
+        self.max_figures = max_figures
+        self._figures = OrderedDict()
+
+    def __len__(self):
+        return len(self._figures)
+
+    def __contains__(self, key):
+        return key in self._figures
+
+    def get(self, key, build, figsize=None):
+        """
+        Figure and artists for ``key``, built on first use.
+
+        :param key: Hashable figure name, e.g. the indicator.
+        :param build: Callable ``build(fig)`` that adds the axes and artists
+            to a new, empty figure and returns them (e.g. a dict of lines).
+        :param figsize: Figure size in inches, used when the figure is built.
+        :return: ``(fig, artists)``; ``artists`` is whatever ``build``
+            returned.
+        """
+        entry = self._figures.get(key)
+        if entry is not None:
+            self._figures.move_to_end(key)
+            return entry
+        fig = Figure(figsize=figsize)
+        entry = self._figures[key] = (fig, build(fig))
+        _live_figures.add(fig)
+        while len(self._figures) > self.max_figures:
+            _, (old, _) = self._figures.popitem(last=False)
+            _close(old)
+        return entry
+
+    def close(self, key):
+        """
+        Close the figure for ``key``, if there is one.
+        """
+        entry = self._figures.pop(key, None)
+        if entry is not None:
+            _close(entry[0])
+
+    def close_all(self):
+        """
+        Close every figure held by this manager.
+        """
+        while self._figures:
+            _, (fig, _) = self._figures.popitem()
+            _close(fig)
+
+
+def managed_figure(figures, key, build, figsize=None):
+    """
+    ``figures.get(key, build, figsize)``, or a one-off figure when
+    ``figures`` is None.
+    """
+    if figures is None:
+        fig = Figure(figsize=figsize)
+        return fig, build(fig)
+    return figures.get(key, build, figsize)
+
+
+# ----------------------------------------------------------
+# Updating artists in place
+# ----------------------------------------------------------
+
+
+def set_line(line, x, y):
+    """
+    Replace the data of a Line2D.
+
+    Lines built empty leave the x-axis without units, so they are set from
+    ``x`` first; dates are then converted the same way ``ax.plot`` would.
+    """
+    line.axes.xaxis.update_units(x)
+    line.set_data(x, y)
+
+
+def rescale(ax):
+    """
+    Fit the view of ``ax`` to the data its artists hold now.
+    """
+    ax.relim()
+    ax.autoscale_view()
+
+
+# ----------------------------------------------------------
+# Blitted redraws
+# ----------------------------------------------------------
+
+
+class BlitRedraw:
+    """
+    Redraw a few artists on an interactive canvas without redrawing the rest.
+
+    The artists are marked animated, so a full draw renders everything else
+    (axes, ticks, legend); that background is saved on every full draw and
+    later updates only paste it back, draw the artists and blit.  A full draw
+    is still needed whenever something outside the artists changes, such as
+    the axis limits.
+
+    :param canvas: Interactive canvas (e.g. FigureCanvasTkAgg).
+    :param artists: Artists that change between updates.
+    """
+
+    def __init__(self, canvas, artists):
+        self.canvas = canvas
+        self.artists = list(artists)
+        self._background = None
+        for artist in self.artists:
+            artist.set_animated(True)
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+
+    def update(self, full=False):
+        """
+        Show the artists' current state; ``full=True`` redraws everything.
+        """
+        if full or self._background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+from indicators import as_float_array
+
+# ----------------------------------------------------------
+# Fused all-indicator pass
+#
+# ``compute_all`` produces all five indicators in one walk over the OHLCV
+# arrays.  The series is processed in blocks of a few thousand bars; each
+# block's prices are read from memory once and every indicator is advanced
+# over the block while its inputs and temporaries are still in cache.  The
+# exponential filters (MACD EMAs, Wilder averages) carry their last value
+# from block to block, and the rolling windows (High/Low extremes, Bollinger
+# moments, %K / %D smoothing) re-read just enough bars before the block to
+# fill their windows.  Results are written straight into one preallocated
+# (columns x bars) output array.
+#
+# A block only reads a bounded window of bars around it, so FusedPass can
+# also be driven from chunks read off disk (chunked.py).
+# ----------------------------------------------------------
+
+FUSED_COLUMNS = (
+    'rsi',
+    'macd', 'macd_signal',
+    'stoch_k', 'stoch_d',
+    'tenkan_sen', 'kijun_sen', 'senkou_span_a', 'senkou_span_b',
+    'chikou_span',
+    'bb_sma', 'bb_upper', 'bb_lower',
+)
+
+# Bars per block: long enough that the per-block NumPy call overhead is
+# small, short enough that a block's temporaries (256 kB each) stay in L2/L3
+DEFAULT_BLOCK = 32768
+
+
+def _ema_continue(x, alpha, prev, out):
+    # EMA of one block, continuing from the previous block's last value
+    # (NaN while the filter has not started yet)
+    if np.isnan(prev):
+        indicators.ema(x, alpha=alpha, out=out)
+    else:
+        np.multiply(x, alpha, out=out)
+        out[0] += (1.0 - alpha) * prev
+        indicators.exponential_scan(out, 1.0 - alpha)
+    return out[-1] if out.shape[0] else prev
+
+
+def _midpoint(extremes, skip, out):
+    highest, lowest = extremes
+    np.add(highest[skip:], lowest[skip:], out=out)
+    out *= 0.5
+    return out
+
+
+class FusedPass:
+    """
+    State of a fused pass: the indicator parameters and the exponential
+    filters carried from one block to the next.
+
+    Blocks must be fed in order.  ``block`` only needs the bars from
+    ``lookback`` before the block to ``lookahead`` after it, so the series
+    can be streamed from disk (see chunked.py) as well as held in memory.
+
+    :param n: Length of the whole series.
+    """
+
+    def __init__(self, n, rsi_period=14, fast=12, slow=26, signal=9,
+                 stoch_window=14, smooth_k=3, smooth_d=3, tenkan=9, kijun=26,
+                 senkou=52, displacement=26, bb_window=20, bb_std=2):
+        self.n = n
+        self.stoch = (stoch_window, smooth_k, smooth_d)
+        self.ichimoku = (tenkan, kijun, senkou, displacement)
+        self.bb = (bb_window, bb_std)
+        self.rsi_alpha = 1.0 / rsi_period
+        self.fast_alpha, self.slow_alpha = 2.0 / (fast + 1.0), 2.0 / (slow + 1.0)
+        self.signal_alpha = 2.0 / (signal + 1.0)
+        self.avg_gain = self.avg_loss = np.nan
+        self.fast_ema = self.slow_ema = self.signal_ema = np.nan
+        # Bars before a block that its rolling windows need to be full (the
+        # senkou spans are the midpoints of ``displacement`` bars earlier),
+        # and bars after it that the chikou line looks ahead to
+        self.lookback = max(max(tenkan, kijun, senkou) + displacement,
+                            bb_window,
+                            stoch_window + smooth_k + smooth_d - 2) - 1
+        self.lookahead = displacement
+        self._buf = np.empty((4, 0))
+
+    def window(self, start, stop):
+        """
+        Bars ``[lo, hi)`` that ``block`` needs for the block ``[start, stop)``.
+        """
+        return (max(start - self.lookback, 0),
+                min(stop + self.lookahead, self.n))
+
+    def block(self, high, low, close, base, start, stop, out):
+        """
+        Compute bars ``[start, stop)`` of every indicator.
+
+        :param high: High prices of bars ``[base, ...)``, covering at least
+            ``window(start, stop)``; likewise ``low`` and ``close``.
+        :param base: Bar number of the first element of the price arrays.
+        :param out: Float64 array of shape ``(len(FUSED_COLUMNS),
+            stop - start)``; row ``i`` receives ``FUSED_COLUMNS[i]``.
+        """
+        (rsi, macd_line, macd_signal, stoch_k, stoch_d, tenkan_sen, kijun_sen,
+         span_a, span_b, chikou, sma, upper, lower) = out
+        stoch_window, smooth_k, smooth_d = self.stoch
+        tenkan, kijun, senkou, displacement = self.ichimoku
+        bb_window, bb_std = self.bb
+        size = stop - start
+        if self._buf.shape[1] < size:
+            self._buf = np.empty((4, size))
+        gain, loss, fast_tmp, slow_tmp = self._buf[:, :size]
+        head, tail = self.window(start, stop)
+        skip = start - head
+        c = close[start - base:stop - base]
+
+        # RSI: Wilder averages of gains and losses
+        if start == 0:
+            gain[0] = np.nan
+        else:
+            gain[0] = c[0] - close[start - 1 - base]
+        np.subtract(c[1:], c[:-1], out=gain[1:])
+        np.negative(gain, out=loss)
+        np.maximum(gain, 0.0, out=gain)
+        np.maximum(loss, 0.0, out=loss)
+        self.avg_gain = _ema_continue(gain, self.rsi_alpha, self.avg_gain, gain)
+        self.avg_loss = _ema_continue(loss, self.rsi_alpha, self.avg_loss, loss)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(gain, loss, out=rsi)
+        rsi += 1.0
+        np.divide(100.0, rsi, out=rsi)
+        np.subtract(100.0, rsi, out=rsi)
+
+        # MACD
+        self.fast_ema = _ema_continue(c, self.fast_alpha, self.fast_ema,
+                                      fast_tmp)
+        self.slow_ema = _ema_continue(c, self.slow_alpha, self.slow_ema,
+                                      slow_tmp)
+        np.subtract(fast_tmp, slow_tmp, out=macd_line)
+        self.signal_ema = _ema_continue(macd_line, self.signal_alpha,
+                                        self.signal_ema, macd_signal)
+
+        # Rolling High/Low extremes over the block plus its lookback, shared
+        # by the stochastic and Ichimoku
+        h = high[head - base:stop - base]
+        lo = low[head - base:stop - base]
+        cl = close[head - base:stop - base]
+        extrema = indicators.rolling_extrema(
+            h, lo, (stoch_window, tenkan, kijun, senkou))
+
+        highest, lowest = extrema[stoch_window]
+        raw = highest - lowest
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(cl - lowest, raw, out=raw)
+        raw *= 100.0
+        k = indicators.rolling_mean(raw, smooth_k)
+        stoch_k[:] = k[skip:]
+        stoch_d[:] = indicators.rolling_mean(k, smooth_d)[skip:]
+
+        t = _midpoint(extrema[tenkan], 0, np.empty(h.shape[0]))
+        kj = _midpoint(extrema[kijun], 0, np.empty(h.shape[0]))
+        tenkan_sen[:] = t[skip:]
+        kijun_sen[:] = kj[skip:]
+        # Spans: the midpoints of ``displacement`` bars earlier, NaN for the
+        # first ``displacement`` bars of the series
+        first = min(max(displacement - start, 0), size)
+        span_a[:first] = np.nan
+        span_b[:first] = np.nan
+        if first < size:
+            lag = skip - displacement + first
+            a = span_a[first:]
+            np.add(t[lag:lag + size - first], kj[lag:lag + size - first],
+                   out=a)
+            a *= 0.5
+            _midpoint(extrema[senkou], lag, t[:h.shape[0] - lag])
+            span_b[first:] = t[:size - first]
+        # Chikou: the close ``displacement`` bars later, NaN at the end
+        ahead = min(max(tail - start - displacement, 0), size)
+        chikou[:ahead] = close[start + displacement - base:
+                               start + displacement + ahead - base]
+        chikou[ahead:] = np.nan
+
+        # Bollinger Bands
+        mean, var = indicators.rolling_mean_var(cl, bb_window)
+        sma[:] = mean[skip:]
+        np.sqrt(var[skip:], out=lower)
+        lower *= bb_std
+        np.add(sma, lower, out=upper)
+        np.subtract(sma, lower, out=lower)
+
+
+def compute_all(high, low, close, block=DEFAULT_BLOCK, out=None, **params):
+    """
+    Every indicator in one blocked pass over the prices.
+
+    The results match the individual kernels in indicators.py (to rounding
+    for the Bollinger moments, which are re-centred per block).
+
+    :param high: High prices.
+    :param low: Low prices.
+    :param close: Close prices.
+    :param block: Bars per block.
+    :param out: Optional float64 array of shape ``(len(FUSED_COLUMNS), n)``.
+    :param params: Indicator parameters, as for ``FusedPass``.
+    :return: The output array; row ``i`` holds ``FUSED_COLUMNS[i]``.
+    """
+    high = as_float_array(high)
+    low = as_float_array(low)
+    close = as_float_array(close)
+    n = close.shape[0]
+    shape = (len(FUSED_COLUMNS), n)
+    if out is None:
+        out = np.empty(shape)
+    elif out.shape != shape or out.dtype != np.float64:
+        raise ValueError(
+            f"out buffer must be float64 with shape {shape}, "
+            f"got {out.dtype} with shape {out.shape}")
+    fused = FusedPass(n, **params)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        fused.block(high, low, close, 0, start, stop, out[:, start:stop])
+    return out
+
+
+def compute_frame(df, **params):
+    """
+    ``compute_all`` on a DataFrame's 'High', 'Low' and 'Close' columns, as a
+    DataFrame with one column per ``FUSED_COLUMNS`` entry.
+    """
+    out = compute_all(indicators.column(df, 'High'),
+                      indicators.column(df, 'Low'),
+                      indicators.column(df, 'Close'), **params)
+    return pd.DataFrame(out.T, index=df.index, columns=list(FUSED_COLUMNS))
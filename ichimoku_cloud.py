@@ -1,6 +1,6 @@
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
+from data_cache import BarCache, period_to_range
 
 def ichimoku_cloud(df):
     high_9 = df['High'].rolling(window=9).max()
@@ -23,7 +23,8 @@ def ichimoku_cloud(df):
 
 # === Example with real data ===
 ticker = 'AAPL'
-data = yf.download(ticker, period='6mo', interval='1d')
+start, end = period_to_range('6mo')
+data = BarCache().get(ticker, start, end, interval='1d')
 df = ichimoku_cloud(data)
 
 # === Plotting ===
@@ -0,0 +1,485 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ----------------------------------------------------------
+# Pure NumPy indicator kernels
+#
+# Every kernel takes 1-D arrays and returns 1-D float64 arrays of the same
+# length, with NaN where the indicator is not yet defined (the same warm-up
+# the pandas versions in app.py produce).  Inputs are converted to
+# contiguous float64 once; callers that already hold such arrays pay no
+# copy.  Every kernel accepts an optional ``out=`` buffer (or tuple of
+# buffers for multi-output indicators) so batch jobs can reuse memory.
+# ----------------------------------------------------------
+
+# Once the decay factor of an exponential filter falls below this, older
+# observations no longer change the result at float64 precision.
+DECAY_EPS = 1e-18
+
+# Bars per block for the rolling mean / variance kernel (at least four
+# windows long).  Bounds both the rounding error and the re-centring overhead.
+BLOCK_LEN = 256
+
+
+def as_float_array(x):
+    """
+    Return ``x`` as a contiguous 1-D float64 array, copying only if needed.
+    """
+    arr = np.ascontiguousarray(x, dtype=np.float64)
+    if arr.ndim != 1:
+        arr = arr.reshape(-1)
+    return arr
+
+
+def column(df, name):
+    """
+    Pull one OHLCV column out of a DataFrame as a float64 array.
+
+    yfinance returns single-ticker downloads with MultiIndex columns, so
+    ``df[name]`` may be a one-column DataFrame; both shapes are accepted.
+    """
+    return as_float_array(df[name].to_numpy())
+
+
+def out_buffer(out, n):
+    """
+    The ``out=`` buffer of a kernel: ``out`` checked to be a float64 array
+    of ``n`` values, or a new one.
+    """
+    if out is None:
+        return np.empty(n, dtype=np.float64)
+    if out.shape != (n,) or out.dtype != np.float64:
+        raise ValueError(
+            f"out buffer must be float64 with shape ({n},), "
+            f"got {out.dtype} with shape {out.shape}")
+    return out
+
+
+def out_buffers(out, n, count):
+    """
+    ``out_buffer`` for kernels with ``count`` outputs.
+    """
+    if out is None:
+        return tuple(np.empty(n, dtype=np.float64) for _ in range(count))
+    if len(out) != count:
+        raise ValueError(f"expected {count} out buffers, got {len(out)}")
+    return tuple(out_buffer(o, n) for o in out)
+
+
+def _first_valid(x):
+    valid = np.flatnonzero(~np.isnan(x))
+    return int(valid[0]) if valid.size else x.shape[0]
+
+
+# ----------------------------------------------------------
+# Building blocks
+# ----------------------------------------------------------
+
+
+def exponential_scan(y, decay):
+    """
+    In-place prefix scan ``y[..., t] += decay * y[..., t-1]`` along the last
+    axis, i.e. the recursion behind every EMA.
+
+    It runs in log-steps: after the pass with lag ``k`` each value holds its
+    own first ``2k`` terms, and passes stop once ``decay ** k`` no longer
+    matters at float64 precision.  ``decay`` is a scalar, or an array such as
+    shape ``(rows, 1)`` that gives each row of a 2-D ``y`` its own factor.
+    """
+    factor = np.asarray(decay, dtype=np.float64)
+    step = 1
+    while step < y.shape[-1] and np.max(factor) > DECAY_EPS:
+        y[..., step:] += factor * y[..., :-step]
+        factor = factor * factor
+        step *= 2
+    return y
+
+
+def scan_reach(decay):
+    """
+    Number of inputs each value of ``exponential_scan(y, decay)`` is built
+    from on a long series: earlier ones are below ``DECAY_EPS``.
+    """
+    step = 1
+    while decay > DECAY_EPS:
+        decay *= decay
+        step *= 2
+    return step
+
+
+def moments_block(window):
+    """
+    Block length the rolling mean / variance kernel re-centres by for a
+    given window; blocks start at multiples of it from the series start.
+    """
+    return max(BLOCK_LEN, 4 * window)
+
+
+def ema(x, span=None, alpha=None, out=None):
+    """
+    Exponential moving average, equal to ``Series.ewm(adjust=False).mean()``.
+
+    The recursion ``y[t] = (1 - alpha) * y[t-1] + alpha * x[t]`` is seeded
+    with the first non-NaN value and evaluated with ``exponential_scan``, so
+    the work is done in a handful of vectorised passes instead of a Python
+    loop over bars.  NaNs are only supported as a leading warm-up.
+
+    :param x: Input series.
+    :param span: EMA span; ``alpha = 2 / (span + 1)``.
+    :param alpha: Smoothing factor, used instead of ``span``.
+    :param out: Optional float64 output buffer.
+    :return: EMA array.
+    """
+    if (span is None) == (alpha is None):
+        raise ValueError("pass exactly one of span or alpha")
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    if not 0.0 < alpha <= 1.0:
+        raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+    x = as_float_array(x)
+    out = out_buffer(out, x.shape[0])
+
+    start = _first_valid(x)
+    out[:start] = np.nan
+    y = out[start:]
+    if y.size == 0:
+        return out
+    seed = x[start]
+    np.multiply(x[start:], alpha, out=y)
+    y[0] = seed
+    exponential_scan(y, 1.0 - alpha)
+    return out
+
+
+def _rolling_moments(x, window, ddof, min_periods, mean_out, var_out):
+    # Running sums over a window are O(n) but drift when taken over the whole
+    # history.  Instead the series is cut into blocks; each block is re-centred
+    # on its own mean (together with the ``window - 1`` bars of overlap it needs
+    # from the previous block) and its window sums are taken as differences of
+    # block-local prefix sums.  Rounding error is then bounded by the block
+    # length and the local price range, not by the length of the series.
+    n = x.shape[0]
+    if min_periods is None:
+        min_periods = window
+    if window < 1 or not 0 <= min_periods <= window:
+        raise ValueError(
+            f"need window >= 1 and 0 <= min_periods <= window, "
+            f"got window={window}, min_periods={min_periods}")
+    if n == 0:
+        return
+    block = moments_block(window)
+    n_blocks = -(-n // block)
+    seg_len = block + window - 1
+
+    # Pad with ``window - 1`` empty bars in front so the first windows are
+    # short (expanding warm-up) and up to a whole number of blocks at the back.
+    padded = np.zeros(n_blocks * block + window - 1)
+    counted = np.zeros(padded.shape[0])
+    valid = np.isfinite(x)
+    padded[window - 1:window - 1 + n] = np.where(valid, x, 0.0)
+    counted[window - 1:window - 1 + n] = valid
+
+    segs = sliding_window_view(padded, seg_len)[::block]
+    seg_counts = sliding_window_view(counted, seg_len)[::block]
+    n_valid = seg_counts.sum(axis=1)
+    centre = np.divide(segs.sum(axis=1), n_valid,
+                       out=np.zeros(n_blocks), where=n_valid > 0)
+
+    dev = segs - centre[:, None]
+    dev *= seg_counts
+
+    def window_sums(values):
+        prefix = np.zeros((n_blocks, seg_len + 1))
+        np.cumsum(values, axis=1, out=prefix[:, 1:])
+        return (prefix[:, window:] - prefix[:, :-window]).reshape(-1)[:n]
+
+    count = window_sums(seg_counts)
+    s1 = window_sums(dev)
+    enough = count >= max(min_periods, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_dev = s1 / count
+        if mean_out is not None:
+            np.add(mean_dev, np.repeat(centre, block)[:n], out=mean_out)
+            mean_out[~enough] = np.nan
+        if var_out is not None:
+            dev *= dev
+            s2 = window_sums(dev)
+            s2 -= s1 * mean_dev
+            np.maximum(s2, 0.0, out=s2)
+            np.divide(s2, count - ddof, out=var_out)
+            var_out[~enough | (count - ddof <= 0)] = np.nan
+
+
+def rolling_mean_var(x, window, ddof=1, min_periods=None, out=None):
+    """
+    Rolling mean and variance in a single O(n) pass.
+
+    NaN and infinite values are skipped and a window only produces a value
+    once it holds at least ``min_periods`` observations, like
+    ``Series.rolling``.
+
+    :param x: Input series.
+    :param window: Window length in bars.
+    :param ddof: Delta degrees of freedom; 1 gives the sample variance used by
+        pandas, 0 the population variance used by ``np.std``.
+    :param min_periods: Warm-up policy.  ``None`` (the default) waits for a
+        full window; smaller values emit expanding-window values from the
+        first ``min_periods`` bars on.
+    :param out: Optional ``(mean, var)`` float64 output buffers.
+    :return: ``(mean, var)``.
+    """
+    x = as_float_array(x)
+    mean, var = out_buffers(out, x.shape[0], 2)
+    _rolling_moments(x, window, ddof, min_periods, mean, var)
+    return mean, var
+
+
+def rolling_mean(x, window, min_periods=None, out=None):
+    """
+    Simple moving average, like ``Series.rolling(window).mean()``.
+    """
+    x = as_float_array(x)
+    out = out_buffer(out, x.shape[0])
+    _rolling_moments(x, window, 0, min_periods, out, None)
+    return out
+
+
+def rolling_std(x, window, ddof=1, min_periods=None, out=None):
+    """
+    Rolling standard deviation, like ``Series.rolling(window).std(ddof)``.
+    """
+    x = as_float_array(x)
+    out = out_buffer(out, x.shape[0])
+    _rolling_moments(x, window, ddof, min_periods, None, out)
+    return np.sqrt(out, out=out)
+
+
+def _running_extreme(x, window, ufunc, out=None):
+    # van Herk / Gil-Werman: cut the series into blocks of ``window`` bars and
+    # take running extremes forwards and backwards inside each block.  Any
+    # window then spans at most two blocks, so its extreme is one comparison
+    # of a suffix value and a prefix value: O(n) whatever the window length.
+    n = x.shape[0]
+    out = out_buffer(out, n)
+    out[:window - 1] = np.nan
+    if n < window:
+        return out
+    n_blocks = -(-n // window)
+    padded = np.full(n_blocks * window, np.nan)
+    padded[:n] = x
+    blocks = padded.reshape(n_blocks, window)
+    prefix = ufunc.accumulate(blocks, axis=1).reshape(-1)
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1)
+    ufunc(suffix[:n - window + 1], prefix[window - 1:n], out=out[window - 1:])
+    return out
+
+
+def _rolling_extremes(x, windows, ufunc):
+    # Extremes are idempotent, so a window of ``w`` bars is covered by two
+    # overlapping windows of any ``v >= w / 2`` bars.  Only the shortest
+    # window is computed from the data; each longer one costs a single
+    # element-wise comparison against an already computed shorter one.
+    results = {}
+    for window in sorted(set(windows)):
+        if window < 1:
+            raise ValueError(f"window must be >= 1, got {window}")
+        base = next((v for v in sorted(results) if 2 * v >= window), None)
+        if base is None:
+            results[window] = _running_extreme(x, window, ufunc)
+            continue
+        lag = window - base
+        prev = results[base]
+        out = np.full(x.shape[0], np.nan)
+        ufunc(prev[lag:], prev[:-lag], out=out[lag:])
+        results[window] = out
+    return results
+
+
+def rolling_extrema(high, low, windows):
+    """
+    Rolling highest high and lowest low for several window lengths at once.
+
+    Each window yields NaN until it is full and whenever it contains a NaN,
+    like ``Series.rolling(window).max()`` / ``.min()``.
+
+    :param high: High prices.
+    :param low: Low prices.
+    :param windows: Iterable of window lengths, e.g. ``(9, 26, 52)``.
+    :return: Dict mapping each window to ``(highest_high, lowest_low)``.
+    """
+    high = as_float_array(high)
+    low = as_float_array(low)
+    highs = _rolling_extremes(high, windows, np.maximum)
+    lows = _rolling_extremes(low, windows, np.minimum)
+    return {w: (highs[w], lows[w]) for w in highs}
+
+
+def rolling_max(x, window, out=None):
+    x = as_float_array(x)
+    return _running_extreme(x, window, np.maximum, out)
+
+
+def rolling_min(x, window, out=None):
+    x = as_float_array(x)
+    return _running_extreme(x, window, np.minimum, out)
+
+
+def shift(x, periods, out=None):
+    """
+    Shift ``x`` by ``periods`` bars (negative looks ahead), padding with NaN,
+    like ``Series.shift``.
+    """
+    x = as_float_array(x)
+    n = x.shape[0]
+    out = out_buffer(out, n)
+    if periods >= 0:
+        k = min(periods, n)
+        out[k:] = x[:n - k]
+        out[:k] = np.nan
+    else:
+        k = min(-periods, n)
+        out[:n - k] = x[k:]
+        out[n - k:] = np.nan
+    return out
+
+
+# ----------------------------------------------------------
+# Indicators
+# ----------------------------------------------------------
+
+
+def rsi(close, period=14, out=None):
+    """
+    Relative Strength Index with Wilder's smoothing (an EMA with
+    ``alpha = 1 / period``), matching ``plot_rsi`` in app.py.
+    """
+    close = as_float_array(close)
+    n = close.shape[0]
+    out = out_buffer(out, n)
+    if n == 0:
+        return out
+
+    delta = np.empty(n)
+    delta[0] = np.nan
+    np.subtract(close[1:], close[:-1], out=delta[1:])
+    gain = np.maximum(delta, 0.0)
+    loss = np.maximum(-delta, 0.0)
+    avg_gain = ema(gain, alpha=1.0 / period, out=gain)
+    avg_loss = ema(loss, alpha=1.0 / period, out=loss)
+
+    # RSI = 100 - 100 / (1 + gain / loss), kept in the same form as app.py so
+    # flat stretches give the same inf / NaN handling.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(avg_gain, avg_loss, out=out)
+    out += 1.0
+    np.divide(100.0, out, out=out)
+    np.subtract(100.0, out, out=out)
+    return out
+
+
+def rsi_signals(rsi_values, rsi_buy=30, rsi_sell=70, out=None):
+    """
+    Classify each bar as buy (1), sell (-1) or hold (0) from RSI thresholds,
+    the same rule as ``identify_signals`` in stock_rsi_app.py.
+    """
+    rsi_values = as_float_array(rsi_values)
+    if out is None:
+        out = np.zeros(rsi_values.shape[0], dtype=np.int8)
+    else:
+        out[:] = 0
+    out[rsi_values < rsi_buy] = 1
+    out[rsi_values > rsi_sell] = -1
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9, out=None):
+    """
+    MACD line and its signal line, matching ``calculate_macd`` in MACD.py.
+
+    :return: ``(macd_line, signal_line)``.
+    """
+    close = as_float_array(close)
+    n = close.shape[0]
+    macd_line, signal_line = out_buffers(out, n, 2)
+    slow_ema = ema(close, span=slow, out=signal_line)
+    ema(close, span=fast, out=macd_line)
+    macd_line -= slow_ema
+    ema(macd_line, span=signal, out=signal_line)
+    return macd_line, signal_line
+
+
+def stochastic_oscillator(high, low, close, window=14, smooth_k=3,
+                          smooth_d=3, out=None):
+    """
+    Slow stochastic oscillator, matching ``plot_stochastic_oscillator``.
+
+    :return: ``(stoch_k, stoch_d)``.
+    """
+    high = as_float_array(high)
+    low = as_float_array(low)
+    close = as_float_array(close)
+    n = close.shape[0]
+    stoch_k, stoch_d = out_buffers(out, n, 2)
+
+    high_max, low_min = rolling_extrema(high, low, (window,))[window]
+    high_max -= low_min
+    np.subtract(close, low_min, out=stoch_d)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(stoch_d, high_max, out=stoch_d)
+    stoch_d *= 100.0
+    rolling_mean(stoch_d, smooth_k, out=stoch_k)
+    rolling_mean(stoch_k, smooth_d, out=stoch_d)
+    return stoch_k, stoch_d
+
+
+def ichimoku_cloud(high, low, close, tenkan=9, kijun=26, senkou=52,
+                   displacement=26, out=None):
+    """
+    Ichimoku Cloud lines, matching ``plot_ichimoku_cloud``.
+
+    :return: ``(tenkan_sen, kijun_sen, senkou_span_a, senkou_span_b,
+        chikou_span)``.
+    """
+    high = as_float_array(high)
+    low = as_float_array(low)
+    close = as_float_array(close)
+    n = close.shape[0]
+    tenkan_sen, kijun_sen, span_a, span_b, chikou = out_buffers(out, n, 5)
+
+    extrema = rolling_extrema(high, low, (tenkan, kijun, senkou))
+
+    def midpoint(window, buf):
+        highest, lowest = extrema[window]
+        np.add(highest, lowest, out=buf)
+        buf *= 0.5
+        return buf
+
+    midpoint(tenkan, tenkan_sen)
+    midpoint(kijun, kijun_sen)
+    np.add(tenkan_sen, kijun_sen, out=chikou)
+    chikou *= 0.5
+    shift(chikou, displacement, out=span_a)
+    shift(midpoint(senkou, chikou), displacement, out=span_b)
+    shift(close, -displacement, out=chikou)
+    return tenkan_sen, kijun_sen, span_a, span_b, chikou
+
+
+def bollinger_bands(close, window=20, n_std=2, ddof=1, min_periods=None,
+                    out=None):
+    """
+    Bollinger Bands.  The defaults (sample standard deviation, full-window
+    warm-up) match ``plot_bollinger_bands`` in app.py; see
+    ``rolling_mean_var`` for ``ddof`` and ``min_periods``.
+
+    :return: ``(sma, upper, lower)``.
+    """
+    close = as_float_array(close)
+    n = close.shape[0]
+    sma, upper, lower = out_buffers(out, n, 3)
+    rolling_mean_var(close, window, ddof=ddof, min_periods=min_periods,
+                     out=(sma, lower))
+    np.sqrt(lower, out=lower)
+    lower *= n_std
+    np.add(sma, lower, out=upper)
+    np.subtract(sma, lower, out=lower)
+    return sma, upper, lower
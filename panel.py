@@ -0,0 +1,466 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+from data_cache import OHLCV_COLUMNS, normalize_bars
+from indicators import as_float_array
+
+# ----------------------------------------------------------
+# Long-format panels
+#
+# A panel holds many tickers' bars end to end: one concatenated array per
+# column and an ``offsets`` array where ticker ``i`` occupies
+# ``offsets[i]:offsets[i + 1]``.  The kernels below take ``(x, offsets)`` and
+# compute an indicator for every ticker in one vectorised pass over the whole
+# array, with every window and exponential filter starting afresh at each
+# ticker boundary, so the results equal running indicators.py once per
+# ticker.
+#
+# Rolling windows are computed over the concatenated array and the values
+# whose window reaches back into the previous ticker are reset to NaN (they
+# are exactly each ticker's warm-up).  Rolling means and variances, whose
+# pass re-centres blocks of bars, first spread the tickers out so that no
+# block holds more than one of them.  Exponential filters use a scan whose
+# decay factor is zero at each ticker's first value.
+# ----------------------------------------------------------
+
+
+def segment_offsets(lengths):
+    """
+    Offsets array for segments of the given lengths.
+    """
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def positions(offsets):
+    """
+    Position of every element within its own segment (0 at each start).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    return (np.arange(offsets[-1], dtype=np.int64)
+            - np.repeat(offsets[:-1], lengths))
+
+
+def _check(x, offsets):
+    x = as_float_array(x)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if offsets.ndim != 1 or offsets.shape[0] < 1 or offsets[0] != 0 \
+            or offsets[-1] != x.shape[0] or np.any(np.diff(offsets) < 0):
+        raise ValueError("offsets must rise from 0 to len(x)")
+    return x, offsets
+
+
+def _reset_warmup(out, pos, warmup):
+    # Values computed from fewer than ``warmup + 1`` bars of their own ticker
+    out[pos < warmup] = np.nan
+    return out
+
+
+def _segment_first(values, offsets, n):
+    # Smallest entry of ``values`` in each segment (``n`` for empty ones)
+    lengths = np.diff(offsets)
+    first = np.full(lengths.shape[0], n, dtype=np.int64)
+    filled = lengths > 0
+    if filled.any():
+        first[filled] = np.minimum.reduceat(values, offsets[:-1][filled])
+    return first
+
+
+# ----------------------------------------------------------
+# Building blocks
+# ----------------------------------------------------------
+
+
+def varying_scan(y, decay):
+    """
+    In-place scan ``y[t] += decay[t] * y[t-1]`` with a decay factor per
+    element, in log-steps like ``indicators.exponential_scan``.
+
+    A zero factor starts the recursion afresh, which is how segments are
+    kept apart.
+    """
+    factor = np.array(decay, dtype=np.float64)
+    n = y.shape[0]
+    step = 1
+    while step < n and np.max(factor, initial=0.0) > indicators.DECAY_EPS:
+        y[step:] += factor[step:] * y[:-step]
+        factor[step:] *= factor[:-step]
+        # Lags that reach back before the first element contribute nothing
+        factor[:min(2 * step, n)] = 0.0
+        step *= 2
+    return y
+
+
+def ema(x, offsets, span=None, alpha=None, out=None):
+    """
+    Per-segment EMA, equal to ``indicators.ema`` on every segment.
+
+    Each segment is seeded with its own first non-NaN value; NaNs are only
+    supported as a leading warm-up within a segment.
+    """
+    if (span is None) == (alpha is None):
+        raise ValueError("pass exactly one of span or alpha")
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    if not 0.0 < alpha <= 1.0:
+        raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+    x, offsets = _check(x, offsets)
+    n = x.shape[0]
+    out = indicators.out_buffer(out, n)
+
+    index = np.arange(n)
+    first = _segment_first(np.where(np.isnan(x), n, index), offsets, n)
+    seed = np.repeat(first, np.diff(offsets))
+    started = index >= seed
+    is_seed = index == seed
+
+    seeds = x[is_seed]
+    np.multiply(x, alpha, out=out)
+    out[is_seed] = seeds
+    out[~started] = 0.0
+    decay = np.where(started & ~is_seed, 1.0 - alpha, 0.0)
+    varying_scan(out, decay)
+    out[~started] = np.nan
+    return out
+
+
+def delta(x, offsets, out=None):
+    """
+    Bar-to-bar change within each segment (NaN at every segment start).
+    """
+    x, offsets = _check(x, offsets)
+    out = indicators.out_buffer(out, x.shape[0])
+    out[:1] = np.nan
+    np.subtract(x[1:], x[:-1], out=out[1:])
+    out[offsets[:-1][np.diff(offsets) > 0]] = np.nan
+    return out
+
+
+def shift(x, offsets, periods, out=None):
+    """
+    ``indicators.shift`` applied to each segment.
+    """
+    x, offsets = _check(x, offsets)
+    out = indicators.shift(x, periods, out=out)
+    pos = positions(offsets)
+    if periods >= 0:
+        out[pos < periods] = np.nan
+    else:
+        length = np.repeat(np.diff(offsets), np.diff(offsets))
+        out[pos >= length + periods] = np.nan
+    return out
+
+
+def _block_layout(offsets, window):
+    # Positions that put every segment on a block boundary of
+    # ``indicators.rolling_mean_var``, with at least ``window - 1`` empty bars
+    # in front, so its re-centred blocks never mix two tickers
+    block = indicators.moments_block(window)
+    lengths = np.diff(offsets)
+    slots = np.where(lengths > 0,
+                     -(-(lengths + window - 1) // block) * block, 0)
+    starts = segment_offsets(slots)
+    index = (np.repeat(starts[:-1] - offsets[:-1], lengths)
+             + np.arange(offsets[-1], dtype=np.int64))
+    return index, int(starts[-1])
+
+
+def _spread(x, offsets, window):
+    # ``x`` laid out as in ``_block_layout``, NaN in between
+    index, size = _block_layout(offsets, window)
+    spread = np.full(size, np.nan)
+    spread[index] = x
+    return spread, index
+
+
+def rolling_mean_var(x, offsets, window, ddof=1, out=None):
+    """
+    Per-segment rolling mean and variance (full windows only).
+
+    Segments are spread out so that each starts a fresh block of the
+    re-centred pass in indicators.py; tickers at very different price
+    levels then keep the precision they have when run one by one.
+
+    :return: ``(mean, var)``.
+    """
+    x, offsets = _check(x, offsets)
+    mean, var = indicators.out_buffers(out, x.shape[0], 2)
+    spread, index = _spread(x, offsets, window)
+    spread_mean, spread_var = indicators.rolling_mean_var(spread, window,
+                                                          ddof=ddof)
+    np.take(spread_mean, index, out=mean)
+    np.take(spread_var, index, out=var)
+    return mean, var
+
+
+def rolling_mean(x, offsets, window, out=None):
+    """
+    Per-segment simple moving average (full windows only).
+    """
+    x, offsets = _check(x, offsets)
+    out = indicators.out_buffer(out, x.shape[0])
+    spread, index = _spread(x, offsets, window)
+    return np.take(indicators.rolling_mean(spread, window), index, out=out)
+
+
+def rolling_extrema(high, low, offsets, windows):
+    """
+    Per-segment rolling highest high and lowest low for several windows.
+
+    :return: Dict mapping each window to ``(highest_high, lowest_low)``.
+    """
+    high, offsets = _check(high, offsets)
+    low, _ = _check(low, offsets)
+    pos = positions(offsets)
+    extrema = indicators.rolling_extrema(high, low, windows)
+    for window, (highest, lowest) in extrema.items():
+        _reset_warmup(highest, pos, window - 1)
+        _reset_warmup(lowest, pos, window - 1)
+    return extrema
+
+
+# ----------------------------------------------------------
+# Indicators
+# ----------------------------------------------------------
+
+
+def rsi(close, offsets, period=14, out=None):
+    """
+    Per-segment Wilder RSI, like ``indicators.rsi``.
+    """
+    change = delta(close, offsets)
+    gain = np.maximum(change, 0.0)
+    loss = np.maximum(-change, 0.0)
+    avg_gain = ema(gain, offsets, alpha=1.0 / period, out=gain)
+    avg_loss = ema(loss, offsets, alpha=1.0 / period, out=loss)
+    out = indicators.out_buffer(out, change.shape[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(avg_gain, avg_loss, out=out)
+    out += 1.0
+    np.divide(100.0, out, out=out)
+    np.subtract(100.0, out, out=out)
+    return out
+
+
+def macd(close, offsets, fast=12, slow=26, signal=9, out=None):
+    """
+    Per-segment MACD and signal line, like ``indicators.macd``.
+
+    :return: ``(macd_line, signal_line)``.
+    """
+    close, offsets = _check(close, offsets)
+    macd_line, signal_line = indicators.out_buffers(out, close.shape[0], 2)
+    slow_ema = ema(close, offsets, span=slow, out=signal_line)
+    ema(close, offsets, span=fast, out=macd_line)
+    macd_line -= slow_ema
+    ema(macd_line, offsets, span=signal, out=signal_line)
+    return macd_line, signal_line
+
+
+def stochastic_oscillator(high, low, close, offsets, window=14, smooth_k=3,
+                          smooth_d=3, out=None):
+    """
+    Per-segment slow stochastic, like ``indicators.stochastic_oscillator``.
+
+    :return: ``(stoch_k, stoch_d)``.
+    """
+    close, offsets = _check(close, offsets)
+    stoch_k, stoch_d = indicators.out_buffers(out, close.shape[0], 2)
+    high_max, low_min = rolling_extrema(high, low, offsets, (window,))[window]
+    high_max -= low_min
+    np.subtract(close, low_min, out=stoch_d)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(stoch_d, high_max, out=stoch_d)
+    stoch_d *= 100.0
+    pos = positions(offsets)
+    _reset_warmup(stoch_d, pos, window - 1)
+    rolling_mean(stoch_d, offsets, smooth_k, out=stoch_k)
+    rolling_mean(stoch_k, offsets, smooth_d, out=stoch_d)
+    return stoch_k, stoch_d
+
+
+def ichimoku_cloud(high, low, close, offsets, tenkan=9, kijun=26, senkou=52,
+                   displacement=26, out=None):
+    """
+    Per-segment Ichimoku lines, like ``indicators.ichimoku_cloud``.
+
+    :return: ``(tenkan_sen, kijun_sen, senkou_span_a, senkou_span_b,
+        chikou_span)``.
+    """
+    close, offsets = _check(close, offsets)
+    n = close.shape[0]
+    tenkan_sen, kijun_sen, span_a, span_b, chikou = indicators.out_buffers(
+        out, n, 5)
+    extrema = rolling_extrema(high, low, offsets, (tenkan, kijun, senkou))
+
+    def midpoint(window, buf):
+        highest, lowest = extrema[window]
+        np.add(highest, lowest, out=buf)
+        buf *= 0.5
+        return buf
+
+    midpoint(tenkan, tenkan_sen)
+    midpoint(kijun, kijun_sen)
+    np.add(tenkan_sen, kijun_sen, out=chikou)
+    chikou *= 0.5
+    shift(chikou, offsets, displacement, out=span_a)
+    shift(midpoint(senkou, chikou), offsets, displacement, out=span_b)
+    shift(close, offsets, -displacement, out=chikou)
+    return tenkan_sen, kijun_sen, span_a, span_b, chikou
+
+
+def bollinger_bands(close, offsets, window=20, n_std=2, ddof=1, out=None):
+    """
+    Per-segment Bollinger Bands, like ``indicators.bollinger_bands`` with a
+    full-window warm-up.
+
+    :return: ``(sma, upper, lower)``.
+    """
+    close, offsets = _check(close, offsets)
+    sma, upper, lower = indicators.out_buffers(out, close.shape[0], 3)
+    rolling_mean_var(close, offsets, window, ddof=ddof, out=(sma, lower))
+    np.sqrt(lower, out=lower)
+    lower *= n_std
+    np.add(sma, lower, out=upper)
+    np.subtract(sma, lower, out=lower)
+    return sma, upper, lower
+
+
+# Panel kernel name -> input columns; indicators.py has the same names
+KERNEL_INPUTS = {
+    'rsi': ('Close',),
+    'macd': ('Close',),
+    'stochastic_oscillator': ('High', 'Low', 'Close'),
+    'ichimoku_cloud': ('High', 'Low', 'Close'),
+    'bollinger_bands': ('Close',),
+}
+
+
+# ----------------------------------------------------------
+# Panel container
+# ----------------------------------------------------------
+
+
+class Panel:
+    """
+    Bars of many tickers in long format.
+
+    :param tickers: Ticker symbols, in segment order.
+    :param offsets: Segment offsets, ``len(tickers) + 1`` long.
+    :param index: Concatenated timestamps (datetime64).
+    :param columns: Mapping of column name to concatenated float64 array.
+    """
+
+    def __init__(self, tickers, offsets, index, columns):
+        self.tickers = list(tickers)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.index = np.asarray(index)
+        self.columns = {name: as_float_array(values)
+                        for name, values in columns.items()}
+        if self.offsets.shape[0] != len(self.tickers) + 1:
+            raise ValueError("need one offset per ticker plus one")
+        for name, values in self.columns.items():
+            _check(values, self.offsets)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        Build a panel from a mapping of ticker to OHLCV DataFrame.
+        """
+        frames = {ticker: normalize_bars(df) for ticker, df in frames.items()}
+        offsets = segment_offsets([len(df) for df in frames.values()])
+        parts = list(frames.values())
+        index = (np.concatenate([df.index.to_numpy() for df in parts])
+                 if parts else np.array([], dtype='datetime64[ns]'))
+        columns = {name: np.concatenate([df[name].to_numpy() for df in parts])
+                   if parts else np.array([]) for name in OHLCV_COLUMNS}
+        return cls(frames, offsets, index, columns)
+
+    @classmethod
+    def from_download(cls, df):
+        """
+        Build a panel from a multi-ticker ``yf.download`` result, whose
+        columns are a (field, ticker) or (ticker, field) MultiIndex.
+
+        Dates on which a ticker has no bar at all (e.g. a different exchange
+        calendar) are dropped from that ticker's segment.
+        """
+        if not isinstance(df.columns, pd.MultiIndex):
+            raise ValueError("expected MultiIndex columns (field, ticker)")
+        fields_first = set(df.columns.get_level_values(0)) & set(OHLCV_COLUMNS)
+        level = 1 if fields_first else 0
+        frames = {}
+        for ticker in dict.fromkeys(df.columns.get_level_values(level)):
+            frame = df.xs(ticker, axis=1, level=level)
+            frames[ticker] = frame.dropna(how='all')
+        return cls.from_frames(frames)
+
+    def segment(self, ticker):
+        """
+        One ticker's bars as a DataFrame.
+        """
+        i = self.tickers.index(ticker)
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return pd.DataFrame(
+            {name: values[lo:hi] for name, values in self.columns.items()},
+            index=pd.DatetimeIndex(self.index[lo:hi], name='Date'))
+
+    def frame(self, values):
+        """
+        Wrap concatenated arrays (e.g. kernel results) in a long DataFrame
+        indexed by (ticker, date).
+
+        :param values: Mapping of column name to array of ``len(self)``.
+        """
+        lengths = np.diff(self.offsets)
+        index = pd.MultiIndex.from_arrays(
+            [np.repeat(np.asarray(self.tickers, dtype=object), lengths),
+             pd.DatetimeIndex(self.index)], names=['Ticker', 'Date'])
+        return pd.DataFrame(dict(values), index=index)
+
+    def last(self, values):
+        """
+        Last value of every segment (NaN for empty ones), e.g. the latest
+        indicator reading per ticker.
+        """
+        values = np.asarray(values)
+        lengths = np.diff(self.offsets)
+        out = np.full(lengths.shape[0], np.nan)
+        filled = lengths > 0
+        out[filled] = values[self.offsets[1:][filled] - 1]
+        return out
+
+    def verify(self, kernels=tuple(KERNEL_INPUTS), rtol=1e-9):
+        """
+        Compare the panel kernels with indicators.py run on every ticker
+        on its own.
+
+        :param kernels: Kernel names, as in ``KERNEL_INPUTS``.
+        :param rtol: Relative tolerance; the exponential filters take a
+            different scan path and may differ in the last bits.
+        :return: Dict mapping each ticker to the kernels whose values differ
+            (empty when everything matches).
+        """
+        mismatches = {}
+        for name in kernels:
+            inputs = [self.columns[column] for column in KERNEL_INPUTS[name]]
+            got = globals()[name](*inputs, self.offsets)
+            got = got if isinstance(got, tuple) else (got,)
+            for i, ticker in enumerate(self.tickers):
+                lo, hi = self.offsets[i], self.offsets[i + 1]
+                want = getattr(indicators, name)(*(x[lo:hi] for x in inputs))
+                want = want if isinstance(want, tuple) else (want,)
+                if not all(np.allclose(g[lo:hi], w, rtol=rtol, atol=0.0,
+                                       equal_nan=True)
+                           for g, w in zip(got, want)):
+                    mismatches.setdefault(ticker, []).append(name)
+        return mismatches
@@ -0,0 +1,332 @@
+import inspect
+
+import numpy as np
+
+import indicators
+from indicators import as_float_array
+
+# ----------------------------------------------------------
+# Indicator planner
+#
+# A Plan turns a list of indicator requests into a graph of intermediate
+# series (price deltas, EMAs, rolling extremes, rolling moments, midpoints,
+# shifts, ...).  Nodes are keyed by what they compute, so an intermediate
+# needed by several indicators (e.g. the rolling High/Low extremes shared by
+# Ichimoku and the stochastic oscillator, or an EMA shared by two MACD
+# settings) exists once.  Rolling extremes of a longer window are derived
+# from a shorter requested one (see indicators.rolling_extrema).
+#
+# Running the plan evaluates the nodes in order and counts down each node's
+# remaining consumers; once the last one has run, the node's buffers go back
+# to a pool and are reused as output buffers of later nodes.  A plan depends
+# only on the requests, so one plan can be run for every ticker of a
+# universe.
+# ----------------------------------------------------------
+
+KERNELS = {
+    'rsi': indicators.rsi,
+    'macd': indicators.macd,
+    'bollinger': indicators.bollinger_bands,
+    'ichimoku': indicators.ichimoku_cloud,
+    'stochastic': indicators.stochastic_oscillator,
+}
+
+
+def _defaults(kernel):
+    return {p.name: p.default
+            for p in inspect.signature(kernel).parameters.values()
+            if p.default is not inspect.Parameter.empty and p.name != 'out'}
+
+
+def normalize_request(request):
+    """
+    Full form of an indicator request: "rsi" or ("rsi", {"period": 21})
+    becomes ("rsi", {every parameter, defaults filled in}).
+    """
+    name, params = (request, {}) if isinstance(request, str) else request
+    if name not in KERNELS:
+        raise ValueError(f"unknown indicator: {name}")
+    full = _defaults(KERNELS[name])
+    unknown = set(params) - set(full)
+    if unknown:
+        raise ValueError(f"unknown parameters for {name}: {sorted(unknown)}")
+    full.update(params)
+    return name, full
+
+
+# ----------------------------------------------------------
+# Node operations
+#
+# Each takes a tuple of output buffers followed by its input arrays and
+# writes its result into the buffers, using the same steps as the kernels in
+# indicators.py so the results are identical.
+# ----------------------------------------------------------
+
+
+def _delta(outs, x):
+    out = outs[0]
+    out[:1] = np.nan
+    np.subtract(x[1:], x[:-1], out=out[1:])
+
+
+def _gain(outs, delta):
+    np.maximum(delta, 0.0, out=outs[0])
+
+
+def _loss(outs, delta):
+    np.negative(delta, out=outs[0])
+    np.maximum(outs[0], 0.0, out=outs[0])
+
+
+def _ema(alpha):
+    def run(outs, x):
+        indicators.ema(x, alpha=alpha, out=outs[0])
+    return run
+
+
+def _rsi(outs, avg_gain, avg_loss):
+    out = outs[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(avg_gain, avg_loss, out=out)
+    out += 1.0
+    np.divide(100.0, out, out=out)
+    np.subtract(100.0, out, out=out)
+
+
+def _difference(outs, a, b):
+    np.subtract(a, b, out=outs[0])
+
+
+def _extreme(window, kernel):
+    def run(outs, x):
+        kernel(x, window, out=outs[0])
+    return run
+
+
+def _widen(lag, ufunc):
+    # Window of ``v + lag`` bars from two overlapping windows of ``v`` bars
+    def run(outs, prev):
+        out = outs[0]
+        out[:lag] = np.nan
+        ufunc(prev[lag:], prev[:-lag], out=out[lag:])
+    return run
+
+
+def _stochastic_k(outs, close, highest, lowest):
+    out = outs[0]
+    np.subtract(highest, lowest, out=out)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(close - lowest, out, out=out)
+    out *= 100.0
+
+
+def _rolling_mean(window):
+    def run(outs, x):
+        indicators.rolling_mean(x, window, out=outs[0])
+    return run
+
+
+def _midpoint(outs, a, b):
+    out = outs[0]
+    np.add(a, b, out=out)
+    out *= 0.5
+
+
+def _shift(periods):
+    def run(outs, x):
+        indicators.shift(x, periods, out=outs[0])
+    return run
+
+
+def _moments(window, ddof, min_periods):
+    def run(outs, x):
+        indicators.rolling_mean_var(x, window, ddof=ddof,
+                                    min_periods=min_periods, out=outs)
+    return run
+
+
+def _sqrt(outs, x):
+    np.sqrt(x, out=outs[0])
+
+
+def _band(n_std, sign):
+    def run(outs, mean, std):
+        np.multiply(std, n_std, out=outs[0])
+        if sign > 0:
+            np.add(mean, outs[0], out=outs[0])
+        else:
+            np.subtract(mean, outs[0], out=outs[0])
+    return run
+
+
+# ----------------------------------------------------------
+# Plan
+# ----------------------------------------------------------
+
+
+class Plan:
+    """
+    Shared computation of several indicators.
+
+    :param requests: Iterable of indicator names ("rsi", "macd",
+        "bollinger", "ichimoku", "stochastic") or ``(name, params)`` pairs,
+        with the parameters of the matching kernel in indicators.py.
+    """
+
+    def __init__(self, requests):
+        self.requests = [normalize_request(r) for r in requests]
+        self.nodes = {}
+        self.merged = 0
+        self._windows = {'High': set(), 'Low': set()}
+        for name, params in self.requests:
+            for window in self._extreme_windows(name, params):
+                self._windows['High'].add(window)
+                self._windows['Low'].add(window)
+        self.outputs = [getattr(self, '_plan_' + name)(**params)
+                        for name, params in self.requests]
+
+        self._consumers = dict.fromkeys(self.nodes, 0)
+        for _, inputs, _ in self.nodes.values():
+            for key, _ in inputs:
+                self._consumers[key] += 1
+        self._pinned = {ref for refs in self.outputs for ref in refs}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _node(self, key, op, *inputs, n_out=1):
+        # Inputs are (key, output index) references to earlier nodes
+        if key not in self.nodes:
+            self.nodes[key] = (op, inputs, n_out)
+        elif op is not None:
+            self.merged += 1
+        return key
+
+    def _input(self, name):
+        return self._node(('input', name), None), 0
+
+    def _ema(self, source, alpha):
+        return self._node(('ema', source, alpha), _ema(alpha), source), 0
+
+    @staticmethod
+    def _extreme_windows(name, params):
+        if name == 'stochastic':
+            return (params['window'],)
+        if name == 'ichimoku':
+            return params['tenkan'], params['kijun'], params['senkou']
+        return ()
+
+    def _rolling_extreme(self, column, window):
+        # Longer windows are derived from the shortest requested window of
+        # at least half their length, as in indicators.rolling_extrema
+        if column == 'High':
+            kernel, ufunc = indicators.rolling_max, np.maximum
+        else:
+            kernel, ufunc = indicators.rolling_min, np.minimum
+        key = ('extreme', column, window)
+        base = next((v for v in sorted(self._windows[column])
+                     if v < window and 2 * v >= window), None)
+        if base is None:
+            return self._node(key, _extreme(window, kernel),
+                              self._input(column)), 0
+        return self._node(key, _widen(window - base, ufunc),
+                          self._rolling_extreme(column, base)), 0
+
+    def _midpoint_of(self, window):
+        return self._node(('midpoint', window), _midpoint,
+                          self._rolling_extreme('High', window),
+                          self._rolling_extreme('Low', window)), 0
+
+    def _plan_rsi(self, period):
+        close = self._input('Close')
+        delta = (self._node(('delta', 'Close'), _delta, close), 0)
+        gain = (self._node(('gain', 'Close'), _gain, delta), 0)
+        loss = (self._node(('loss', 'Close'), _loss, delta), 0)
+        alpha = 1.0 / period
+        return ((self._node(('rsi', period), _rsi, self._ema(gain, alpha),
+                            self._ema(loss, alpha)), 0),)
+
+    def _plan_macd(self, fast, slow, signal):
+        close = self._input('Close')
+        line = (self._node(('macd', fast, slow), _difference,
+                           self._ema(close, 2.0 / (fast + 1.0)),
+                           self._ema(close, 2.0 / (slow + 1.0))), 0)
+        return line, self._ema(line, 2.0 / (signal + 1.0))
+
+    def _plan_stochastic(self, window, smooth_k, smooth_d):
+        raw = (self._node(('stochastic_raw', window), _stochastic_k,
+                          self._input('Close'),
+                          self._rolling_extreme('High', window),
+                          self._rolling_extreme('Low', window)), 0)
+        stoch_k = (self._node(('mean', raw, smooth_k),
+                              _rolling_mean(smooth_k), raw), 0)
+        return stoch_k, (self._node(('mean', stoch_k, smooth_d),
+                                    _rolling_mean(smooth_d), stoch_k), 0)
+
+    def _plan_ichimoku(self, tenkan, kijun, senkou, displacement):
+        tenkan_sen = self._midpoint_of(tenkan)
+        kijun_sen = self._midpoint_of(kijun)
+        span_a_now = (self._node(('senkou_a', tenkan, kijun), _midpoint,
+                                 tenkan_sen, kijun_sen), 0)
+        span_a = self._node(('shift', span_a_now, displacement),
+                            _shift(displacement), span_a_now)
+        senkou_line = self._midpoint_of(senkou)
+        span_b = self._node(('shift', senkou_line, displacement),
+                            _shift(displacement), senkou_line)
+        close = self._input('Close')
+        chikou = self._node(('shift', close, -displacement),
+                            _shift(-displacement), close)
+        return tenkan_sen, kijun_sen, (span_a, 0), (span_b, 0), (chikou, 0)
+
+    def _plan_bollinger(self, window, n_std, ddof, min_periods):
+        moments = self._node(('moments', window, ddof, min_periods),
+                             _moments(window, ddof, min_periods),
+                             self._input('Close'), n_out=2)
+        std = (self._node(('std', moments), _sqrt, (moments, 1)), 0)
+        sma = (moments, 0)
+        return (sma,
+                (self._node(('upper', moments, n_std), _band(n_std, 1),
+                            sma, std), 0),
+                (self._node(('lower', moments, n_std), _band(n_std, -1),
+                            sma, std), 0))
+
+    def run(self, columns):
+        """
+        Compute every requested indicator.
+
+        :param columns: DataFrame or mapping with the 'High', 'Low' and
+            'Close' columns the requests need.
+        :return: One result per request, in request order, shaped like the
+            kernel's return value (an array for "rsi", a tuple otherwise).
+            Requests that produce the same series share the array.
+        """
+        values = {}
+        remaining = dict(self._consumers)
+        pool = []
+        n = None
+        for key, (op, inputs, n_out) in self.nodes.items():
+            if op is None:
+                values[key] = (as_float_array(columns[key[1]]),)
+                n = values[key][0].shape[0]
+                continue
+            outs = tuple(pool.pop() if pool else np.empty(n)
+                         for _ in range(n_out))
+            op(outs, *(values[k][i] for k, i in inputs))
+            values[key] = outs
+            for k, _ in inputs:
+                remaining[k] -= 1
+                if remaining[k] == 0 and self.nodes[k][0] is not None:
+                    # Last consumer done: hand unpinned buffers back
+                    pool.extend(arr for i, arr in enumerate(values[k])
+                                if (k, i) not in self._pinned)
+        results = [tuple(values[k][i] for k, i in refs)
+                   for refs in self.outputs]
+        return [r[0] if name == 'rsi' else r
+                for r, (name, _) in zip(results, self.requests)]
+
+
+def compute_all(columns, requests):
+    """
+    ``Plan(requests).run(columns)``.
+    """
+    return Plan(requests).run(columns)
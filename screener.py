@@ -0,0 +1,211 @@
+import argparse
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import indicators
+from column_store import ColumnStore
+from data_cache import DEFAULT_CACHE_DIR, BarCache
+from indicators import as_float_array
+from planner import Plan
+
+# ----------------------------------------------------------
+# Universe screener
+#
+# Computes all five indicators for every ticker in a universe with a process
+# pool and reduces each one to a single row: the latest indicator values and
+# the signals active on the last bar.
+#
+# Bars come from the range-aware BarCache, or, with a ``store_dir``, from a
+# ColumnStore: the store is brought up to date and the workers run the
+# indicators directly on its memory-mapped columns.
+# ----------------------------------------------------------
+
+RSI_BUY, RSI_SELL = 30, 70
+STOCH_OVERBOUGHT, STOCH_OVERSOLD = 80, 20
+
+# All five indicators in one plan, so their shared intermediates are
+# computed once per ticker
+SUMMARY_PLAN = Plan(['rsi', 'macd', 'stochastic', 'ichimoku', 'bollinger'])
+
+_worker_cache = None
+_worker_store = None
+
+
+def _last(x):
+    return float(x[-1]) if x.shape[0] else math.nan
+
+
+def summarize(ticker, df):
+    """
+    Reduce one ticker's bars to its latest indicator values and signals.
+
+    :param ticker: Stock ticker symbol.
+    :param df: DataFrame with 'High', 'Low' and 'Close' columns, or the
+        column dict returned by ``ColumnStore.read``.
+    :return: Dict with one entry per summary column.
+    """
+    close = as_float_array(df['Close'])
+    index = df['index'] if isinstance(df, dict) else df.index
+    (rsi, (macd_line, signal_line), (stoch_k, stoch_d),
+     (_, _, span_a, span_b, _), (_, upper, lower)) = SUMMARY_PLAN.run(df)
+
+    price = _last(close)
+    signals = []
+    rsi_signal = indicators.rsi_signals(rsi[-1:], RSI_BUY, RSI_SELL)
+    if rsi_signal.size and rsi_signal[0] == 1:
+        signals.append('RSI buy')
+    elif rsi_signal.size and rsi_signal[0] == -1:
+        signals.append('RSI sell')
+    if close.shape[0] >= 2:
+        spread = macd_line[-2:] - signal_line[-2:]
+        if spread[0] <= 0 < spread[1]:
+            signals.append('MACD bullish cross')
+        elif spread[0] >= 0 > spread[1]:
+            signals.append('MACD bearish cross')
+    if _last(stoch_k) > STOCH_OVERBOUGHT:
+        signals.append('Stochastic overbought')
+    elif _last(stoch_k) < STOCH_OVERSOLD:
+        signals.append('Stochastic oversold')
+    cloud_top = max(_last(span_a), _last(span_b))
+    cloud_bottom = min(_last(span_a), _last(span_b))
+    if price > cloud_top:
+        signals.append('Above cloud')
+    elif price < cloud_bottom:
+        signals.append('Below cloud')
+    if price > _last(upper):
+        signals.append('Above upper band')
+    elif price < _last(lower):
+        signals.append('Below lower band')
+
+    return {
+        'ticker': ticker,
+        'bars': close.shape[0],
+        'last_date': pd.Timestamp(index[-1]) if len(index) else pd.NaT,
+        'close': price,
+        'rsi': _last(rsi),
+        'macd': _last(macd_line),
+        'macd_signal': _last(signal_line),
+        'stoch_k': _last(stoch_k),
+        'stoch_d': _last(stoch_d),
+        'senkou_span_a': _last(span_a),
+        'senkou_span_b': _last(span_b),
+        'bb_upper': _last(upper),
+        'bb_lower': _last(lower),
+        'signals': ', '.join(signals),
+        'error': '',
+    }
+
+
+def _init_worker(cache_dir, provider, store_dir):
+    global _worker_cache, _worker_store
+    if store_dir is None:
+        _worker_cache = BarCache(cache_dir, provider)
+    else:
+        _worker_store = ColumnStore(store_dir, provider)
+
+
+def _load(ticker, start, end, interval):
+    if _worker_store is None:
+        df = _worker_cache.get(ticker, start, end, interval)
+        return df if not df.empty else None
+    _worker_store.update(ticker, interval, start)
+    bars = _worker_store.read(ticker, interval, start, end)
+    return bars if bars['index'].shape[0] else None
+
+
+def _screen_one(job):
+    ticker, start, end, interval = job
+    try:
+        df = _load(ticker, start, end, interval)
+        if df is None:
+            return {'ticker': ticker, 'bars': 0, 'error': 'no data'}
+        return summarize(ticker, df)
+    except Exception as e:
+        return {'ticker': ticker, 'bars': 0, 'error': str(e)}
+
+
+def screen(tickers, start, end, interval='1d', workers=None,
+           cache_dir=DEFAULT_CACHE_DIR, provider=None, chunksize=16,
+           store_dir=None):
+    """
+    Screen a ticker universe in parallel.
+
+    :param tickers: Iterable of ticker symbols.
+    :param start: Inclusive start date.
+    :param end: Exclusive end date.
+    :param interval: Bar interval, e.g. "1d".
+    :param workers: Number of worker processes (default: CPU count).
+    :param cache_dir: Bar cache directory shared by the workers.
+    :param provider: Upstream bar provider (default: Yahoo Finance).
+    :param chunksize: Tickers handed to a worker at a time.
+    :param store_dir: Read bars from a ColumnStore in this directory instead
+        of the bar cache (it only appends, so bars before the first stored
+        one are not filled in later).
+    :return: ``(table, stats)``: one row per ticker indexed by symbol, and a
+        dict with the ticker count, failures, elapsed seconds and tickers/sec.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    jobs = [(t, pd.Timestamp(start), pd.Timestamp(end), interval)
+            for t in tickers]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_dir, provider, store_dir)) as pool:
+        rows = list(pool.map(_screen_one, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    table = pd.DataFrame(rows).set_index('ticker') if rows else pd.DataFrame()
+    failed = int((table['error'] != '').sum()) if rows else 0
+    stats = {
+        'tickers': len(tickers),
+        'failed': failed,
+        'seconds': elapsed,
+        'tickers_per_sec': len(tickers) / elapsed if elapsed > 0 else math.inf,
+    }
+    return table, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compute all indicators for a ticker universe.")
+    parser.add_argument('tickers', nargs='*', help="Ticker symbols.")
+    parser.add_argument('--universe', help="File with one ticker per line.")
+    parser.add_argument('--start', required=True, help="Start date (YYYY-MM-DD).")
+    parser.add_argument('--end', default=None,
+                        help="End date, exclusive (default: tomorrow).")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--store-dir', default=None,
+                        help="Read bars from a column store in this directory.")
+    parser.add_argument('--output', help="Write the summary table to this CSV.")
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.universe:
+        with open(args.universe) as f:
+            tickers += [line.split('#')[0] for line in f]
+    if not tickers:
+        parser.error("no tickers given")
+    end = args.end or (pd.Timestamp.now().normalize() + pd.Timedelta(days=1))
+
+    table, stats = screen(tickers, args.start, end, interval=args.interval,
+                          workers=args.workers, cache_dir=args.cache_dir,
+                          store_dir=args.store_dir)
+    if args.output:
+        table.to_csv(args.output)
+    else:
+        with pd.option_context('display.max_rows', None,
+                               'display.width', None):
+            print(table)
+    print(f"{stats['tickers']} tickers ({stats['failed']} failed) in "
+          f"{stats['seconds']:.2f}s: {stats['tickers_per_sec']:.1f} tickers/sec",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------
+# Process-wide result cache
+#
+# One SharedCache serves every session of a server process.  Values are
+# stored once and handed out without copying: arrays are marked read-only
+# and DataFrames are returned as shallow copies (with pandas' copy-on-write,
+# always on from pandas 3, a consumer that adds or changes columns gets its
+# own data, never the cached one; older pandas without it gets deep copies).
+# The cache is bounded by the bytes it holds, evicting least
+# recently used entries first, and concurrent requests for a key that is
+# being computed wait for that computation instead of repeating it.
+#
+# With a ``directory``, arrays (and tuples of equally shaped arrays, like
+# the indicator kernels return) are also written there as .npy files and
+# memory-mapped back read-only, so separate server processes on one machine
+# share both the results and, through the page cache, the memory.  A file is
+# deleted when its entry is evicted or found expired.
+# ----------------------------------------------------------
+
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+
+_PANDAS_3 = int(pd.__version__.split('.')[0]) >= 3
+
+_SUFFIXES = (('.npy', False), ('.tuple.npy', True))
+
+
+def _freeze(value):
+    # Make cached values read-only, so no consumer can change them for others
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _copy_on_write():
+    return _PANDAS_3 or pd.options.mode.copy_on_write is True
+
+
+def _share(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # A shallow copy only isolates the cached frame under copy-on-write
+        return value.copy(deep=not _copy_on_write())
+    return value
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(index=True).sum())
+    return sys.getsizeof(value)
+
+
+def _stackable(value):
+    # Values that fit a single .npy file: an array, or equally shaped arrays
+    if isinstance(value, np.ndarray):
+        return value.dtype != object
+    return (isinstance(value, tuple) and len(value) > 0
+            and all(isinstance(v, np.ndarray) and v.dtype != object
+                    and v.shape == value[0].shape and v.dtype == value[0].dtype
+                    for v in value))
+
+
+class SharedCache:
+    """
+    Memory-bounded cache of computed values, safe to share between threads.
+
+    :param max_bytes: Bytes of cached values kept before the least recently
+        used entries are evicted.
+    :param ttl: Seconds after which an entry is computed again (``None``:
+        entries never expire).
+    :param directory: Optional directory for cross-process sharing of array
+        results.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=None, directory=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.nbytes = 0
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0,
+                      'evictions': 0}
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute):
+        """
+        Cached value for ``key``, calling ``compute()`` on a miss.
+
+        :param key: Hashable key; its ``repr`` names the file when the cache
+            has a directory, so it should be built from plain values.
+        :param compute: Zero-argument callable producing the value.
+        :return: The shared value: read-only arrays, tuples of them, or a
+            shallow copy of a cached DataFrame.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[2]):
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return _share(entry[0])
+            if entry is not None:
+                del self._entries[key]
+                self.nbytes -= entry[1]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            return _share(future.result())
+
+        try:
+            value, created = self._load(key)
+            if value is None:
+                created = time.time()
+                value = _freeze(compute())
+                self._save(key, value)
+                self._count('misses')
+            else:
+                self._count('disk_hits')
+            self._insert(key, value, created)
+            future.set_result(value)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return _share(value)
+
+    def clear(self):
+        """
+        Drop every in-memory entry (files in ``directory`` are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _insert(self, key, value, created):
+        size = _nbytes(value)
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if size > self.max_bytes:
+                evicted.append(key)  # would evict everything else; not kept
+            else:
+                self._entries[key] = (value, size, created)
+                self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                old_key, (_, old_size, _) = self._entries.popitem(last=False)
+                self.nbytes -= old_size
+                self.stats['evictions'] += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._discard(old_key)
+
+    # ------------------------------------------------------
+    # Optional file backing
+    # ------------------------------------------------------
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+    def _load(self, key):
+        if self.directory is None:
+            return None, None
+        base = self._path(key)
+        for suffix, stacked in _SUFFIXES:
+            path = base + suffix
+            try:
+                created = os.path.getmtime(path)
+                if self._expired(created):
+                    os.unlink(path)
+                    continue
+                stored = np.load(path, mmap_mode='r')
+            except OSError:
+                continue  # missing, or removed by another process meanwhile
+            return (tuple(stored) if stacked else stored), created
+        return None, None
+
+    def _discard(self, key):
+        # Remove the file of an evicted or expired entry (open memory maps of
+        # it stay valid)
+        if self.directory is None:
+            return
+        base = self._path(key)
+        for suffix, _ in _SUFFIXES:
+            try:
+                os.unlink(base + suffix)
+            except OSError:
+                pass
+
+    def _save(self, key, value):
+        if self.directory is None or not _stackable(value):
+            return
+        stacked = isinstance(value, tuple)
+        path = self._path(key) + ('.tuple.npy' if stacked else '.npy')
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.npy.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.stack(value) if stacked else value)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -1,21 +1,21 @@
-import yfinance as yf
 import pandas as pd
 import ta
 import matplotlib.pyplot as plt
+from data_cache import BarCache, period_to_range
 
 # Step 1: Fetch Apple (AAPL) Stock Data
 def fetch_stock_data(ticker="AAPL", period="6mo", interval="1d"):
     """
-    Fetch historical stock data from Yahoo Finance.
+    Fetch historical stock data from Yahoo Finance, through the local bar
+    cache so only the part of the period not already on disk is downloaded.
 
     :param ticker: Stock ticker symbol (e.g., "AAPL").
     :param period: Data range (e.g., "6mo" for 6 months).
     :param interval: Data interval (e.g., "1d" for daily).
     :return: DataFrame with stock price history.
     """
-    stock = yf.Ticker(ticker)
-    data = stock.history(period=period, interval=interval)
-    return data
+    start, end = period_to_range(period)
+    return BarCache().get(ticker, start, end, interval=interval)
 
 # Step 2: Calculate Stochastic Oscillator
 def calculate_stochastic_oscillator(data, window=14, smooth_k=3, smooth_d=3):
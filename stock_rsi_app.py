@@ -1,8 +1,10 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 import ta
+from data_cache import BarCache
+from fetcher import Fetcher
+from chart_payload import scatter, use_date_axis
 
 # --- Function to calculate RSI ---
 def calculate_rsi(data, period=14):
@@ -19,6 +21,29 @@ def identify_signals(data, rsi_buy, rsi_sell):
     data.loc[data['RSI'] > rsi_sell, 'Signal'] = -1  # Sell
     return data
 
+# --- Cached data and RSI ---
+# Entries expire after an hour and at most CACHE_ENTRIES per function are kept
+# (least recently used evicted first). Moving a threshold slider only reruns
+# identify_signals; the download and the RSI come from these caches.
+CACHE_TTL = 60 * 60
+CACHE_ENTRIES = 128
+
+@st.cache_resource
+def shared_fetcher():
+    # One fetcher per server process: concurrent sessions share its download
+    # slots and identical in-flight requests are downloaded once
+    return Fetcher()
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES, show_spinner=False)
+def load_data(ticker, start_date, end_date):
+    return BarCache(provider=shared_fetcher()).get(ticker, start_date, end_date)
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_ENTRIES, show_spinner=False)
+def load_rsi(ticker, start_date, end_date, period):
+    # st.cache_data hands every caller its own copy, so calculate_rsi and
+    # identify_signals can add columns without touching the cached frames
+    return calculate_rsi(load_data(ticker, start_date, end_date), period)
+
 # --- Streamlit UI ---
 st.set_page_config(page_title="📈 Advanced RSI Dashboard", layout="wide")
 
@@ -38,44 +63,46 @@ rsi_sell = st.sidebar.slider("RSI Sell Threshold", 50, 90, 70)
 if start_date >= end_date:
     st.warning("⚠️ Start date must be before end date.")
 else:
-    data = yf.download(ticker, start=start_date, end=end_date)
+    data = load_data(ticker, start_date, end_date)
 
     if data.empty:
         st.warning("⚠️ No data found. Try a different date range or ticker.")
     else:
-        data = calculate_rsi(data, rsi_period)
+        data = load_rsi(ticker, start_date, end_date, rsi_period)
         data = identify_signals(data, rsi_buy, rsi_sell)
 
         # --- RSI Chart ---
         st.subheader("📊 RSI Indicator")
         fig_rsi = go.Figure()
-        fig_rsi.add_trace(go.Scatter(x=data.index, y=data['RSI'], name='RSI', line=dict(color='orange')))
+        fig_rsi.add_trace(scatter(data.index, data['RSI'], name='RSI', line=dict(color='orange')))
         fig_rsi.add_hline(y=rsi_buy, line=dict(color='green', dash='dash'), annotation_text="Buy Threshold", annotation_position="top left")
         fig_rsi.add_hline(y=rsi_sell, line=dict(color='red', dash='dash'), annotation_text="Sell Threshold", annotation_position="top left")
 
         fig_rsi.update_layout(title=f"{ticker} RSI ({rsi_period}-period)", xaxis_title="Date", yaxis_title="RSI", template="plotly_white")
+        use_date_axis(fig_rsi)
         st.plotly_chart(fig_rsi, use_container_width=True)
 
         # --- Price Chart with Signals ---
         st.subheader("💹 Price Chart with RSI Signals")
         fig_price = go.Figure()
-        fig_price.add_trace(go.Scatter(x=data.index, y=data['Close'], name="Close Price", line=dict(color='black')))
-        fig_price.add_trace(go.Scatter(
-            x=data[data['Signal'] == 1].index,
-            y=data[data['Signal'] == 1]['Close'],
+        fig_price.add_trace(scatter(data.index, data['Close'], name="Close Price", line=dict(color='black')))
+        fig_price.add_trace(scatter(
+            data[data['Signal'] == 1].index,
+            data[data['Signal'] == 1]['Close'],
             name='Buy Signal',
             mode='markers',
             marker=dict(color='green', size=10, symbol='triangle-up')
         ))
-        fig_price.add_trace(go.Scatter(
-            x=data[data['Signal'] == -1].index,
-            y=data[data['Signal'] == -1]['Close'],
+        fig_price.add_trace(scatter(
+            data[data['Signal'] == -1].index,
+            data[data['Signal'] == -1]['Close'],
             name='Sell Signal',
             mode='markers',
             marker=dict(color='red', size=10, symbol='triangle-down')
         ))
 
         fig_price.update_layout(title=f"{ticker} Close Price with RSI Signals", xaxis_title="Date", yaxis_title="Price", template="plotly_white")
+        use_date_axis(fig_price)
         st.plotly_chart(fig_price, use_container_width=True)
 
         # --- Optional Data Table ---
@@ -0,0 +1,358 @@
+import math
+from collections import deque
+
+# ----------------------------------------------------------
+# Incremental indicator state
+#
+# Each class holds just enough state to advance its indicator by one bar in
+# O(1) (amortised for the rolling extremes), and produces the same values as
+# the batch kernels in indicators.py fed the same history.  ``update`` takes a
+# bar as any mapping with 'Close' (and 'High' / 'Low' where needed), e.g. a
+# dict or a DataFrame row, and returns the latest value(s), NaN during
+# warm-up.  ``peek`` returns what ``update`` would for a bar without changing
+# the state, e.g. for a bar that is still forming.  ``snapshot`` returns
+# plain Python data that can be pickled or JSON-encoded, and ``restore``
+# rebuilds an equivalent object from it.
+# ----------------------------------------------------------
+
+NAN = float('nan')
+
+
+class EMAState:
+    """
+    Exponential moving average with ``adjust=False`` semantics, seeded with
+    the first non-NaN input.
+    """
+
+    def __init__(self, span=None, alpha=None, value=None):
+        if (span is None) == (alpha is None):
+            raise ValueError("pass exactly one of span or alpha")
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value = value
+
+    def update(self, x):
+        if self.value is None:
+            if not math.isnan(x):
+                self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return NAN if self.value is None else self.value
+
+    def peek(self, x):
+        if self.value is None:
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+    def snapshot(self):
+        return {'alpha': self.alpha, 'value': self.value}
+
+    @classmethod
+    def restore(cls, snapshot):
+        return cls(alpha=snapshot['alpha'], value=snapshot['value'])
+
+
+class RollingExtremeState:
+    """
+    Rolling max (``sign=1``) or min (``sign=-1``) over ``window`` bars using a
+    monotonic deque.  NaN until the window is full or while it holds a NaN,
+    like ``Series.rolling(window).max()``.
+    """
+
+    def __init__(self, window, sign=1, count=0, last_nan=None, items=()):
+        self.window = window
+        self.sign = sign
+        self.count = count
+        self.last_nan = last_nan
+        self.items = deque(tuple(item) for item in items)
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+        if math.isnan(x):
+            self.last_nan = i
+        else:
+            key = self.sign * x
+            while self.items and self.sign * self.items[-1][1] <= key:
+                self.items.pop()
+            self.items.append((i, x))
+        while self.items and self.items[0][0] <= i - self.window:
+            self.items.popleft()
+        if self.count < self.window or (
+                self.last_nan is not None and i - self.last_nan < self.window):
+            return NAN
+        return self.items[0][1]
+
+    def peek(self, x):
+        i = self.count
+        if i + 1 < self.window or math.isnan(x) or (
+                self.last_nan is not None and i - self.last_nan < self.window):
+            return NAN
+        # The deque is monotonic, so its first item still in the window is
+        # the extreme of the bars kept
+        for j, value in self.items:
+            if j > i - self.window:
+                return value if self.sign * value > self.sign * x else x
+        return x
+
+    def snapshot(self):
+        return {'window': self.window, 'sign': self.sign, 'count': self.count,
+                'last_nan': self.last_nan,
+                'items': [list(item) for item in self.items]}
+
+    @classmethod
+    def restore(cls, snapshot):
+        return cls(**snapshot)
+
+
+class RollingMeanState:
+    """
+    Mean of the last ``window`` values, NaN until the window is full or while
+    it holds a NaN or infinite value, like ``indicators.rolling_mean``.
+    """
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) < self.window or not all(
+                math.isfinite(v) for v in self.values):
+            return NAN
+        # The window is a handful of bars (the %K / %D smoothing), so summing
+        # it is as cheap as a running total and never accumulates drift.
+        return math.fsum(self.values) / self.window
+
+    def peek(self, x):
+        values = list(self.values)[1 - self.window:] if self.window > 1 else []
+        values.append(x)
+        if len(values) < self.window or not all(
+                math.isfinite(v) for v in values):
+            return NAN
+        return math.fsum(values) / self.window
+
+    def snapshot(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def restore(cls, snapshot):
+        return cls(**snapshot)
+
+
+# ----------------------------------------------------------
+# Indicators
+# ----------------------------------------------------------
+
+
+class RSIState:
+    """
+    Streaming RSI with Wilder's smoothing, matching ``indicators.rsi``.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.avg_gain = EMAState(alpha=1.0 / period)
+        self.avg_loss = EMAState(alpha=1.0 / period)
+        self.value = NAN
+
+    def update(self, bar):
+        close = float(bar['Close'])
+        if self.prev_close is None:
+            gain = loss = NAN
+        else:
+            delta = close - self.prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        self.prev_close = close
+        avg_gain = self.avg_gain.update(gain)
+        avg_loss = self.avg_loss.update(loss)
+        self.value = _rsi_from_averages(avg_gain, avg_loss)
+        return self.value
+
+    def peek(self, bar):
+        close = float(bar['Close'])
+        if self.prev_close is None:
+            gain = loss = NAN
+        else:
+            delta = close - self.prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        return _rsi_from_averages(self.avg_gain.peek(gain),
+                                  self.avg_loss.peek(loss))
+
+    def snapshot(self):
+        return {'period': self.period, 'prev_close': self.prev_close,
+                'avg_gain': self.avg_gain.snapshot(),
+                'avg_loss': self.avg_loss.snapshot(), 'value': self.value}
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls(snapshot['period'])
+        state.prev_close = snapshot['prev_close']
+        state.avg_gain = EMAState.restore(snapshot['avg_gain'])
+        state.avg_loss = EMAState.restore(snapshot['avg_loss'])
+        state.value = snapshot['value']
+        return state
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    # Same inf / NaN behaviour as 100 - 100 / (1 + gain / loss) in NumPy.
+    if math.isnan(avg_gain) or math.isnan(avg_loss):
+        return NAN
+    if avg_loss == 0.0:
+        return 100.0 if avg_gain > 0.0 else NAN
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+class MACDState:
+    """
+    Streaming MACD and signal line, matching ``indicators.macd``.
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMAState(span=fast)
+        self.slow = EMAState(span=slow)
+        self.signal = EMAState(span=signal)
+        self.spans = (fast, slow, signal)
+        self.value = (NAN, NAN)
+
+    def update(self, bar):
+        close = float(bar['Close'])
+        macd_line = self.fast.update(close) - self.slow.update(close)
+        self.value = (macd_line, self.signal.update(macd_line))
+        return self.value
+
+    def peek(self, bar):
+        close = float(bar['Close'])
+        macd_line = self.fast.peek(close) - self.slow.peek(close)
+        return macd_line, self.signal.peek(macd_line)
+
+    def snapshot(self):
+        return {'spans': list(self.spans), 'fast': self.fast.snapshot(),
+                'slow': self.slow.snapshot(), 'signal': self.signal.snapshot(),
+                'value': list(self.value)}
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls(*snapshot['spans'])
+        state.fast = EMAState.restore(snapshot['fast'])
+        state.slow = EMAState.restore(snapshot['slow'])
+        state.signal = EMAState.restore(snapshot['signal'])
+        state.value = tuple(snapshot['value'])
+        return state
+
+
+class StochasticState:
+    """
+    Streaming slow stochastic %K / %D, matching
+    ``indicators.stochastic_oscillator``.
+    """
+
+    def __init__(self, window=14, smooth_k=3, smooth_d=3):
+        self.params = (window, smooth_k, smooth_d)
+        self.high_max = RollingExtremeState(window, sign=1)
+        self.low_min = RollingExtremeState(window, sign=-1)
+        self.smooth_k = RollingMeanState(smooth_k)
+        self.smooth_d = RollingMeanState(smooth_d)
+        self.value = (NAN, NAN)
+
+    def update(self, bar):
+        raw_k = _raw_k(self.high_max.update(float(bar['High'])),
+                       self.low_min.update(float(bar['Low'])),
+                       float(bar['Close']))
+        stoch_k = self.smooth_k.update(raw_k)
+        self.value = (stoch_k, self.smooth_d.update(stoch_k))
+        return self.value
+
+    def peek(self, bar):
+        raw_k = _raw_k(self.high_max.peek(float(bar['High'])),
+                       self.low_min.peek(float(bar['Low'])),
+                       float(bar['Close']))
+        stoch_k = self.smooth_k.peek(raw_k)
+        return stoch_k, self.smooth_d.peek(stoch_k)
+
+    def snapshot(self):
+        return {'params': list(self.params),
+                'high_max': self.high_max.snapshot(),
+                'low_min': self.low_min.snapshot(),
+                'smooth_k': self.smooth_k.snapshot(),
+                'smooth_d': self.smooth_d.snapshot(),
+                'value': list(self.value)}
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls(*snapshot['params'])
+        state.high_max = RollingExtremeState.restore(snapshot['high_max'])
+        state.low_min = RollingExtremeState.restore(snapshot['low_min'])
+        state.smooth_k = RollingMeanState.restore(snapshot['smooth_k'])
+        state.smooth_d = RollingMeanState.restore(snapshot['smooth_d'])
+        state.value = tuple(snapshot['value'])
+        return state
+
+
+def _raw_k(high_max, low_min, close):
+    spread = high_max - low_min
+    # A flat window has no range to place the close in; treated as missing
+    # like the non-finite values the batch kernel skips.
+    if spread == 0.0:
+        return NAN
+    return 100.0 * (close - low_min) / spread
+
+
+class IchimokuState:
+    """
+    Streaming Ichimoku lines, matching ``indicators.ichimoku_cloud`` except
+    for the chikou span: that is the close ``displacement`` bars later, which
+    is not known yet at the current bar, so it is always NaN here.
+    """
+
+    def __init__(self, tenkan=9, kijun=26, senkou=52, displacement=26):
+        self.params = (tenkan, kijun, senkou, displacement)
+        self.extremes = [(RollingExtremeState(w, sign=1),
+                          RollingExtremeState(w, sign=-1))
+                         for w in (tenkan, kijun, senkou)]
+        # Span values of the last ``displacement + 1`` bars; the oldest one
+        # is the span plotted at the current bar
+        self.spans = deque(maxlen=displacement + 1)
+        self.value = (NAN,) * 5
+
+    def _lines(self, bar, step):
+        high, low = float(bar['High']), float(bar['Low'])
+        return [0.5 * (step(high_max, high) + step(low_min, low))
+                for high_max, low_min in self.extremes]
+
+    def _spans(self, spans):
+        if len(spans) < self.spans.maxlen:
+            return NAN, NAN
+        return spans[0]
+
+    def update(self, bar):
+        tenkan, kijun, senkou = self._lines(
+            bar, lambda state, x: state.update(x))
+        self.spans.append((0.5 * (tenkan + kijun), senkou))
+        self.value = (tenkan, kijun) + self._spans(self.spans) + (NAN,)
+        return self.value
+
+    def peek(self, bar):
+        tenkan, kijun, senkou = self._lines(
+            bar, lambda state, x: state.peek(x))
+        spans = list(self.spans)[1:] if len(self.spans) == self.spans.maxlen \
+            else list(self.spans)
+        spans.append((0.5 * (tenkan + kijun), senkou))
+        return (tenkan, kijun) + self._spans(spans) + (NAN,)
+
+    def snapshot(self):
+        return {'params': list(self.params),
+                'extremes': [[high_max.snapshot(), low_min.snapshot()]
+                             for high_max, low_min in self.extremes],
+                'spans': [list(span) for span in self.spans],
+                'value': list(self.value)}
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls(*snapshot['params'])
+        state.extremes = [(RollingExtremeState.restore(high_max),
+                           RollingExtremeState.restore(low_min))
+                          for high_max, low_min in snapshot['extremes']]
+        state.spans.extend(tuple(span) for span in snapshot['spans'])
+        state.value = tuple(snapshot['value'])
+        return state
@@ -0,0 +1,309 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import indicators
+from indicators import as_float_array
+
+# ----------------------------------------------------------
+# Vectorised parameter sweeps
+#
+# Each *_grid function computes an indicator for a whole list of settings as
+# one 2-D block (settings x time): exponential filters run as a single scan
+# with one decay factor per row, and rolling windows are computed once per
+# distinct length and broadcast over the remaining parameters.  The *_sweep
+# functions turn the block into buy (1) / sell (-1) signals and summarise
+# every parameter combination at once with ``signal_stats``.
+# ----------------------------------------------------------
+
+
+def ema_grid(x, spans=None, alphas=None):
+    """
+    EMAs of one series for many spans, as a ``(len(spans), n)`` array.
+
+    :param x: Input series, or a 2-D array with one row per span (rows must
+        share the same leading-NaN warm-up).
+    :param spans: EMA spans.
+    :param alphas: Smoothing factors, used instead of ``spans``.
+    """
+    if (spans is None) == (alphas is None):
+        raise ValueError("pass exactly one of spans or alphas")
+    if alphas is None:
+        alphas = 2.0 / (np.asarray(spans, dtype=np.float64) + 1.0)
+    alphas = np.asarray(alphas, dtype=np.float64)[:, None]
+    x = np.asarray(x, dtype=np.float64)
+    rows = np.broadcast_to(x, (alphas.shape[0], x.shape[-1]))
+
+    out = np.full(rows.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(rows[0]))
+    if valid.size == 0:
+        return out
+    start = valid[0]
+    y = out[:, start:]
+    np.multiply(rows[:, start:], alphas, out=y)
+    y[:, 0] = rows[:, start]
+    indicators.exponential_scan(y, 1.0 - alphas)
+    return out
+
+
+def rsi_grid(close, periods):
+    """
+    Wilder RSI for every period, as a ``(len(periods), n)`` array.
+    """
+    close = as_float_array(close)
+    delta = np.empty(close.shape[0])
+    delta[:1] = np.nan
+    np.subtract(close[1:], close[:-1], out=delta[1:])
+    alphas = 1.0 / np.asarray(periods, dtype=np.float64)
+    avg_gain = ema_grid(np.maximum(delta, 0.0), alphas=alphas)
+    avg_loss = ema_grid(np.maximum(-delta, 0.0), alphas=alphas)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def macd_grid(close, combos):
+    """
+    MACD and signal lines for every ``(fast, slow, signal)`` span triple.
+
+    Each distinct fast / slow span is filtered once and shared between the
+    combinations that use it.
+
+    :return: ``(macd_lines, signal_lines)``, each ``(len(combos), n)``.
+    """
+    combos = np.asarray(combos, dtype=np.float64).reshape(-1, 3)
+    spans, inverse = np.unique(combos[:, :2], return_inverse=True)
+    inverse = inverse.reshape(-1, 2)
+    emas = ema_grid(close, spans=spans)
+    macd_lines = emas[inverse[:, 0]] - emas[inverse[:, 1]]
+    return macd_lines, ema_grid(macd_lines, spans=combos[:, 2])
+
+
+def stochastic_grid(high, low, close, windows, smooth_k=3, smooth_d=3):
+    """
+    Slow stochastic %K / %D for every lookback window.
+
+    :return: ``(stoch_k, stoch_d)``, each ``(len(windows), n)``.
+    """
+    close = as_float_array(close)
+    extrema = indicators.rolling_extrema(high, low, windows)
+    highest = np.stack([extrema[w][0] for w in windows])
+    lowest = np.stack([extrema[w][1] for w in windows])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw_k = 100.0 * (close - lowest) / (highest - lowest)
+    stoch_k = _rolling_mean_rows(raw_k, smooth_k)
+    return stoch_k, _rolling_mean_rows(stoch_k, smooth_d)
+
+
+def _rolling_mean_rows(x, window):
+    # The %K / %D smoothing windows are a few bars, so a strided mean over
+    # each window is exact and as cheap as running sums.
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        x = np.where(np.isfinite(x), x, np.nan)
+        np.mean(sliding_window_view(x, window, axis=-1), axis=-1,
+                out=out[:, window - 1:])
+    return out
+
+
+def bollinger_grid(close, windows, n_stds):
+    """
+    Bollinger Bands for every ``(window, n_std)`` pair in the product of
+    ``windows`` and ``n_stds``.
+
+    The rolling mean and standard deviation are computed once per window and
+    broadcast over the band widths.
+
+    :return: ``(sma, upper, lower)``; ``sma`` is ``(len(windows), n)``, the
+        bands ``(len(windows), len(n_stds), n)``.
+    """
+    close = as_float_array(close)
+    sma = np.empty((len(windows), close.shape[0]))
+    std = np.empty_like(sma)
+    # One O(n) pass per distinct window: each window re-centres on its own
+    # block grid (``indicators.moments_block``), so the windows cannot share
+    # one 2-D pass without changing the results
+    for i, window in enumerate(windows):
+        indicators.rolling_mean_var(close, window, out=(sma[i], std[i]))
+    np.sqrt(std, out=std)
+    width = np.asarray(n_stds, dtype=np.float64)[None, :, None] * std[:, None]
+    return sma, sma[:, None] + width, sma[:, None] - width
+
+
+# ----------------------------------------------------------
+# Signal evaluation
+# ----------------------------------------------------------
+
+
+def forward_returns(close, horizon):
+    """
+    Return from each bar to ``horizon`` bars later (NaN at the end).
+    """
+    close = as_float_array(close)
+    out = np.full(close.shape[0], np.nan)
+    if close.shape[0] > horizon:
+        np.divide(close[horizon:], close[:-horizon], out=out[:-horizon])
+        out -= 1.0
+    return out
+
+
+def signal_stats(signals, close, horizon=5):
+    """
+    Count and score buy / sell signals for any number of parameter sets.
+
+    :param signals: Array ``(..., n)`` of 1 (buy), -1 (sell) and 0.
+    :param close: Close prices, length ``n``.
+    :param horizon: Bars ahead used for the forward return.
+    :return: Dict of arrays with the leading shape of ``signals``:
+        ``n_buy``, ``n_sell`` and the mean forward return after each.
+    """
+    fwd = forward_returns(close, horizon)
+    known = ~np.isnan(fwd)
+    fwd = np.where(known, fwd, 0.0)
+    stats = {}
+    for name, value in (('buy', 1), ('sell', -1)):
+        hits = signals == value
+        scored = hits & known
+        n_scored = scored.sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats[f'{name}_fwd_return'] = (
+                np.where(scored, fwd, 0.0).sum(axis=-1) / n_scored)
+        stats[f'n_{name}'] = hits.sum(axis=-1)
+    return stats
+
+
+def _crossings(fast, slow):
+    # +1 where ``fast`` crosses above ``slow``, -1 where it crosses below
+    diff = np.sign(fast - slow)
+    out = np.zeros(diff.shape, dtype=np.int8)
+    out[..., 1:] = np.where(diff[..., 1:] > diff[..., :-1],
+                            1, np.where(diff[..., 1:] < diff[..., :-1], -1, 0))
+    out[..., 1:][np.isnan(diff[..., 1:]) | np.isnan(diff[..., :-1])] = 0
+    return out
+
+
+def _table(params, names, stats):
+    table = pd.DataFrame(params, columns=names)
+    for key, value in stats.items():
+        table[key] = np.asarray(value).reshape(-1)
+    return table
+
+
+def _threshold_stats(values, fwd, thresholds, below):
+    # For every row of ``values`` and every threshold: how many bars are below
+    # (or above) it and the summed forward return over those bars.  The
+    # thresholds are appended to every row and each row is sorted once,
+    # stably, so a threshold lands before the values equal to it ("below")
+    # or after them ("above"); running sums along the sorted rows then give
+    # every (row, threshold) pair at once.  Values are only compared, never
+    # shifted, so bars on or near a threshold are classified exactly as
+    # ``values < threshold`` (or ``>``) would.
+    rows, n = values.shape
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    t = thresholds.shape[0]
+    queries = np.broadcast_to(thresholds, (rows, t))
+    if below:
+        keys = np.concatenate([queries, values], axis=1)
+        value_at = np.arange(-t, n)
+    else:
+        keys = np.concatenate([values, queries], axis=1)
+        value_at = np.arange(n + t)
+        value_at[n:] = -1
+    order = np.argsort(keys, axis=1, kind='stable')
+    # Position in ``values`` of every sorted entry, -1 for thresholds
+    source = value_at[order]
+    is_value = source >= 0
+    counted = is_value & ~np.isnan(np.take_along_axis(keys, order, axis=1))
+    known = counted & ~np.isnan(fwd[np.maximum(source, 0)])
+    fwd_sorted = np.where(known, fwd[np.maximum(source, 0)], 0.0)
+
+    # Sums over the sorted entries before each one (NaN values sort last,
+    # after every threshold, and are not counted)
+    n_before = np.cumsum(counted, axis=1)
+    known_before = np.cumsum(known, axis=1)
+    fwd_before = np.cumsum(fwd_sorted, axis=1)
+
+    query_row, query_col = np.nonzero(~is_value)
+    query = order[query_row, query_col] - (0 if below else n)
+    count = np.empty((rows, t), dtype=np.intp)
+    n_known = np.empty((rows, t))
+    fwd_sum = np.empty((rows, t))
+    count[query_row, query] = n_before[query_row, query_col]
+    n_known[query_row, query] = known_before[query_row, query_col]
+    fwd_sum[query_row, query] = fwd_before[query_row, query_col]
+    if not below:
+        count = n_before[:, -1:] - count
+        n_known = known_before[:, -1:] - n_known
+        fwd_sum = fwd_before[:, -1:] - fwd_sum
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_fwd = fwd_sum / n_known
+    return count, mean_fwd
+
+
+def rsi_sweep(close, periods, buys, sells, horizon=5):
+    """
+    Evaluate every ``(period, buy, sell)`` RSI setting, using the same rule as
+    ``identify_signals`` in stock_rsi_app.py.
+
+    The RSI block is computed once; buy and sell thresholds are then scored
+    against it by rank and combined by broadcasting, so nothing is recomputed
+    per combination.
+
+    :return: DataFrame with one row per combination.
+    """
+    rsi = rsi_grid(close, periods)
+    fwd = forward_returns(close, horizon)
+    n_buy, buy_fwd = _threshold_stats(rsi, fwd, buys, below=True)
+    n_sell, sell_fwd = _threshold_stats(rsi, fwd, sells, below=False)
+
+    shape = (len(periods), len(buys), len(sells))
+    stats = {
+        'buy_fwd_return': np.broadcast_to(buy_fwd[:, :, None], shape),
+        'n_buy': np.broadcast_to(n_buy[:, :, None], shape),
+        'sell_fwd_return': np.broadcast_to(sell_fwd[:, None, :], shape),
+        'n_sell': np.broadcast_to(n_sell[:, None, :], shape),
+    }
+    params = list(itertools.product(periods, buys, sells))
+    return _table(params, ['period', 'rsi_buy', 'rsi_sell'], stats)
+
+
+def macd_sweep(close, fasts, slows, signals, horizon=5):
+    """
+    Evaluate MACD / signal-line crossovers for every ``(fast, slow, signal)``
+    span with ``fast < slow``.
+    """
+    combos = [c for c in itertools.product(fasts, slows, signals)
+              if c[0] < c[1]]
+    macd_lines, signal_lines = macd_grid(close, combos)
+    stats = signal_stats(_crossings(macd_lines, signal_lines), close, horizon)
+    return _table(combos, ['fast', 'slow', 'signal'], stats)
+
+
+def stochastic_sweep(high, low, close, windows, smooth_k=3, smooth_d=3,
+                     overbought=80, oversold=20, horizon=5):
+    """
+    Evaluate %K / %D crossovers for every lookback window: a buy when %K
+    crosses above %D below ``oversold``, a sell when it crosses below %D
+    above ``overbought``.
+    """
+    stoch_k, stoch_d = stochastic_grid(high, low, close, windows,
+                                       smooth_k, smooth_d)
+    cross = _crossings(stoch_k, stoch_d)
+    cross[(cross == 1) & ~(stoch_k < oversold)] = 0
+    cross[(cross == -1) & ~(stoch_k > overbought)] = 0
+    stats = signal_stats(cross, close, horizon)
+    return _table([(w,) for w in windows], ['window'], stats)
+
+
+def bollinger_sweep(close, windows, n_stds, horizon=5):
+    """
+    Evaluate band breaks for every ``(window, n_std)``: a buy when the close
+    is below the lower band, a sell when it is above the upper band.
+    """
+    close = as_float_array(close)
+    _, upper, lower = bollinger_grid(close, windows, n_stds)
+    signals = (close < lower).astype(np.int8) - (close > upper).astype(np.int8)
+    stats = signal_stats(signals, close, horizon)
+    params = list(itertools.product(windows, n_stds))
+    return _table(params, ['window', 'n_std'], stats)
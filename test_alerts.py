@@ -0,0 +1,68 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from alerts import AlertEngine
+
+RULES = {'above 10': 'close > 10', 'rising': 'close > prev_close',
+         'MACD bullish cross': 'cross_above(macd, signal)'}
+
+
+def feed(engine, closes, start=0):
+    alerts = []
+    for i, close in enumerate(closes, start):
+        bar = {'Open': close, 'High': close, 'Low': close, 'Close': close,
+               'Volume': 1.0}
+        alerts += engine.update('A', bar, i)
+    return alerts
+
+
+def test_alerts_only_on_transitions():
+    engine = AlertEngine({'above 10': 'close > 10'}, warmup=0)
+    alerts = feed(engine, [9, 11, 12, 13, 9, 8, 11])
+    assert [(a.timestamp, a.active) for a in alerts] == [(1, True), (6, True)]
+    assert engine.active('A') == ['above 10']
+    assert engine.active('B') == []
+
+
+def test_emit_clear():
+    engine = AlertEngine({'above 10': 'close > 10'}, emit_clear=True,
+                         warmup=0)
+    alerts = feed(engine, [9, 11, 12, 9, 11])
+    assert [(a.timestamp, a.active) for a in alerts] == [
+        (1, True), (3, False), (4, True)]
+    assert alerts[0].values['close'] == 11.0
+
+
+def test_warmup_suppresses_rules():
+    engine = AlertEngine({'above 10': 'close > 10'}, warmup=3)
+    # Already on when the warm-up ends, so it fires then
+    assert [a.timestamp for a in feed(engine, [11, 12, 13, 14, 15])] == [3]
+
+
+def test_snapshot_restore_continues_identically():
+    rng = np.random.default_rng(0)
+    closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, 400)))
+    full = AlertEngine(RULES, emit_clear=True)
+    want = feed(full, closes)
+
+    first = AlertEngine(RULES, emit_clear=True)
+    got = feed(first, closes[:150])
+    saved = pickle.loads(pickle.dumps(first.snapshot()))
+    second = AlertEngine(RULES, emit_clear=True)
+    second.restore(saved)
+    got += feed(second, closes[150:], start=150)
+
+    assert len(want) > 10
+    assert [(a.rule, a.timestamp, a.active) for a in got] == [
+        (a.rule, a.timestamp, a.active) for a in want]
+    assert second.active('A') == full.active('A')
+
+
+@pytest.mark.parametrize('expression', [
+    '__import__("os").system("true")', 'close.real > 1', 'close > "1"',
+    'unknown > 1', 'cross_above(close, 1)', '[close][0] > 1', 'close >'])
+def test_unsafe_or_invalid_rules_raise(expression):
+    with pytest.raises(ValueError):
+        AlertEngine({'bad': expression})
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from backtest import backtest
+
+
+@pytest.mark.parametrize('shape', [(0,), (3, 0), (2, 4, 0)])
+def test_empty_history(shape):
+    result = backtest(np.zeros(shape, dtype=int), np.ones(shape[-1:]))
+    assert result['trades'].empty
+    summary = result['summary']
+    assert len(summary) == max(int(np.prod(shape[:-1])), 1)
+    assert (summary['n_trades'] == 0).all()
+    assert summary[['total_return', 'exposure']].isna().all().all()
+
+
+def test_position_is_held_from_the_next_bar():
+    close = np.array([1.0, 1.0, 2.0, 2.0, 4.0, 4.0])
+    result = backtest(np.array([0, 1, 0, 0, -1, 0]), close)
+    np.testing.assert_array_equal(result['positions'], [0, 0, 1, 1, 1, 0])
+    trades = result['trades'].to_dict('records')
+    assert trades == [{'entry': 2, 'exit': 5, 'bars': 3, 'side': 1.0,
+                       'return': 3.0, 'open': False}]
+    assert result['summary']['total_return'].iloc[0] == 3.0
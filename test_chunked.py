@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fused
+import indicators
+from chunked import NpyWriter, array_reader, compute_chunked, store_reader
+from column_store import ColumnStore
+
+
+@pytest.fixture(scope='module')
+def prices():
+    rng = np.random.default_rng(0)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, 20_000)))
+    spread = close * rng.uniform(0.0, 0.02, close.shape[0])
+    return close + spread, close - spread, close
+
+
+def collect(n):
+    out = np.full((len(fused.FUSED_COLUMNS), n), -1.0)
+
+    def sink(start, values):
+        out[:, start:start + values.shape[1]] = values
+    return out, sink
+
+
+@pytest.mark.parametrize('chunk,block,n', [(1000, 256, 20_000),
+                                           (4096, 4096, 20_000),
+                                           (50_000, 1024, 20_000),
+                                           (3, 1, 600), (10, 7, 20)])
+def test_chunked_equals_in_memory(prices, chunk, block, n):
+    prices = [x[:n] for x in prices]
+    out, sink = collect(n)
+    assert compute_chunked(array_reader(*prices), sink, chunk=chunk,
+                           block=block) == n
+    np.testing.assert_array_equal(out, fused.compute_all(*prices, block=block))
+
+
+def test_fused_matches_kernels(prices):
+    high, low, close = prices
+    got = dict(zip(fused.FUSED_COLUMNS, fused.compute_all(high, low, close,
+                                                          block=1000)))
+    want = {'rsi': indicators.rsi(close)}
+    want['macd'], want['macd_signal'] = indicators.macd(close)
+    want['stoch_k'], want['stoch_d'] = indicators.stochastic_oscillator(
+        high, low, close)
+    (want['tenkan_sen'], want['kijun_sen'], want['senkou_span_a'],
+     want['senkou_span_b'], want['chikou_span']) = indicators.ichimoku_cloud(
+        high, low, close)
+    want['bb_sma'], want['bb_upper'], want['bb_lower'] = \
+        indicators.bollinger_bands(close)
+    for name in fused.FUSED_COLUMNS:
+        np.testing.assert_allclose(got[name], want[name], rtol=1e-9,
+                                   atol=1e-9, err_msg=name)
+
+
+def test_store_to_npy(prices, tmp_path):
+    high, low, close = prices
+    n = 5000
+    index = pd.date_range('2020-01-01', periods=n, freq='min', name='Date')
+    store = ColumnStore(str(tmp_path / 'store'))
+    store.append('AAA', '1m', pd.DataFrame(
+        {'Open': close[:n], 'High': high[:n], 'Low': low[:n],
+         'Close': close[:n], 'Volume': 1.0}, index=index))
+    path = str(tmp_path / 'out.npy')
+    source = store_reader(store, 'AAA', '1m')
+    with NpyWriter(path, source[0]) as sink:
+        compute_chunked(source, sink, chunk=700, block=350)
+    stored = np.load(path, mmap_mode='r')
+    assert stored.shape == (n, len(fused.FUSED_COLUMNS))
+    np.testing.assert_array_equal(
+        stored.T, fused.compute_all(high[:n], low[:n], close[:n], block=350))
+
+
+def test_npy_writer_leaves_nothing_on_error(tmp_path):
+    path = str(tmp_path / 'out.npy')
+    with pytest.raises(RuntimeError):
+        with NpyWriter(path, 10) as sink:
+            sink(0, np.zeros((len(fused.FUSED_COLUMNS), 5)))
+            raise RuntimeError
+    assert list(tmp_path.iterdir()) == []
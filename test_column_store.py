@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from column_store import ColumnStore
+
+
+class HourlyProvider:
+    # Hourly bars on a tz-aware exchange-time index, like yf.download
+
+    def __init__(self, tz='America/New_York'):
+        self.tz = tz
+
+    def fetch(self, ticker, start, end, interval):
+        index = pd.date_range('2024-03-04 09:00', '2024-03-04 15:00', freq='h',
+                              tz=self.tz, name='Datetime')
+        close = np.arange(len(index), dtype=np.float64) + 100.0
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close,
+                             'Close': close, 'Volume': 1.0}, index=index)
+
+
+def test_update_cutoff_uses_exchange_time(tmp_path):
+    store = ColumnStore(str(tmp_path), HourlyProvider())
+    # 12:30 in New York: the 09:00, 10:00 and 11:00 bars are complete
+    now = pd.Timestamp('2024-03-04 12:30', tz='America/New_York')
+    assert store.update('AAA', '1h', start='2024-03-04',
+                        now=now.tz_convert('Asia/Tokyo')) == 3
+    last = store.last_timestamp('AAA', '1h')
+    assert last == pd.Timestamp('2024-03-04 11:00')
+    # Naive ``now`` is UTC: 16:30 UTC is 11:30 in New York (EST)
+    store = ColumnStore(str(tmp_path / 'naive'), HourlyProvider())
+    assert store.update('AAA', '1h', start='2024-03-04',
+                        now='2024-03-04 16:30') == 2
+
+
+def test_read_is_zero_copy(tmp_path):
+    store = ColumnStore(str(tmp_path), HourlyProvider())
+    store.update('AAA', '1h', start='2024-03-04', now='2024-03-05')
+    first = store.read('AAA', '1h')
+    second = store.read('AAA', '1h')
+    assert len(first['Close']) == 7
+    np.testing.assert_array_equal(first['Close'], np.arange(7) + 100.0)
+    assert isinstance(first['Close'], np.memmap)
+    assert second['index'][0] == np.datetime64('2024-03-04T09:00')
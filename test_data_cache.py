@@ -0,0 +1,41 @@
+import pandas as pd
+
+from data_cache import BarCache
+from fetcher import SyntheticProvider
+
+
+class FlakyProvider(SyntheticProvider):
+    # Returns nothing, like a failed yf.download, for the first ``empty`` calls
+
+    def __init__(self, empty):
+        super().__init__(latency=0.0)
+        self.empty = empty
+        self.calls = 0
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        self.calls += 1
+        if self.calls <= self.empty:
+            return pd.DataFrame()
+        return super().fetch(ticker, start, end, interval)
+
+
+def test_get_caches_fetched_range(tmp_path):
+    provider = FlakyProvider(empty=0)
+    cache = BarCache(str(tmp_path), provider)
+    first = cache.get('AAA', '2020-01-01', '2020-07-01')
+    second = cache.get('AAA', '2020-02-01', '2020-03-01')
+    assert provider.calls == 1
+    pd.testing.assert_frame_equal(
+        second, first.loc['2020-02-01':'2020-02-29'], check_freq=False)
+
+
+def test_empty_answer_is_not_recorded_as_covered(tmp_path):
+    provider = FlakyProvider(empty=1)
+    cache = BarCache(str(tmp_path), provider)
+    assert cache.get('AAA', '2020-01-01', '2020-07-01').empty
+    assert cache.load('AAA')[1] == []
+    bars = cache.get('AAA', '2020-01-01', '2020-07-01')
+    assert provider.calls == 2
+    assert len(bars) > 100
+    assert cache.load('AAA')[1] == [(pd.Timestamp('2020-01-01').value,
+                                     pd.Timestamp('2020-07-01').value)]
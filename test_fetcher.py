@@ -0,0 +1,65 @@
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from data_cache import YahooProvider
+from fetcher import Fetcher, SyntheticProvider
+
+
+class FailingProvider(SyntheticProvider):
+    # Raises ConnectionError for the first ``failures`` calls
+
+    def __init__(self, failures):
+        super().__init__(latency=0.0)
+        self.failures = failures
+        self.calls = 0
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError(f"attempt {self.calls} failed")
+        return super().fetch(ticker, start, end, interval)
+
+
+def test_fetch_retries_until_success():
+    provider = FailingProvider(failures=2)
+    fetcher = Fetcher(provider, retries=3, backoff=0.0)
+    bars = fetcher.fetch('AAA', '2020-01-01', '2020-02-01')
+    assert len(bars) == 23
+    assert provider.calls == 3
+    assert fetcher.stats['retries'] == 2
+    assert fetcher.stats['failures'] == 0
+
+
+def test_fetch_gives_up_after_retries():
+    provider = FailingProvider(failures=10)
+    fetcher = Fetcher(provider, retries=2, backoff=0.0)
+    with pytest.raises(ConnectionError):
+        fetcher.fetch('AAA', '2020-01-01', '2020-02-01')
+    assert provider.calls == 3
+    assert fetcher.stats['failures'] == 1
+
+
+def test_yahoo_errors_are_retried(monkeypatch):
+    # yf.download returns an empty frame on failure and records the error
+    bars = SyntheticProvider(latency=0.0).fetch(
+        'AAA', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-02-01'))
+    shared = types.SimpleNamespace(_ERRORS={})
+    calls = []
+
+    def download(ticker, start, end, interval, progress):
+        calls.append(ticker)
+        shared._ERRORS = {}
+        if len(calls) == 1:
+            shared._ERRORS[ticker] = 'YFRateLimitError'
+            return pd.DataFrame()
+        return bars
+
+    monkeypatch.setitem(sys.modules, 'yfinance', types.SimpleNamespace(
+        download=download, shared=shared))
+    fetcher = Fetcher(YahooProvider(), retries=3, backoff=0.0)
+    assert len(fetcher.fetch('AAA', '2020-01-01', '2020-02-01')) == len(bars)
+    assert len(calls) == 2
+    assert fetcher.stats['retries'] == 1
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_store import DEFAULT_REQUESTS, IndicatorStore
+
+REQUESTS = DEFAULT_REQUESTS + (('rsi', {'period': 5}),
+                               ('bollinger', {'window': 50}))
+
+
+@pytest.fixture(scope='module')
+def bars():
+    rng = np.random.default_rng(0)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, 3000)))
+    spread = close * rng.uniform(0.0, 0.02, close.shape[0])
+    index = pd.date_range('2020-01-01', periods=close.shape[0], freq='h')
+    return pd.DataFrame({'High': close + spread, 'Low': close - spread,
+                         'Close': close}, index=index)
+
+
+@pytest.mark.parametrize('cuts', [[3000], [1, 2, 3, 3000],
+                                  [10, 500, 1999, 2000, 3000],
+                                  [700, 700, 3000]])
+def test_resume_equals_full_recompute(bars, tmp_path, cuts):
+    store = IndicatorStore(str(tmp_path))
+    start = 0
+    for stop in cuts:
+        store.append('AAA', '1h', bars.iloc[start:stop], REQUESTS)
+        start = stop
+    assert all(not diff for diff in
+               store.verify('AAA', '1h', bars, REQUESTS).values())
+
+
+def test_append_skips_bars_already_stored(bars, tmp_path):
+    store = IndicatorStore(str(tmp_path))
+    store.append('AAA', '1h', bars.iloc[:1000], ['rsi'])
+    # Passing the full history again only computes what is new
+    computed = store.append('AAA', '1h', bars, ['rsi'])
+    assert store.rows('AAA', '1h', 'rsi') == len(bars)
+    assert store.last_timestamp('AAA', '1h', 'rsi') == bars.index[-1]
+    assert list(computed.values())[0] < len(bars)
+    assert store.append('AAA', '1h', bars, ['rsi']) == {
+        name: 0 for name in computed}
+    assert store.verify('AAA', '1h', bars, ['rsi']) == {
+        name: [] for name in computed}
+
+
+def test_verify_reports_missing_rows(bars, tmp_path):
+    store = IndicatorStore(str(tmp_path))
+    store.append('AAA', '1h', bars.iloc[:100], ['macd'])
+    assert list(store.verify('AAA', '1h', bars, ['macd']).values()) == [
+        ['rows']]
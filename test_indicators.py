@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+
+def assert_close(got, want):
+    # Same NaN positions, values equal to rounding
+    np.testing.assert_allclose(got, np.asarray(want, dtype=np.float64),
+                               rtol=1e-9, atol=1e-9)
+
+
+@pytest.fixture(scope='module')
+def bars():
+    rng = np.random.default_rng(0)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, 3000)))
+    spread = close * rng.uniform(0.0, 0.02, close.shape[0])
+    return pd.DataFrame({'High': close + spread, 'Low': close - spread,
+                         'Close': close})
+
+
+@pytest.mark.parametrize('span', [2, 12, 26, 200])
+def test_ema(bars, span):
+    assert_close(indicators.ema(bars['Close'], span=span),
+                 bars['Close'].ewm(span=span, adjust=False).mean())
+
+
+@pytest.mark.parametrize('period', [2, 14, 30])
+def test_rsi(bars, period):
+    delta = bars['Close'].diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, adjust=False).mean()
+    want = 100 - 100 / (1 + gain / loss)
+    assert_close(indicators.rsi(bars['Close'], period), want)
+
+
+def test_macd(bars):
+    close = bars['Close']
+    line = (close.ewm(span=12, adjust=False).mean()
+            - close.ewm(span=26, adjust=False).mean())
+    macd_line, signal_line = indicators.macd(close)
+    assert_close(macd_line, line)
+    assert_close(signal_line, line.ewm(span=9, adjust=False).mean())
+
+
+@pytest.mark.parametrize('window', [5, 14])
+def test_stochastic_oscillator(bars, window):
+    low_min = bars['Low'].rolling(window).min()
+    high_max = bars['High'].rolling(window).max()
+    raw = 100 * (bars['Close'] - low_min) / (high_max - low_min)
+    stoch_k = raw.rolling(3).mean()
+    stoch_k_got, stoch_d_got = indicators.stochastic_oscillator(
+        bars['High'], bars['Low'], bars['Close'], window)
+    assert_close(stoch_k_got, stoch_k)
+    assert_close(stoch_d_got, stoch_k.rolling(3).mean())
+
+
+def test_ichimoku_cloud(bars):
+    high, low = bars['High'], bars['Low']
+
+    def midpoint(window):
+        return (high.rolling(window).max() + low.rolling(window).min()) / 2
+
+    want = (midpoint(9), midpoint(26),
+            ((midpoint(9) + midpoint(26)) / 2).shift(26),
+            midpoint(52).shift(26), bars['Close'].shift(-26))
+    got = indicators.ichimoku_cloud(high, low, bars['Close'])
+    for g, w in zip(got, want):
+        np.testing.assert_array_equal(g, w.to_numpy())
+
+
+@pytest.mark.parametrize('window', [2, 20, 100])
+def test_bollinger_bands(bars, window):
+    close = bars['Close']
+    sma = close.rolling(window).mean()
+    std = close.rolling(window).std()
+    got = indicators.bollinger_bands(close, window)
+    for g, w in zip(got, (sma, sma + 2 * std, sma - 2 * std)):
+        assert_close(g, w)
+
+
+@pytest.mark.parametrize('ddof,min_periods', [(0, 1), (1, 5), (1, None)])
+def test_rolling_mean_var_warm_up(bars, ddof, min_periods):
+    close = bars['Close'].copy()
+    close.iloc[[0, 1, 500, 501, 502]] = np.nan
+    rolling = close.rolling(20, min_periods=min_periods)
+    mean, var = indicators.rolling_mean_var(close, 20, ddof=ddof,
+                                            min_periods=min_periods)
+    assert_close(mean, rolling.mean())
+    assert_close(var, rolling.var(ddof=ddof))
+
+
+def test_rolling_moments_keep_precision_at_high_prices():
+    rng = np.random.default_rng(1)
+    close = 1e6 + np.cumsum(rng.normal(0.0, 0.01, 100_000))
+    std = indicators.rolling_std(close, 20)
+    want = pd.Series(close - 1e6).rolling(20).std().to_numpy()
+    np.testing.assert_allclose(std, want, rtol=1e-6)
+
+
+def test_out_buffers_are_used(bars):
+    out = (np.empty(len(bars)), np.empty(len(bars)))
+    result = indicators.macd(bars['Close'], out=out)
+    assert result[0] is out[0] and result[1] is out[1]
+    with pytest.raises(ValueError):
+        indicators.rsi(bars['Close'], out=np.empty(3))
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from panel import Panel
+
+
+def frame(rng, n, level):
+    close = level * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+    spread = close * rng.uniform(0.0, 0.02, n)
+    index = pd.date_range('2020-01-01', periods=n, name='Date')
+    return pd.DataFrame({'Open': close, 'High': close + spread,
+                         'Low': close - spread, 'Close': close,
+                         'Volume': 1.0}, index=index)
+
+
+def test_panel_matches_per_ticker_kernels():
+    rng = np.random.default_rng(0)
+    # Price levels far apart and segments shorter than the windows, so
+    # neighbouring tickers would show through any mixing
+    frames = {'BIG': frame(rng, 700, 1e5), 'TINY': frame(rng, 40, 0.01),
+              'ONE': frame(rng, 1, 50.0), 'MID': frame(rng, 300, 100.0),
+              'EMPTY': frame(rng, 0, 1.0), 'LAST': frame(rng, 60, 1e4)}
+    panel = Panel.from_frames(frames)
+    assert len(panel) == 1101
+    assert panel.verify() == {}
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_cache
+from shared_cache import SharedCache
+
+
+def test_arrays_are_shared_read_only():
+    cache = SharedCache()
+    value = cache.get('a', lambda: np.arange(10.0))
+    assert cache.get('a', lambda: None) is value
+    with pytest.raises(ValueError):
+        value[0] = 1.0
+
+
+@pytest.mark.parametrize('copy_on_write', [True, False])
+def test_frames_are_not_changed_by_consumers(monkeypatch, copy_on_write):
+    monkeypatch.setattr(shared_cache, '_copy_on_write', lambda: copy_on_write)
+    cache = SharedCache()
+    compute = lambda: pd.DataFrame({'Close': np.arange(5.0)})
+    frame = cache.get('f', compute)
+    frame.loc[0, 'Close'] = 100.0
+    frame['Close'] *= 2
+    frame['New'] = 1.0
+    np.testing.assert_array_equal(cache.get('f', compute)['Close'],
+                                  np.arange(5.0))
+    assert list(cache.get('f', compute).columns) == ['Close']
+
+
+def test_evicted_entries_remove_their_files(tmp_path):
+    cache = SharedCache(max_bytes=1000, directory=str(tmp_path))
+    cache.get('a', lambda: np.zeros(100))
+    assert len(os.listdir(tmp_path)) == 1
+    cache.get('b', lambda: np.zeros(100))
+    assert cache.stats['evictions'] == 1
+    assert len(os.listdir(tmp_path)) == 1
+    assert os.path.exists(cache._path('b') + '.npy')
+    # Too large to keep at all
+    cache.get('c', lambda: np.zeros(1000))
+    assert not os.path.exists(cache._path('c') + '.npy')
+
+
+def test_expired_files_are_removed(tmp_path, monkeypatch):
+    cache = SharedCache(ttl=10, directory=str(tmp_path))
+    cache.get('a', lambda: np.zeros(10))
+    path = cache._path('a') + '.npy'
+    assert os.path.exists(path)
+    later = shared_cache.time.time() + 60
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: later)
+    other = SharedCache(ttl=10, directory=str(tmp_path))
+    assert other._load('a') == (None, None)
+    assert not os.path.exists(path)
+    value = cache.get('a', lambda: np.ones(10))
+    np.testing.assert_array_equal(value, np.ones(10))
+    assert cache.stats['misses'] == 2
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import indicators
+import sweep
+
+
+@pytest.mark.parametrize('below', [True, False])
+def test_threshold_stats_match_direct_comparison(below):
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0, 100, (40, 500))
+    values[:, :20] = 30.0
+    values[:, 20:40] = np.nextafter(30.0, 0.0)
+    values[:, 40:60] = np.nextafter(30.0, 100.0)
+    values[:, 60:70] = np.nan
+    fwd = rng.normal(0, 0.01, 500)
+    fwd[::7] = np.nan
+    thresholds = [35.0, 20.0, 30.0, 30.0 + 1e-13, 30.0]
+
+    count, mean_fwd = sweep._threshold_stats(values, fwd, thresholds, below)
+    for i, row in enumerate(values):
+        for k, threshold in enumerate(thresholds):
+            hit = row < threshold if below else row > threshold
+            assert count[i, k] == hit.sum()
+            np.testing.assert_allclose(mean_fwd[i, k], np.nanmean(fwd[hit]),
+                                       rtol=1e-9)
+
+
+def test_rsi_sweep_matches_per_parameter_loop():
+    rng = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    table = sweep.rsi_sweep(close, [7, 14], [25, 30], [70, 75])
+    fwd = sweep.forward_returns(close, 5)
+    for row in table.itertuples():
+        rsi = indicators.rsi(close, row.period)
+        assert row.n_buy == np.sum(rsi < row.rsi_buy)
+        assert row.n_sell == np.sum(rsi > row.rsi_sell)
+        np.testing.assert_allclose(
+            row.buy_fwd_return, np.nanmean(fwd[rsi < row.rsi_buy]), rtol=1e-9)
@@ -0,0 +1,248 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from column_store import interval_length
+from data_cache import OHLCV_COLUMNS
+from indicator_store import flatten_values
+from planner import KERNELS, normalize_request
+from streaming import IchimokuState, MACDState, RSIState, StochasticState
+
+# ----------------------------------------------------------
+# Multi-timeframe indicators
+#
+# Weekly or monthly indicators are built from the base series already held
+# (e.g. cached daily bars) instead of downloading the same history again at
+# every interval.  Base bars are grouped into periods of the higher
+# timeframe: fixed lengths ("5m", "1h", "1d", aligned like the tick
+# aggregator) or calendar periods ("W-FRI", "M", "Q", "Y", as pandas period
+# aliases; trading weeks are "W-FRI", since plain "W" weeks end on Sunday and
+# would only close with the next Monday's bar).
+#
+# Higher-timeframe values are aligned back onto the base index without
+# look-ahead.  In "closed" mode a base bar shows the values of the last
+# period that had ended by the end of that bar (a week ending on Friday is
+# shown from Friday's daily bar; if Friday is a holiday, from the next
+# Monday).  In "forming" mode it shows the values the current period would
+# have if it ended with that bar, i.e. built only from bars up to it.  The
+# chikou span is the close ``displacement`` periods later, so it is NaN in
+# both.
+# ----------------------------------------------------------
+
+STREAMING_STATES = {
+    'rsi': RSIState,
+    'macd': MACDState,
+    'stochastic': StochasticState,
+    'ichimoku': IchimokuState,
+}
+
+
+def _fixed_length(timeframe):
+    if re.fullmatch(r'\d+(m|h|d)', timeframe):
+        return interval_length(timeframe).value
+    return None
+
+
+def period_bounds(timestamps, timeframe):
+    """
+    Start and end (exclusive) of the period each timestamp falls in.
+
+    :param timestamps: DatetimeIndex (or anything it accepts).
+    :return: ``(start, end)`` int64 nanosecond arrays.
+    """
+    index = pd.DatetimeIndex(timestamps).as_unit('ns')
+    length = _fixed_length(timeframe)
+    if length is not None:
+        ns = index.asi8
+        start = ns - ns % length
+        return start, start + length
+    periods = index.to_period(timeframe)
+    return (periods.start_time.as_unit('ns').asi8,
+            periods.end_time.as_unit('ns').asi8 + 1)
+
+
+def resample_bars(df, timeframe, base='1d'):
+    """
+    Group base bars into higher-timeframe OHLCV bars.
+
+    :param df: Base bars with OHLCV columns on a sorted DatetimeIndex.
+    :param timeframe: Higher timeframe, e.g. "W-FRI" or "M".
+    :param base: Interval of the base bars, used to tell when a period has
+        ended.
+    :return: ``(bars, available)``: the bars indexed by period start, and
+        for each the position of the first base bar by whose end the period
+        is over (``len(df)`` if that has not happened yet).
+    """
+    n = len(df)
+    start, end = period_bounds(df.index, timeframe)
+    first = np.flatnonzero(np.r_[True, start[1:] != start[:-1]]) if n \
+        else np.empty(0, dtype=np.intp)
+    last = np.r_[first[1:], n] - 1
+
+    columns = {}
+    for name in OHLCV_COLUMNS:
+        values = (df[name].to_numpy(dtype=np.float64) if name in df
+                  else np.full(n, np.nan))
+        if not n:
+            columns[name] = values
+        elif name == 'Open':
+            columns[name] = values[first]
+        elif name == 'High':
+            columns[name] = np.maximum.reduceat(values, first)
+        elif name == 'Low':
+            columns[name] = np.minimum.reduceat(values, first)
+        elif name == 'Close':
+            columns[name] = values[last]
+        else:
+            columns[name] = np.add.reduceat(values, first)
+    bars = pd.DataFrame(columns, index=pd.DatetimeIndex(start[first],
+                                                        name='Date'))
+
+    # A period is over at its last bar if that bar reaches the period end,
+    # otherwise only once the next period's first bar arrives
+    bar_end = (pd.DatetimeIndex(df.index).as_unit('ns').asi8[last]
+               + interval_length(base).value)
+    available = np.where(bar_end >= end[first], last, last + 1)
+    return bars, available
+
+
+def align(values, available, n):
+    """
+    Spread per-period values onto ``n`` base bars: each base bar gets the
+    values of the last period available at it, NaN before the first.
+    """
+    idx = np.searchsorted(available, np.arange(n), side='right') - 1
+    out = []
+    for v in values:
+        aligned = np.asarray(v, dtype=np.float64)[np.maximum(idx, 0)]
+        aligned[idx < 0] = np.nan
+        out.append(aligned)
+    return tuple(out)
+
+
+def align_indicator(df, timeframe, name, base='1d', **params):
+    """
+    A higher-timeframe indicator in "closed" mode, aligned onto ``df``'s
+    index.
+
+    :param df: Base bars.
+    :param timeframe: Higher timeframe, e.g. "W-FRI" or "M".
+    :param name: Indicator name, as in ``planner.KERNELS``.
+    :return: Arrays of ``len(df)`` values, shaped like the kernel's return
+        value (chikou NaN for "ichimoku").
+    """
+    name, params = normalize_request((name, params))
+    bars, available = resample_bars(df, timeframe, base)
+    close = bars['Close'].to_numpy()
+    if name in ('rsi', 'macd', 'bollinger'):
+        values = KERNELS[name](close, **params)
+    else:
+        values = KERNELS[name](bars['High'].to_numpy(),
+                               bars['Low'].to_numpy(), close, **params)
+    if name == 'rsi':
+        return align((values,), available, len(df))[0]
+    values = align(values, available, len(df))
+    if name == 'ichimoku':
+        values[4][:] = np.nan
+    return values
+
+
+class _Period:
+    # Forming bar and indicator states of one higher timeframe
+
+    def __init__(self, indicators):
+        self.start = self.end = None
+        self.bar = None
+        self.states = {name: factory() for name, factory in indicators.items()}
+        self.closed = {name: _nan_like(factory())
+                       for name, factory in indicators.items()}
+
+    def close(self):
+        self.closed = {name: state.update(self.bar)
+                       for name, state in self.states.items()}
+        self.bar = None
+
+
+def _nan_like(state):
+    value = state.value
+    return tuple(np.nan for _ in value) if isinstance(value, tuple) else np.nan
+
+
+class MultiTimeframe:
+    """
+    Higher-timeframe indicators of one symbol, updated bar by bar from the
+    base series.
+
+    :param timeframes: Higher timeframes, e.g. ``("W-FRI", "M")``.
+    :param indicators: Dict mapping a name to a zero-argument factory of a
+        streaming state (default: RSI, MACD, stochastic and Ichimoku).
+    :param base: Interval of the base bars.
+    :param mode: "closed" or "forming" (see the module notes).
+    """
+
+    def __init__(self, timeframes=('W-FRI', 'M'), indicators=None, base='1d',
+                 mode='closed'):
+        if mode not in ('closed', 'forming'):
+            raise ValueError(f"mode must be 'closed' or 'forming', got {mode!r}")
+        self.indicators = dict(indicators if indicators is not None
+                               else STREAMING_STATES)
+        self.timeframes = tuple(timeframes)
+        self.base_length = interval_length(base).value
+        self.mode = mode
+        self._periods = {tf: _Period(self.indicators) for tf in self.timeframes}
+
+    def update(self, timestamp, bar):
+        """
+        Add one base bar.
+
+        :param timestamp: Start of the base bar.
+        :param bar: Mapping with 'Open', 'High', 'Low', 'Close' and
+            'Volume'.
+        :return: Dict mapping each timeframe to a dict of indicator values
+            as seen at this bar.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        ns = timestamp.value
+        result = {}
+        for timeframe, period in self._periods.items():
+            if period.end is None or ns >= period.end:
+                if period.bar is not None:
+                    # The period ended without a bar reaching its end
+                    period.close()
+                start, end = period_bounds([timestamp], timeframe)
+                period.start, period.end = int(start[0]), int(end[0])
+            _merge(period, bar)
+            if ns + self.base_length >= period.end:
+                period.close()
+            if self.mode == 'closed' or period.bar is None:
+                result[timeframe] = period.closed
+            else:
+                result[timeframe] = {name: state.peek(period.bar)
+                                     for name, state in period.states.items()}
+        return result
+
+    def run(self, df):
+        """
+        ``update`` over every bar of a base frame.
+
+        :return: Dict mapping each timeframe to a DataFrame of values on
+            ``df``'s index, one column per indicator output.
+        """
+        rows = {tf: [] for tf in self.timeframes}
+        for timestamp, bar in zip(df.index, df[OHLCV_COLUMNS].to_dict('records')):
+            for timeframe, values in self.update(timestamp, bar).items():
+                rows[timeframe].append(flatten_values(values))
+        return {tf: pd.DataFrame(values, index=df.index)
+                for tf, values in rows.items()}
+
+
+def _merge(period, bar):
+    if period.bar is None:
+        period.bar = {name: float(bar[name]) for name in OHLCV_COLUMNS}
+        return
+    merged = period.bar
+    merged['High'] = max(merged['High'], float(bar['High']))
+    merged['Low'] = min(merged['Low'], float(bar['Low']))
+    merged['Close'] = float(bar['Close'])
+    merged['Volume'] += float(bar['Volume'])